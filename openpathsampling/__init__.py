@@ -144,8 +144,8 @@ from storage.storage import Storage, AnalysisStorage
 from volume import (
     Volume, VolumeCombination, VolumeFactory, VoronoiVolume,
     EmptyVolume, FullVolume, CVDefinedVolume, PeriodicCVDefinedVolume,
-    IntersectionVolume, UnionVolume, SymmetricDifferenceVolume,
-    RelativeComplementVolume, join_volumes
+    CVRangeSetVolume, IntersectionVolume, UnionVolume,
+    SymmetricDifferenceVolume, RelativeComplementVolume, join_volumes
 )
 
 from high_level import move_strategy as strategies
@@ -1,12 +1,16 @@
 import logging
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 def pathlength(sample):
     return len(sample.trajectory)
 
-def max_lambdas(sample, orderparameter):
-    return max(orderparameter(sample.trajectory))
+def max_lambdas(sample, orderparameter, interfaces=None):
+    values = orderparameter(sample.trajectory)
+    if interfaces is not None:
+        return interfaces.max_lambda(values)
+    return np.max(values)
 
 def sampleset_sample_generator(steps):
     for step in steps:
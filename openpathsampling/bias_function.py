@@ -1,4 +1,5 @@
 from openpathsampling.netcdfplus import StorableNamedObject
+import numpy as np
 import pandas as pd
 
 # NOTE: the biases that return here can still be more than 1. This is
@@ -78,85 +79,68 @@ class BiasEnsembleTable(BiasFunction):
         all_ensembles += [e for e in self_ensembles if e in both]
 
         # set up the structures for initialization of the return
-        ensembles_to_ids = {ens : all_ensembles.index(ens) 
-                            for ens in all_ensembles}
-        dataframe = pd.DataFrame(index=ensembles_to_ids.values(),
-                                 columns=ensembles_to_ids.values())
-
-        # fill the dataframe
-        # to do this, we split the matrix into regions based on self_only,
-        # other_only, and both. We have to check that we don't have two
-        # versions of the 
-        for ens_from in self_only:
-            orig_from_id = self.ensembles_to_ids[ens_from]
-            for ens_to in self_only | both:
-                orig_to_id = self.ensembles_to_ids[ens_to]
-                orig_value = self.dataframe.loc[orig_from_id, orig_to_id]
-                dataframe.set_value(index=ensembles_to_ids[ens_from],
-                                    col=ensembles_to_ids[ens_to],
-                                    value=orig_value)
-
-        for ens_from in other_only:
-            orig_from_id = other.ensembles_to_ids[ens_from]
-            for ens_to in other_only | both:
-                orig_to_id = other.ensembles_to_ids[ens_to]
-                orig_value = other.dataframe.loc[orig_from_id, orig_to_id]
-                dataframe.set_value(index=ensembles_to_ids[ens_from],
-                                    col=ensembles_to_ids[ens_to],
-                                    value=orig_value)
-
-        for ens_from in both:
+        ensembles_to_ids = {ens : i for (i, ens) in enumerate(all_ensembles)}
+        ids_to_ensembles = dict(enumerate(all_ensembles))
+
+        # fill the table: we put each table's values in the combined
+        # indexing (NaN where it has no entry) and take the one that is set;
+        # entries set in both tables must agree
+        self_values = self._reindexed_values(ensembles_to_ids)
+        other_values = other._reindexed_values(ensembles_to_ids)
+        self_set = ~np.isnan(self_values)
+        other_set = ~np.isnan(other_values)
+        conflicts = self_set & other_set & (self_values != other_values)
+        if np.any(conflicts):
+            (from_id, to_id) = [idx[0] for idx in np.nonzero(conflicts)]
+            ens_from = ids_to_ensembles[from_id]
+            ens_to = ids_to_ensembles[to_id]
             self_from_id = self.ensembles_to_ids[ens_from]
+            self_to_id = self.ensembles_to_ids[ens_to]
             other_from_id = other.ensembles_to_ids[ens_from]
-            for ens_to in self_only:
-                to_id = self.ensembles_to_ids[ens_to]
-                orig_value = self.dataframe.loc[self_from_id, to_id]
-                dataframe.set_value(index=ensembles_to_ids[ens_from],
-                                    col=ensembles_to_ids[ens_to],
-                                    value=orig_value)
-            for ens_to in other_only:
-                to_id = other.ensembles_to_ids[ens_to]
-                orig_value = other.dataframe.loc[other_from_id, to_id]
-                dataframe.set_value(index=ensembles_to_ids[ens_from],
-                                    col=ensembles_to_ids[ens_to],
-                                    value=orig_value)
-            for ens_to in both:
-                self_to_id = self.ensembles_to_ids[ens_to]
-                other_to_id = other.ensembles_to_ids[ens_to]
-                try:
-                    self_value = self.dataframe.loc[self_from_id,
-                                                    self_to_id]
-                except KeyError:
-                    # expected if this is only in other
-                    self_value = None
-                try:
-                    other_value = other.dataframe.loc[other_from_id,
-                                                      other_to_id]
-                except KeyError:
-                    # expected if this is only in self
-                    other_value = None
-                if self_value is not None and other_value is not None:
-                    if self_value != other_value:
-                        msg = "Biases have differing value for same entry:"
-                        msg += " {:} != {:}\n".format(self_value, other_value)
-                        msg += str(self.dataframe) + "\n"
-                        msg += str(other.dataframe) + "\n"
-                        msg += ens_from.name + "=>" + ens_to.name
-                        msg += ("  (" + str(self_from_id) + "," 
-                                + str(self_to_id) + ")  (" 
-                                + str(other_from_id) + "," 
-                                + str(other_to_id) + ")")
-                        raise ValueError(msg)
-                value = self_value if self_value is not None else other_value
-                if value is not None:
-                    dataframe.set_value(index=ensembles_to_ids[ens_from],
-                                        col=ensembles_to_ids[ens_to],
-                                        value=value)
-                # if both self_value and other_value are None, df unchanged
+            other_to_id = other.ensembles_to_ids[ens_to]
+            msg = "Biases have differing value for same entry:"
+            msg += " {:} != {:}\n".format(self_values[from_id, to_id],
+                                          other_values[from_id, to_id])
+            msg += str(self.dataframe) + "\n"
+            msg += str(other.dataframe) + "\n"
+            msg += ens_from.name + "=>" + ens_to.name
+            msg += ("  (" + str(self_from_id) + "," 
+                    + str(self_to_id) + ")  (" 
+                    + str(other_from_id) + "," 
+                    + str(other_to_id) + ")")
+            raise ValueError(msg)
+
+        values = np.where(self_set, self_values, other_values)
+        ids = range(len(all_ensembles))
+        dataframe = pd.DataFrame(values, index=ids, columns=ids)
 
         return BiasEnsembleTable(dataframe, ensembles_to_ids)
 
 
+    def _reindexed_values(self, ensembles_to_ids):
+        """Array of the table values using new ids for the ensembles.
+
+        Parameters
+        ----------
+        ensembles_to_ids : dict, keys :class:`.Ensemble`, values int
+            new mapping of ensembles to ids; must contain all ensembles in
+            this table, and the ids must be 0 to len(ensembles_to_ids)-1
+
+        Returns
+        -------
+        np.ndarray
+            square array with the value for (from_id, to_id) in the new
+            ids; NaN for entries not in this table
+        """
+        n_ids = len(ensembles_to_ids)
+        values = np.full((n_ids, n_ids), np.nan)
+        ensembles = list(self.ensembles_to_ids.keys())
+        old_ids = [self.ensembles_to_ids[e] for e in ensembles]
+        new_ids = [ensembles_to_ids[e] for e in ensembles]
+        old_values = self.dataframe.reindex(index=old_ids, columns=old_ids)
+        values[np.ix_(new_ids, new_ids)] = old_values.values.astype(float)
+        return values
+
     @classmethod
     def ratios_from_dictionary(cls, ratio_dictionary):
         """Create bias from dictionary of 1D values as ratios.
@@ -174,17 +158,13 @@ class BiasEnsembleTable(BiasFunction):
         :class:`.BiasEnsembleTable`
             bias table
         """
-        ensembles_to_ids = {e : ratio_dictionary.keys().index(e) 
-                            for e in ratio_dictionary.keys()}
-        id_based_df = pd.DataFrame(index=ensembles_to_ids.values(),
-                                   columns=ensembles_to_ids.values())
-        for e_from in ratio_dictionary:
-            w_from = ratio_dictionary[e_from]
-            id_from = ensembles_to_ids[e_from]
-            for e_to in ratio_dictionary:
-                id_to = ensembles_to_ids[e_to]
-                w_to = ratio_dictionary[e_to]
-                id_based_df.set_value(id_from, id_to, w_from/w_to)
+        ensembles = list(ratio_dictionary.keys())
+        ensembles_to_ids = {e : i for (i, e) in enumerate(ensembles)}
+        weights = np.array([ratio_dictionary[e] for e in ensembles],
+                           dtype=float)
+        ids = range(len(ensembles))
+        id_based_df = pd.DataFrame(np.outer(weights, 1.0 / weights),
+                                   index=ids, columns=ids)
         return BiasEnsembleTable(id_based_df, ensembles_to_ids)
 
 
@@ -301,12 +281,7 @@ def SRTISBiasFromNetwork(network, steps=None):
     for outer in ms_outer_ensembles:
         outer_id = bias.ensembles_to_ids[outer]
         outer_count = len(network.special_ensembles['ms_outer'][outer])
-        for col in bias.dataframe.columns:
-            val_from_outer = bias.dataframe.loc[outer_id, col]
-            bias.dataframe.set_value(index=outer_id, col=col,
-                                     value=val_from_outer * outer_count)
-            val_to_outer = bias.dataframe.loc[col, outer_id]
-            bias.dataframe.set_value(index=col, col=outer_id,
-                                     value=val_to_outer / outer_count)
+        bias.dataframe.loc[outer_id, :] *= outer_count
+        bias.dataframe.loc[:, outer_id] /= outer_count
     return bias
 
@@ -0,0 +1,255 @@
+"""
+Small files that allow to restart a path sampling simulation quickly.
+"""
+
+import json
+import logging
+import os
+
+import numpy as np
+
+from openpathsampling.netcdfplus import LoaderProxy
+
+logger = logging.getLogger(__name__)
+
+
+def _random_state_to_json(state):
+    name, keys, pos, has_gauss, cached_gaussian = state
+    return [name, keys.tolist(), pos, has_gauss, cached_gaussian]
+
+
+def _random_state_from_json(state):
+    name, keys, pos, has_gauss, cached_gaussian = state
+    return (str(name), np.array(keys, dtype=np.uint32), pos, has_gauss,
+            cached_gaussian)
+
+
+class Checkpoint(object):
+    """
+    Everything needed to continue a :class:`.PathSampling` run
+
+    A checkpoint is a small JSON file written beside the storage. It holds
+    the position of the current :class:`.MCStep` in the storage, so the step
+    and with it the simulation, the move scheme and the current
+    :class:`.SampleSet` are loaded directly by index, without searching the
+    file. It also keeps the state of the random numbers and the settings of
+    the simulation that are not stored with it.
+
+    Movers keep no state from one step to the next. With seeded random
+    streams the random numbers of a step follow from the seed and the step
+    number, so only the seed is kept for them. The state of the global
+    `numpy.random` generator is saved in any case, since it is used by the
+    movers without streams and by engines like the Langevin integrator of
+    the toy engine.
+
+    Parameters
+    ----------
+    mccycle : int
+        the number of the current step
+    step_idx : int
+        the index of the current step in the `steps` store
+    random_seed : int or None
+        the seed of the random streams, if any
+    numpy_random_state : tuple or None
+        the state of the global `numpy.random` generator
+    settings : dict or None
+        attributes of the simulation to restore
+
+    Notes
+    -----
+    The file is replaced atomically, so a job that is killed while writing
+    leaves the previous checkpoint intact.
+    """
+
+    version = 1
+
+    settings_attributes = ['save_frequency', 'full_sanity_check_frequency',
+                           'batch_save', 'max_concurrent_steps',
+                           'status_update_frequency', 'checkpoint_frequency']
+
+    def __init__(self, mccycle, step_idx, random_seed=None,
+                 numpy_random_state=None, settings=None):
+        self.mccycle = mccycle
+        self.step_idx = step_idx
+        self.random_seed = random_seed
+        self.numpy_random_state = numpy_random_state
+        if settings is None:
+            settings = {}
+        self.settings = settings
+
+    @staticmethod
+    def default_filename(storage):
+        """
+        The name of the checkpoint file of `storage`
+
+        Parameters
+        ----------
+        storage : :class:`.Storage`
+            the storage of the simulation
+
+        Returns
+        -------
+        str
+        """
+        return storage.filename + '.checkpoint'
+
+    @classmethod
+    def from_simulation(cls, simulation):
+        """
+        Create the checkpoint of the current step of `simulation`
+
+        The current step needs to be saved in the storage of the simulation.
+
+        Parameters
+        ----------
+        simulation : :class:`.PathSampling`
+            the running simulation
+
+        Returns
+        -------
+        :class:`Checkpoint`
+        """
+        step = simulation.current_step
+        step_idx = simulation.storage.steps.index.get(step)
+        if step_idx is None or step_idx < 0:
+            raise RuntimeError(
+                'Step %d is not saved in the storage.' % step.mccycle)
+
+        numpy_random_state = np.random.get_state()
+
+        settings = {
+            attr: getattr(simulation, attr)
+            for attr in cls.settings_attributes
+            if hasattr(simulation, attr)
+        }
+
+        return cls(
+            mccycle=step.mccycle,
+            step_idx=int(step_idx),
+            random_seed=simulation.random_seed,
+            numpy_random_state=numpy_random_state,
+            settings=settings
+        )
+
+    def to_dict(self):
+        numpy_random_state = self.numpy_random_state
+        if numpy_random_state is not None:
+            numpy_random_state = _random_state_to_json(numpy_random_state)
+
+        return {
+            'version': self.version,
+            'mccycle': self.mccycle,
+            'step_idx': self.step_idx,
+            'random_seed': self.random_seed,
+            'numpy_random_state': numpy_random_state,
+            'settings': self.settings
+        }
+
+    @classmethod
+    def from_dict(cls, dct):
+        if dct.get('version') != cls.version:
+            raise RuntimeError(
+                'Unknown checkpoint version %s' % dct.get('version'))
+
+        numpy_random_state = dct['numpy_random_state']
+        if numpy_random_state is not None:
+            numpy_random_state = _random_state_from_json(numpy_random_state)
+
+        return cls(
+            mccycle=dct['mccycle'],
+            step_idx=dct['step_idx'],
+            random_seed=dct['random_seed'],
+            numpy_random_state=numpy_random_state,
+            settings={str(key): value
+                      for key, value in dct['settings'].items()}
+        )
+
+    def write(self, filename):
+        """
+        Write the checkpoint to the file `filename`
+
+        Parameters
+        ----------
+        filename : str
+            the name of the checkpoint file
+        """
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+        os.rename(tmp_filename, filename)
+        logger.info('Wrote checkpoint of step %d to %s' %
+                    (self.mccycle, filename))
+
+    @classmethod
+    def read(cls, filename):
+        """
+        Read a checkpoint from the file `filename`
+
+        Parameters
+        ----------
+        filename : str
+            the name of the checkpoint file
+
+        Returns
+        -------
+        :class:`Checkpoint`
+        """
+        with open(filename) as f:
+            return cls.from_dict(json.load(f))
+
+    def restore(self, storage):
+        """
+        Continue the simulation of the checkpoint
+
+        Parameters
+        ----------
+        storage : :class:`.Storage`
+            the storage the checkpoint was written for, opened for appending
+
+        Returns
+        -------
+        :class:`.PathSampling`
+            the simulation, ready to run from the step of the checkpoint
+        """
+        step = None
+        if self.step_idx < len(storage.steps):
+            step = storage.steps.load(self.step_idx)
+
+        if step is None or step.mccycle != self.mccycle:
+            raise RuntimeError(
+                'Storage `%s` does not match the checkpoint of step %d.' %
+                (storage.filename, self.mccycle))
+
+        simulation = step.simulation
+        simulation.restart_at_step(step, storage)
+
+        for attr, value in self.settings.items():
+            setattr(simulation, attr, value)
+
+        if self.random_seed is not None:
+            simulation.set_random_seed(self.random_seed)
+        if self.numpy_random_state is not None:
+            np.random.set_state(self.numpy_random_state)
+
+        self.warm_cache(simulation.sample_set)
+
+        return simulation
+
+    @staticmethod
+    def warm_cache(sample_set):
+        """
+        Load the snapshots of the trajectories in `sample_set`
+
+        The first steps after a restart use these snapshots, so loading them
+        at once avoids loading them one by one when they are first needed.
+
+        Parameters
+        ----------
+        sample_set : :class:`.SampleSet`
+            the current samples
+        """
+        for sample in sample_set:
+            for snapshot in sample.trajectory:
+                if isinstance(snapshot, LoaderProxy):
+                    snapshot.__subject__
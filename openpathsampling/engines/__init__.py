@@ -8,3 +8,5 @@ import features
 from dynamics_engine import (
     DynamicsEngine, NoEngine, EngineError,
     EngineNaNError, EngineMaxLengthError)
+from pool import EnginePool
+from external_engine import ExternalEngine
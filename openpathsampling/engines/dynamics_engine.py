@@ -7,7 +7,10 @@ Created on 01.07.2014
 
 import logging
 import sys
+import threading
+import Queue
 
+import numpy as np
 import simtk.unit as u
 
 from openpathsampling.netcdfplus import StorableNamedObject
@@ -47,6 +50,66 @@ class EngineNaNError(EngineError):
     pass
 
 
+class FrameProducer(object):
+    """
+    Generates the frames of an engine ahead of time in a worker thread
+
+    Parameters
+    ----------
+    engine : :class:`DynamicsEngine`
+        the engine to run; it must not be used otherwise until
+        :meth:`close` is called
+    queue_size : int
+        maximal number of frames generated ahead
+    """
+
+    def __init__(self, engine, queue_size):
+        self.engine = engine
+        self.queue = Queue.Queue(maxsize=queue_size)
+        self._stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                item = (self.engine.generate_next_frame(), None)
+            except:
+                item = (None, sys.exc_info())
+
+            while not self._stop_event.is_set():
+                try:
+                    self.queue.put(item, timeout=0.05)
+                    break
+                except Queue.Full:
+                    pass
+
+            if item[1] is not None:
+                # the consumer re-raises the error; nothing left to do
+                break
+
+    def next_frame(self):
+        """
+        The next frame, generated in the worker thread
+
+        Errors in the worker thread are raised here.
+        """
+        snapshot, error = self.queue.get()
+        if error is not None:
+            raise error[0], error[1], error[2]
+        return snapshot
+
+    def close(self):
+        """
+        Stop the worker thread and discard all frames not yet used
+        """
+        self._stop_event.set()
+        self.thread.join()
+        while not self.queue.empty():
+            self.queue.get()
+
+
 class DynamicsEngine(StorableNamedObject):
     """
     Wraps simulation tool (parameters, storage, etc.)
@@ -76,6 +139,27 @@ class DynamicsEngine(StorableNamedObject):
         2.  `stop` will stop and return the max length trajectory (default)
         3.  `retry` will rerun the trajectory in engine.generate, these moves
             do not satisfy detailed balance
+    nan_check_interval : int, default: 1
+        how often generated frames are checked for `NaN` using
+        `is_valid_snapshot`. With `1` every frame is checked; with `k > 1`
+        only every k-th frame and with `0` only the final trajectory. If a
+        check fails, the trajectory is rolled back to the last valid frame
+        and treated according to `on_nan`. Since `NaN` does not disappear
+        once it occurs, frames before a valid frame are considered valid.
+        Note that in the deferred modes the `running` conditions may see
+        frames that are not yet checked.
+    async_frames : int, default: 0
+        if larger than zero, frames are generated in a separate thread
+        while the stopping conditions are evaluated. The engine can then be
+        up to `async_frames` frames ahead; these speculative frames are
+        discarded when the trajectory stops. This helps if the engine
+        releases the GIL while integrating (e.g. OpenMM).
+    float32 : bool, default: False
+        if `True`, coordinates and velocities of the snapshots created by
+        the engine are stored as `numpy.float32`, which halves their memory
+        and matches the precision of the storage. Engines still integrate
+        in their own precision and upcast snapshots when loading them. See
+        :attr:`snapshot_dtype`.
     retries_when_nan : int, default: 2
         the number of retries (if chosen) before an exception is raised
     retries_when_error : int, default: 2
@@ -105,6 +189,9 @@ class DynamicsEngine(StorableNamedObject):
         'n_frames_max': None,
         'on_max_length': 'fail',
         'on_nan': 'fail',
+        'nan_check_interval': 1,
+        'async_frames': 0,
+        'float32': False,
         'retries_when_nan': 2,
         'retries_when_error': 0,
         'retries_when_max_length': 0,
@@ -120,6 +207,13 @@ class DynamicsEngine(StorableNamedObject):
 
     base_snapshot_type = BaseSnapshot
 
+    # set while several MC steps run in threads: the lock that the running
+    # step holds, released only while frames are integrated
+    _step_lock = None
+
+    # set for duplicates: the original engine, see `snapshot_engine`
+    _snapshot_engine = None
+
     def __init__(self, options=None, descriptor=None):
         """
         Create an empty DynamicsEngine object
@@ -147,12 +241,54 @@ class DynamicsEngine(StorableNamedObject):
     def current_snapshot(self, snap):
         pass
 
+    @property
+    def snapshot_engine(self):
+        """
+        :class:`DynamicsEngine` : the engine referenced by created snapshots.
+        This is the engine itself, or the original one for a duplicate, so
+        snapshots of a duplicate are stored as if the original had created
+        them. Engines should create snapshots with
+        `engine=self.snapshot_engine`.
+        """
+        if self._snapshot_engine is not None:
+            return self._snapshot_engine
+        else:
+            return self
+
+    @property
+    def snapshot_dtype(self):
+        """
+        numpy.dtype : the type of coordinates and velocities in snapshots
+
+        This is `numpy.float32` if the `float32` option is set and
+        `numpy.float64` otherwise.
+        """
+        if self.options.get('float32', False):
+            return np.dtype(np.float32)
+        else:
+            return np.dtype(np.float64)
+
     def to_dict(self):
         return {
             'options': self.options,
             'descriptor': self.descriptor
         }
 
+    def duplicate(self):
+        """
+        Create an equivalent engine with its own internal state
+
+        The duplicate uses the same options, but can run independently of
+        this engine, e.g. in an :class:`openpathsampling.engines.EnginePool`.
+
+        Returns
+        -------
+        :class:`DynamicsEngine`
+        """
+        new_engine = self.from_dict(self.to_dict())
+        new_engine._snapshot_engine = self.snapshot_engine
+        return new_engine
+
     def _check_options(self, options=None):
         """
         This will register all variables in the options dict as a member
@@ -324,6 +460,19 @@ class DynamicsEngine(StorableNamedObject):
         # """
         # return item
 
+    def _unlocked(self, next_frame):
+        # let other steps run while this engine integrates a frame
+        lock = self._step_lock
+
+        def unlocked_next_frame():
+            lock.release()
+            try:
+                return next_frame()
+            finally:
+                lock.acquire()
+
+        return unlocked_next_frame
+
     def start(self, snapshot=None):
         if snapshot is not None:
             self.current_snapshot = snapshot
@@ -366,7 +515,8 @@ class DynamicsEngine(StorableNamedObject):
 
         return stop
 
-    def generate(self, snapshot, running=None, direction=+1):
+    def generate(self, snapshot, running=None, direction=+1,
+                 max_length=None):
         r"""
         Generate a trajectory consisting of ntau segments of tau_steps in
         between storage of Snapshots.
@@ -384,6 +534,11 @@ class DynamicsEngine(StorableNamedObject):
             momenta of the given snapshot and then prepending generated
             snapshots with reversed momenta. This will generate a _reversed_
             trajectory that effectively ends in the initial snapshot
+        max_length : int or None
+            an additional hard limit on the number of frames. If it is
+            shorter than `n_frames_max`, exceeding it always raises an
+            :class:`EngineMaxLengthError`, independent of `on_max_length`.
+            Movers use this to abort trials that cannot be accepted anyway.
 
         Returns
         -------    
@@ -399,12 +554,20 @@ class DynamicsEngine(StorableNamedObject):
         """
 
         trajectory = None
+        n_frames_max = self.options['n_frames_max']
+        on_max_length = None
+        if max_length is not None and (not n_frames_max
+                                       or max_length < n_frames_max):
+            n_frames_max = max_length
+            on_max_length = 'fail'
+
         it = self.iter_generate(
             snapshot,
             running,
             direction,
             intervals=0,
-            max_length=self.options['n_frames_max'])
+            max_length=n_frames_max,
+            on_max_length=on_max_length)
 
         for trajectory in it:
             pass
@@ -412,7 +575,7 @@ class DynamicsEngine(StorableNamedObject):
         return trajectory
 
     def iter_generate(self, initial, running=None, direction=+1,
-                      intervals=10, max_length=0):
+                      intervals=10, max_length=0, on_max_length=None):
         r"""
         Return a generator that will generate a trajectory, returning the
         current trajectory in given intervals
@@ -438,6 +601,9 @@ class DynamicsEngine(StorableNamedObject):
         max_length : int
             will limit the simulation length to a number of steps. Default is
             `0` which will run unlimited
+        on_max_length : str or None
+            overrides the engine's `on_max_length` option for this run. If
+            `None` (default) the engine option is used
 
         Yields
         ------
@@ -501,9 +667,6 @@ class DynamicsEngine(StorableNamedObject):
                 # backward simulation needs reversed snapshots
                 self.current_snapshot = trajectory[0].reversed
 
-            logger.info("Starting trajectory")
-            self.start()
-
             frame = 0
             # maybe we should stop before we even begin?
             stop = self.stop_conditions(trajectory=trajectory,
@@ -514,88 +677,152 @@ class DynamicsEngine(StorableNamedObject):
             has_nan = False
             has_error = False
 
-            while not stop:
-                if intervals > 0 and frame % intervals == 0:
-                    # return the current status
-                    logger.info("Through frame: %d", frame)
-                    yield trajectory
+            # generated frames that have not yet been checked for NaN
+            nan_check_interval = self.nan_check_interval
+            unchecked = []
 
-                elif frame % log_rate == 0:
-                    logger.info("Through frame: %d", frame)
+            producer = None
+            next_frame = self.generate_next_frame
 
-                # Do integrator x steps
-
-                snapshot = None
+            logger.info("Starting trajectory")
+            self.start()
 
-                try:
-                    with DelayedInterrupt():
-                        snapshot = self.generate_next_frame()
+            # set once the loop is left normally; otherwise the engine is
+            # stopped right away, see the `finally` below
+            finished = False
+            try:
+                if self.async_frames > 0 and not stop:
+                    producer = FrameProducer(self, self.async_frames)
+                    next_frame = producer.next_frame
+
+                if self._step_lock is not None:
+                    next_frame = self._unlocked(next_frame)
+
+                while not stop:
+                    if intervals > 0 and frame % intervals == 0:
+                        # return the current status
+                        logger.info("Through frame: %d", frame)
+                        yield trajectory
+
+                    elif frame % log_rate == 0:
+                        logger.info("Through frame: %d", frame)
+
+                    # Do integrator x steps
+
+                    snapshot = None
+
+                    try:
+                        with DelayedInterrupt():
+                            snapshot = next_frame()
+                            unchecked.append(snapshot)
+
+                            # if self.on_nan != 'ignore' and \
+                            if 0 < nan_check_interval <= len(unchecked):
+                                n_valid = self._n_valid_frames(unchecked)
+                                if n_valid < len(unchecked):
+                                    # the current snapshot is not yet added
+                                    self._remove_frames(
+                                        trajectory,
+                                        len(unchecked) - 1 - n_valid,
+                                        direction)
+                                    has_nan = True
+                                    break
+
+                                unchecked = []
+
+                    except KeyboardInterrupt as e:
+                        # make sure we will report the last state for
+                        logger.info(
+                            'Keyboard interrupt. Shutting down simulation')
+                        final_error = e
+                        break
 
-                        # if self.on_nan != 'ignore' and \
-                        if not self.is_valid_snapshot(snapshot):
+                    except:
+                        # any other error we start a retry
+                        e = sys.exc_info()
+                        errors.append(e)
+                        se = str(e).lower()
+                        if 'nan' in se and \
+                                ('particle' in se or 'coordinates' in se):
+                            # this cannot be ignored, we cannot continue!
                             has_nan = True
                             break
+                        else:
+                            has_error = True
+                            break
 
-                except KeyboardInterrupt as e:
-                    # make sure we will report the last state for
-                    logger.info('Keyboard interrupt. Shutting down simulation')
-                    final_error = e
-                    break
-
-                except:
-                    # any other error we start a retry
-                    e = sys.exc_info()
-                    errors.append(e)
-                    se = str(e).lower()
-                    if 'nan' in se and \
-                            ('particle' in se or 'coordinates' in se):
-                        # this cannot be ignored because we cannot continue!
-                        has_nan = True
-                        break
+                    frame += 1
+
+                    # Store snapshot and add it to the trajectory.
+                    # Stores also final frame the last time
+                    if direction > 0:
+                        trajectory.append(snapshot)
+                    elif direction < 0:
+                        trajectory.insert(0, snapshot.reversed)
+
+                    if 0 < max_length < len(trajectory):
+                        # hit the max length criterion
+                        on = on_max_length or self.on_max_length
+                        del trajectory[-1]
+                        if unchecked:
+                            unchecked.pop()
+
+                        if on == 'fail':
+                            final_error = EngineMaxLengthError(
+                                'Hit maximal length of %d frames.' %
+                                max_length,
+                                trajectory
+                            )
+                            break
+                        elif on == 'stop':
+                            logger.info('Trajectory hit max length. Stopping.')
+                            # fail gracefully
+                            stop = True
+                        elif on == 'retry':
+                            attempt_max_length += 1
+                            if attempt_max_length > \
+                                    self.retries_when_max_length:
+                                if self.on_nan == 'fail':
+                                    final_error = EngineMaxLengthError(
+                                        'Failed to generate trajectory '
+                                        'without hitting max length after '
+                                        '%d attempts' % attempt_max_length,
+                                        trajectory)
+                                    break
+
+                    if stop is False:
+                        # Check if we should stop. If not, continue simulation
+                        stop = self.stop_conditions(trajectory=trajectory,
+                                                continue_conditions=running)
+
+                finished = True
+            finally:
+                if producer is not None:
+                    # discard frames generated ahead and bring the engine
+                    # back to the last frame we use
+                    producer.close()
+                    if direction > 0:
+                        self.current_snapshot = trajectory[-1]
                     else:
-                        has_error = True
-                        break
-
-                frame += 1
-
-                # Store snapshot and add it to the trajectory.
-                # Stores also final frame the last time
-                if direction > 0:
-                    trajectory.append(snapshot)
-                elif direction < 0:
-                    trajectory.insert(0, snapshot.reversed)
-
-                if 0 < max_length < len(trajectory):
-                    # hit the max length criterion
-                    on = self.on_max_length
-                    del trajectory[-1]
-
-                    if on == 'fail':
-                        final_error = EngineMaxLengthError(
-                            'Hit maximal length of %d frames.' %
-                            self.options['n_frames_max'],
-                            trajectory
-                        )
-                        break
-                    elif on == 'stop':
-                        logger.info('Trajectory hit max length. Stopping.')
-                        # fail gracefully
-                        stop = True
-                    elif on == 'retry':
-                        attempt_max_length += 1
-                        if attempt_max_length > self.retries_when_max_length:
-                            if self.on_nan == 'fail':
-                                final_error = EngineMaxLengthError(
-                                    'Failed to generate trajectory without '
-                                    'hitting max length after %d attempts' %
-                                    attempt_max_length,
-                                    trajectory)
-                                break
-
-                if stop is False:
-                    # Check if we should stop. If not, continue simulation
-                    stop = self.stop_conditions(trajectory=trajectory,
-                                            continue_conditions=running)
+                        self.current_snapshot = trajectory[0].reversed
+
+                if not finished:
+                    # a stopping condition raised or the generation was
+                    # interrupted or abandoned: do not leave the engine
+                    # running, e.g. the process of an external engine
+                    self.stop(trajectory)
+
+            if unchecked and not has_nan and not has_error and (
+                    final_error is None or
+                    isinstance(final_error, EngineMaxLengthError)):
+                # deferred check of the remaining frames
+                n_valid = self._n_valid_frames(unchecked)
+                if n_valid < len(unchecked):
+                    self._remove_frames(trajectory,
+                                        len(unchecked) - n_valid,
+                                        direction)
+                    has_nan = True
+                    final_error = None
 
             if has_nan:
                 on = self.on_nan
@@ -644,6 +871,31 @@ class DynamicsEngine(StorableNamedObject):
     def generate_next_frame(self):
         raise NotImplementedError('Next frame generation must be implemented!')
 
+    def _n_valid_frames(self, snapshots):
+        """
+        Number of leading snapshots in `snapshots` that are valid
+
+        Only the last snapshot is checked unless it is invalid; then the
+        first invalid snapshot is searched for.
+        """
+        if not snapshots or self.is_valid_snapshot(snapshots[-1]):
+            return len(snapshots)
+
+        for idx, snapshot in enumerate(snapshots[:-1]):
+            if not self.is_valid_snapshot(snapshot):
+                return idx
+
+        return len(snapshots) - 1
+
+    @staticmethod
+    def _remove_frames(trajectory, n_frames, direction):
+        # remove the `n_frames` most recently generated frames
+        if n_frames > 0:
+            if direction > 0:
+                del trajectory[-n_frames:]
+            else:
+                del trajectory[:n_frames]
+
     def generate_n_frames(self, n_frames=1):
         """Generates n_frames, from but not including the current snapshot.
         
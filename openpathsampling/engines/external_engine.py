@@ -0,0 +1,226 @@
+"""
+Base class for engines that run an external MD code in its own process.
+"""
+
+import errno
+import logging
+import os
+import shlex
+import subprocess
+import time
+
+from dynamics_engine import DynamicsEngine
+
+logger = logging.getLogger(__name__)
+
+
+class ExternalEngine(DynamicsEngine):
+    """
+    Generates trajectories by running an external executable
+
+    For each trajectory the initial snapshot is written to an input file and
+    the executable is started. It writes frames to an output file, which is
+    polled for new frames. As soon as the stopping conditions are met the
+    process is terminated, so the external code runs at full native speed
+    and OPS only has to look at the frames it produces.
+
+    Subclasses need to implement the file exchange with the external code
+    in :meth:`read_frame_from_file` and :meth:`write_frame_to_file` and the
+    command line in :meth:`engine_command`.
+
+    Each trajectory uses the next number for which no input or output file
+    exists in ``engine_directory``, so files of earlier runs or of other
+    engines in the same directory (e.g., the duplicates in an
+    :class:`.EnginePool`) are never overwritten.
+
+    Parameters
+    ----------
+    options : dict
+        the engine options; in addition to the ones of
+        :class:`.DynamicsEngine` these are
+
+        * ``name_prefix`` : str, default: ``'ops_trajectory'``
+            prefix for the names of the input and output files
+        * ``engine_directory`` : str, default: ``''``
+            directory for the input and output files; default is the
+            current directory
+        * ``poll_interval`` : float, default: 0.01
+            seconds to wait before looking for a new frame again
+    descriptor : :class:`.SnapshotDescriptor`
+        the descriptor of the created snapshots
+    first_frame_in_file : bool
+        whether the external code writes the initial frame to the output
+        file as well. If so, that frame is skipped.
+
+    Attributes
+    ----------
+    input_file : str
+        the file the current initial snapshot was written to
+    output_file : str
+        the file the external code writes the current trajectory to
+    """
+
+    _default_options = {
+        'n_frames_max': 10000,
+        'name_prefix': 'ops_trajectory',
+        'engine_directory': '',
+        'poll_interval': 0.01
+    }
+
+    def __init__(self, options, descriptor, first_frame_in_file=False):
+        super(ExternalEngine, self).__init__(options=options,
+                                             descriptor=descriptor)
+        self.first_frame_in_file = first_frame_in_file
+
+        self._current_snapshot = None
+        self._traj_num = -1
+        self.frame_num = None
+        self.input_file = None
+        self.output_file = None
+        self.proc = None
+
+    def to_dict(self):
+        dct = super(ExternalEngine, self).to_dict()
+        dct['first_frame_in_file'] = self.first_frame_in_file
+        return dct
+
+    @property
+    def current_snapshot(self):
+        return self._current_snapshot
+
+    @current_snapshot.setter
+    def current_snapshot(self, snapshot):
+        self._current_snapshot = snapshot
+
+    def file_name(self, traj_num, suffix):
+        """
+        The name of a file for trajectory number `traj_num`
+
+        Parameters
+        ----------
+        traj_num : int
+            the number of the trajectory generated by this engine
+        suffix : str
+            appended to the name, e.g. ``'.in'``
+
+        Returns
+        -------
+        str
+        """
+        return os.path.join(
+            self.engine_directory,
+            self.name_prefix + str(traj_num).zfill(7) + suffix
+        )
+
+    def _next_traj_num(self):
+        # the input file is created right away, so that other engines
+        # looking for a free number at the same time skip this one
+        traj_num = self._traj_num + 1
+        while True:
+            if not os.path.exists(self.file_name(traj_num, '.out')):
+                try:
+                    fd = os.open(self.file_name(traj_num, '.in'),
+                                 os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                except OSError as e:
+                    if e.errno != errno.EEXIST:
+                        raise
+                else:
+                    os.close(fd)
+                    return traj_num
+
+            traj_num += 1
+
+    def start(self, snapshot=None):
+        super(ExternalEngine, self).start(snapshot)
+        self._traj_num = self._next_traj_num()
+        self.frame_num = 1 if self.first_frame_in_file else 0
+        self.input_file = self.file_name(self._traj_num, '.in')
+        self.output_file = self.file_name(self._traj_num, '.out')
+
+        self.write_frame_to_file(self.input_file, self.current_snapshot)
+
+        command = self.engine_command()
+        if isinstance(command, basestring):
+            command = shlex.split(command)
+
+        logger.info("Starting external engine: %s", " ".join(command))
+        self.proc = subprocess.Popen(command)
+
+    def stop(self, trajectory):
+        if self.proc is not None:
+            if self.proc.poll() is None:
+                self.proc.terminate()
+            self.proc.wait()
+            self.proc = None
+        self.cleanup()
+
+    def generate_next_frame(self):
+        next_frame = self.read_frame_from_file(self.output_file,
+                                               self.frame_num)
+        while next_frame is None:
+            if self.proc.poll() is not None:
+                # look once more: the frame might have been written just
+                # before the process ended
+                next_frame = self.read_frame_from_file(self.output_file,
+                                                       self.frame_num)
+                if next_frame is None:
+                    raise RuntimeError(
+                        "External engine stopped with return code %s "
+                        "before frame %d" %
+                        (self.proc.returncode, self.frame_num))
+            else:
+                time.sleep(self.poll_interval)
+                next_frame = self.read_frame_from_file(self.output_file,
+                                                       self.frame_num)
+
+        self.frame_num += 1
+        self.current_snapshot = next_frame
+        return next_frame
+
+    def cleanup(self):
+        """
+        Called after the external process was stopped
+
+        Override this to remove or move the files of the last trajectory.
+        By default the files are kept.
+        """
+        pass
+
+    def read_frame_from_file(self, filename, frame_num):
+        """
+        Read frame `frame_num` from `filename`
+
+        Parameters
+        ----------
+        filename : str
+            the output file of the external code
+        frame_num : int
+            the number of the frame in the file, starting at 0
+
+        Returns
+        -------
+        :class:`.BaseSnapshot` or None
+            the snapshot, or `None` if the frame is not (completely) written
+            yet. The file might not even exist yet.
+        """
+        raise NotImplementedError()
+
+    def write_frame_to_file(self, filename, snapshot):
+        """
+        Write `snapshot` to `filename` as input for the external code
+        """
+        raise NotImplementedError()
+
+    def engine_command(self):
+        """
+        The command to run the external code for the current trajectory
+
+        The names of the files are in :attr:`input_file` and
+        :attr:`output_file`.
+
+        Returns
+        -------
+        str or list of str
+            the command line; a string is split like a shell would do
+        """
+        raise NotImplementedError()
@@ -5,4 +5,4 @@ import kinetics
 import box_vectors
 import topology
 import engine
-from base import attach_features
+from base import attach_features, freeze_array
@@ -4,6 +4,8 @@ import openpathsampling as paths
 
 from collections import namedtuple
 
+import numpy as np
+
 import logging
 
 logger = logging.getLogger(__name__)
@@ -41,9 +43,84 @@ def _snapshot_function_overridden(cls, method):
         return _snapshot_function_overridden(cls.__base__, method)
 
 
+def freeze_array(value):
+    """
+    Return a read-only version of a snapshot array without copying it
+
+    Snapshot arrays are shared by reference between copies and reversed
+    partners, so nobody may change them in place. A writeable array is
+    replaced by a read-only view on the same memory; arrays wrapped in a
+    `simtk.unit.Quantity` are treated the same way. Everything else is
+    returned unchanged.
+
+    Parameters
+    ----------
+    value : numpy.ndarray or simtk.unit.Quantity or None
+        the array to protect
+
+    Returns
+    -------
+    numpy.ndarray or simtk.unit.Quantity or None
+        the read-only array
+    """
+    if isinstance(value, np.ndarray):
+        if value.flags.writeable:
+            value = value.view()
+            value.flags.writeable = False
+
+        return value
+
+    inner = getattr(value, '_value', None)
+    if isinstance(inner, np.ndarray) and inner.flags.writeable:
+        return value.__class__(freeze_array(inner), value.unit)
+
+    return value
+
+
+class LazyNegation(object):
+    """
+    Descriptor for `minus` features of reversed snapshots
+
+    A reversed snapshot does not negate e.g. its velocities on creation.
+    The first access computes the negated array from the reversed partner
+    and stores it in the instance `__dict__`, which takes precedence over
+    this (non-data) descriptor for all further accesses. Forward snapshots
+    have the value in their `__dict__` anyway and never get here.
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+
+        partner = instance._reversed
+        value = getattr(partner, self.name) if partner is not None else None
+        if value is not None:
+            value = freeze_array(- value)
+
+        instance.__dict__[self.name] = value
+        return value
+
+
+def _is_slot(cls, attr):
+    """
+    check if `attr` is stored in a slot of `cls` or any of its super-classes
+    """
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get('__slots__', ())
+        if isinstance(slots, basestring):
+            slots = [slots]
+        if attr in slots:
+            return True
+
+    return False
+
+
 def _register_function(cls, name, code, __features__):
 
     import numpy as np
+    freeze = freeze_array
 
     # compile the code and register the new function
     try:
@@ -349,6 +426,17 @@ def attach_features(features, use_lazy_reversed=False):
         for attr in __features__['lazy']:
             setattr(cls, attr, DelayedLoader())
 
+        # add descriptors that negate minus features of reversed snapshots.
+        # Slots cannot be combined with these, so classes using `__slots__`
+        # negate on creation of the reversed snapshot instead
+        eager_minus = []
+        for attr in __features__['minus']:
+            if attr not in __features__['lazy']:
+                if _is_slot(cls, attr):
+                    eager_minus.append(attr)
+                else:
+                    setattr(cls, attr, LazyNegation(attr))
+
         # update the docstring to be a union of docstrings from the class
         # and the features
 
@@ -395,8 +483,7 @@ def attach_features(features, use_lazy_reversed=False):
                 code += [
                     "    this._lazy = {",
                 ]
-                code.format("       cls.{0} : self._lazy[cls.{0}],",        'lazy', [], ['numpy', 'exclude_copy'])
-                code.format("       cls.{0} : self._lazy[cls.{0}].copy(),", 'lazy', ['numpy'], ['exclude_copy'])
+                code.format("       cls.{0} : self._lazy[cls.{0}],", 'lazy', [], ['exclude_copy'])
                 code += [
                     "    }"
                 ]
@@ -405,13 +492,8 @@ def attach_features(features, use_lazy_reversed=False):
                 "    this._reversed = None"
             ]
 
-            code.format("    this.{0} = self.{0}",          'variables', [], ['lazy', 'numpy', 'exclude_copy'])
-            safe_copy_str  = "    if self.{0} is not None:\n"
-            safe_copy_str += "        this.{0} = self.{0}.copy()\n"
-            safe_copy_str += "    else:\n"
-            safe_copy_str += "        this.{0} = self.{0}"
-            # old_copy_str = "    this.{0} = self.{0}.copy()"
-            code.format(safe_copy_str,   'variables', ['numpy'], ['lazy', 'exclude_copy'])
+            # numpy features are read-only and hence shared, not copied
+            code.format("    this.{0} = self.{0}", 'variables', [], ['lazy', 'exclude_copy'])
 
             code += map(
                 "    self.{0}(this)".format, copy_feats
@@ -441,8 +523,7 @@ def attach_features(features, use_lazy_reversed=False):
                 code += [
                     "    target._lazy = {",
                 ]
-                code.format("       cls.{0} : self._lazy[cls.{0}],",        'lazy', [], ['numpy', 'exclude_copy'])
-                code.format("       cls.{0} : self._lazy[cls.{0}].copy(),", 'lazy', ['numpy'], ['exclude_copy'])
+                code.format("       cls.{0} : self._lazy[cls.{0}],", 'lazy', [], ['exclude_copy'])
                 code += [
                     "    }"
                 ]
@@ -451,11 +532,10 @@ def attach_features(features, use_lazy_reversed=False):
                 "    target._reversed = None"
             ]
 
-            code.format("    target.{0} = self.{0}",              'variables', [], ['lazy', 'numpy', 'exclude_copy'])
-            code.format("    np.copyto(target.{0}, self.{0})",    'variables', ['numpy'], ['lazy', 'exclude_copy'])
+            code.format("    target.{0} = self.{0}", 'variables', [], ['lazy', 'exclude_copy'])
 
             code += map(
-                "    self.{0}(this)".format, copy_feats
+                "    self.{0}(target)".format, copy_feats
             )
 
         # compile the function for .create_reversed()
@@ -498,8 +578,11 @@ def attach_features(features, use_lazy_reversed=False):
                 "    this._reversed = self"
             ]
 
+            # minus features are negated on first access, see `LazyNegation`
             code.format("    this.{0} = self.{0}", 'reversal', [], ['lazy'])
-            code.format("    this.{0} = - self.{0}", 'minus', [], ['lazy'])
+            code += map(
+                "    this.{0} = freeze(- self.{0})".format, eager_minus
+            )
             code.format("    this.{0} = not self.{0}", 'flip', [], ['lazy'])
 
             code += [
@@ -576,8 +659,9 @@ def attach_features(features, use_lazy_reversed=False):
                 "    self._reversed = None"
             ]
 
-            # set non-lazy attributes
-            code.format("    self.{0} = {0}", 'variables', [], ['lazy'])
+            # set non-lazy attributes; numpy features are made read-only
+            code.format("    self.{0} = {0}", 'variables', [], ['lazy', 'numpy'])
+            code.format("    self.{0} = freeze({0})", 'variables', ['numpy'], ['lazy'])
 
         # compile the function for __init__
 
@@ -627,7 +711,7 @@ def attach_features(features, use_lazy_reversed=False):
             ]
 
             code.format("    self.{0} = {0}",          'variables', [], ['lazy', 'numpy'])
-            code.format("    np.copyto(self.{0}, {0})",   'variables', ['numpy'], ['lazy'])
+            code.format("    self.{0} = freeze(np.array({0}))",   'variables', ['numpy'], ['lazy'])
 
         # register (new) __features__ with the class as a namedtuple
         cls.__features__ = FeatureTuple(**__features__)
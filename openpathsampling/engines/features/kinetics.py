@@ -33,13 +33,13 @@ def netcdfplus_init(store):
 @property
 def velocities(self):
     """
-    The velocities in the configuration. If the snapshot is reversed a
-    copy of the original (unreversed) velocities is made which is then
-    returned
+    The velocities in the configuration. If the snapshot is reversed the
+    negated velocities are returned, which are computed only once per
+    :class:`KineticContainer`
     """
     if self.kinetics is not None:
         if self.is_reversed:
-            return -1.0 * self.kinetics.velocities
+            return self.kinetics.reversed_velocities
         else:
             return self.kinetics.velocities
 
@@ -49,7 +49,7 @@ def velocities(self):
 @velocities.setter
 def velocities(self, value):
     if value is not None:
-        kc = KineticContainer(velocities=value)
+        kc = KineticContainer(velocities=value, copy_arrays=False)
     else:
         kc = None
 
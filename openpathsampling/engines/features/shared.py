@@ -4,6 +4,7 @@ import numpy as np
 from simtk import unit as u
 
 from openpathsampling.netcdfplus import StorableObject, ObjectStore, WeakLRUCache
+from base import freeze_array
 
 
 # =============================================================================
@@ -27,7 +28,7 @@ class StaticContainer(StorableObject):
     # Class variables to store the global storage and the system context
     # describing the system to be saved as configuration_indices
 
-    def __init__(self, coordinates, box_vectors):
+    def __init__(self, coordinates, box_vectors, copy_arrays=True):
         """
         Create a simulation configuration from either an OpenMM context or
         individually-specified components.
@@ -36,12 +37,27 @@ class StaticContainer(StorableObject):
         ----------
         coordinates
         box_vectors
+        copy_arrays : bool
+            if `False` the container takes ownership of the given arrays
+            instead of deep-copying them. Only use this for fresh buffers
+            nobody else holds a reference to, e.g. the ones returned from an
+            engine.
+
+        Notes
+        -----
+        The arrays are read-only (see
+        :func:`openpathsampling.engines.features.base.freeze_array`) so
+        that containers can be shared between snapshots.
         """
 
         super(StaticContainer, self).__init__()
 
-        self.coordinates = copy.deepcopy(coordinates)
-        self.box_vectors = copy.deepcopy(box_vectors)
+        if copy_arrays:
+            coordinates = copy.deepcopy(coordinates)
+            box_vectors = copy.deepcopy(box_vectors)
+
+        self.coordinates = freeze_array(coordinates)
+        self.box_vectors = freeze_array(box_vectors)
 
         # if self.coordinates is not None:
         #     # Check for nans in coordinates, and raise an exception if
@@ -76,19 +92,20 @@ class StaticContainer(StorableObject):
 
     def copy(self):
         """
-        Returns a deep copy of the instance itself using a subset of coordinates.
-        If this object is saved it will be stored as a separate object and
-        consume additional memory.
+        Returns a copy of the instance itself. The read-only arrays are
+        shared, but if this object is saved it will be stored as a separate
+        object and consume additional memory.
 
         Returns
         -------
         Configuration()
-            the reduced deep copy
+            the copy
         """
 
         # TODO: Keep old potential_energy? Is not correct but might be useful. Boxvectors are fine!
         return StaticContainer(coordinates=self.coordinates,
-                               box_vectors=self.box_vectors
+                               box_vectors=self.box_vectors,
+                               copy_arrays=False
                                )
 
     def to_dict(self):
@@ -120,7 +137,9 @@ class StaticContainerStore(ObjectStore):
         coordinates = self.vars["coordinates"][idx]
         box_vectors = self.vars["box_vectors"][idx]
 
-        configuration = StaticContainer(coordinates=coordinates, box_vectors=box_vectors)
+        configuration = StaticContainer(coordinates=coordinates,
+                                        box_vectors=box_vectors,
+                                        copy_arrays=False)
 
         return configuration
 
@@ -187,7 +206,7 @@ class KineticContainer(StorableObject):
 
     """
 
-    def __init__(self, velocities):
+    def __init__(self, velocities, copy_arrays=True):
         """
         Create a simulation momentum from either an OpenMM context or
         individually-specified components.
@@ -195,11 +214,38 @@ class KineticContainer(StorableObject):
         Parameters
         ----------
         velocities
+        copy_arrays : bool
+            if `False` the container takes ownership of the given array
+            instead of deep-copying it (see :class:`StaticContainer`)
         """
 
         super(KineticContainer, self).__init__()
 
-        self.velocities = copy.deepcopy(velocities)
+        if copy_arrays:
+            velocities = copy.deepcopy(velocities)
+
+        self.velocities = freeze_array(velocities)
+        self._reversed_velocities = (None, None)
+
+    @property
+    def reversed_velocities(self):
+        """
+        The negated velocities, as used by reversed snapshots
+
+        These are only computed on first access and then shared by all
+        reversed snapshots referencing this container.
+        """
+        source, reversed_velocities = self._reversed_velocities
+        if source is not self.velocities:
+            source = self.velocities
+            if source is None:
+                reversed_velocities = None
+            else:
+                reversed_velocities = freeze_array(-1.0 * source)
+
+            self._reversed_velocities = (source, reversed_velocities)
+
+        return reversed_velocities
 
     # =========================================================================
     # Utility functions
@@ -207,8 +253,9 @@ class KineticContainer(StorableObject):
 
     def copy(self):
         """
-        Returns a deep copy of the instance itself. If saved this object will
-        be stored as a separate object and consume additional memory.
+        Returns a copy of the instance itself. The read-only velocities are
+        shared, but if saved this object will be stored as a separate object
+        and consume additional memory.
 
         Returns
         -------
@@ -216,7 +263,7 @@ class KineticContainer(StorableObject):
             the shallow copy
         """
 
-        this = KineticContainer(velocities=self.velocities)
+        this = KineticContainer(velocities=self.velocities, copy_arrays=False)
 
         return this
 
@@ -243,7 +290,7 @@ class KineticContainerStore(ObjectStore):
     def _load(self, idx):
         velocities = self.vars['velocities'][idx]
 
-        momentum = KineticContainer(velocities=velocities)
+        momentum = KineticContainer(velocities=velocities, copy_arrays=False)
         return momentum
 
     def velocities_as_numpy(self, frame_indices=None, atom_indices=None):
@@ -48,7 +48,8 @@ def coordinates(snapshot):
 @coordinates.setter
 def coordinates(self, value):
     if value is not None:
-        sc = StaticContainer(coordinates=value, box_vectors=self.box_vectors)
+        sc = StaticContainer(coordinates=value, box_vectors=self.box_vectors,
+                             copy_arrays=False)
     else:
         sc = None
 
@@ -73,7 +74,8 @@ def box_vectors(snapshot):
 @box_vectors.setter
 def box_vectors(self, value):
     if value is not None:
-        sc = StaticContainer(box_vectors=value, coordinates=self.coordinates)
+        sc = StaticContainer(box_vectors=value, coordinates=self.coordinates,
+                             copy_arrays=False)
     else:
         sc = None
 
@@ -12,6 +12,18 @@ import numpy as np
 logger = logging.getLogger(__name__)
 
 
+def _as_dtype(quantity, dtype):
+    """Return a quantity with numpy array values of type `dtype`
+
+    The quantity itself is returned if its values are of that type already
+    or are not a numpy array.
+    """
+    value = getattr(quantity, '_value', None)
+    if not isinstance(value, np.ndarray) or value.dtype == dtype:
+        return quantity
+    return u.Quantity(value.astype(dtype), quantity.unit)
+
+
 class OpenMMEngine(DynamicsEngine):
     """OpenMM dynamics engine based on 'simtk.openmm` system and integrator.
 
@@ -106,6 +118,52 @@ class OpenMMEngine(DynamicsEngine):
 
         self._simulation = None
 
+        # separate context only used by `apply_constraints_batch`
+        self._constraint_context = None
+
+    def duplicate(self, platform=None, openmm_properties=None):
+        """
+        Create an engine for the same system with its own OpenMM context
+
+        The duplicate uses a copy of the integrator (an integrator can only
+        be bound to a single context) and the same options. Snapshots it
+        creates refer to this engine, so they are stored as if this engine
+        had generated them.
+
+        Parameters
+        ----------
+        platform : str or `simtk.openmm.Platform` or None
+            if given, the context of the duplicate is created right away
+            using this platform
+        openmm_properties : dict or None
+            platform properties for the duplicate, e.g. `{'Threads': '2'}`
+            to use a separate set of CPU threads. If `None` the properties
+            of this engine are used
+
+        Returns
+        -------
+        :class:`OpenMMEngine`
+        """
+        if openmm_properties is None:
+            openmm_properties = self.openmm_properties
+
+        integrator = simtk.openmm.XmlSerializer.deserialize(
+            simtk.openmm.XmlSerializer.serialize(self.integrator))
+
+        new_engine = OpenMMEngine(
+            self.topology,
+            self.system,
+            integrator,
+            openmm_properties=openmm_properties,
+            options=self.options)
+
+        new_engine._snapshot_engine = self.snapshot_engine
+
+        if platform is not None:
+            new_engine.initialize(platform)
+
+        return new_engine
+
     def from_new_options(
             self,
             integrator=None,
@@ -203,6 +261,7 @@ class OpenMMEngine(DynamicsEngine):
 
         logger.info('Removed existing OpenMM engine.')
         self._simulation = None
+        self._constraint_context = None
 
     def unload_context(self):
         """
@@ -216,6 +275,8 @@ class OpenMMEngine(DynamicsEngine):
             del self._simulation.context
             self._simulation = None
 
+        self._constraint_context = None
+
     def initialize(self, platform=None):
         """
         Create the final OpenMMEngine
@@ -337,20 +398,48 @@ class OpenMMEngine(DynamicsEngine):
 
     def _build_current_snapshot(self):
         # TODO: Add caching for this and mark if changed
-
-        state = self.simulation.context.getState(getPositions=True,
-                                                 getVelocities=True,
-                                                 getEnergy=True)
+        return self._snapshot_from_context(self.simulation.context)
+
+    def _snapshot_from_context(self, context):
+        # energies are not part of the snapshot; requesting them would
+        # force an extra force evaluation for every frame
+        state = context.getState(getPositions=True, getVelocities=True)
+
+        # the arrays from `state` are fresh copies owned by nobody else, so
+        # the containers do not need to copy them again
+        dtype = self.snapshot_dtype
+        statics = Snapshot.StaticContainer(
+            coordinates=_as_dtype(state.getPositions(asNumpy=True), dtype),
+            box_vectors=_as_dtype(state.getPeriodicBoxVectors(asNumpy=True),
+                                  dtype),
+            copy_arrays=False
+        )
+        kinetics = Snapshot.KineticContainer(
+            velocities=_as_dtype(state.getVelocities(asNumpy=True), dtype),
+            copy_arrays=False
+        )
 
         snapshot = Snapshot.construct(
-            coordinates=state.getPositions(asNumpy=True),
-            box_vectors=state.getPeriodicBoxVectors(asNumpy=True),
-            velocities=state.getVelocities(asNumpy=True),
-            engine=self
+            statics=statics,
+            kinetics=kinetics,
+            engine=self.snapshot_engine
         )
 
         return snapshot
 
+    @staticmethod
+    def _load_into_context(context, snapshot):
+        # OpenMM works in double precision; float32 snapshots are upcast
+        # explicitly here instead of relying on the conversion of each value
+        context.setPositions(_as_dtype(snapshot.coordinates, np.float64))
+        box_vectors = _as_dtype(snapshot.box_vectors, np.float64)
+        context.setPeriodicBoxVectors(
+            box_vectors[0],
+            box_vectors[1],
+            box_vectors[2]
+        )
+        context.setVelocities(_as_dtype(snapshot.velocities, np.float64))
+
     @staticmethod
     def is_valid_snapshot(snapshot):
         if np.isnan(np.min(snapshot.coordinates._value)):
@@ -376,21 +465,10 @@ class OpenMMEngine(DynamicsEngine):
         self.check_snapshot_type(snapshot)
 
         if snapshot is not self._current_snapshot:
-            # if snapshot.coordinates is not None:
-            self.simulation.context.setPositions(snapshot.coordinates)
-
-            # if snapshot.box_vectors is not None:
-            self.simulation.context.setPeriodicBoxVectors(
-                snapshot.box_vectors[0],
-                snapshot.box_vectors[1],
-                snapshot.box_vectors[2]
-            )
-
-            # if snapshot.velocities is not None:
-            self.simulation.context.setVelocities(snapshot.velocities)
+            self._load_into_context(self.simulation.context, snapshot)
 
             # After the updates cache the new snapshot
-            if snapshot.engine is self:
+            if snapshot.engine is self.snapshot_engine:
                 # no need for copy if this snap is from this engine
                 self._current_snapshot = snapshot
             else:
@@ -427,21 +505,79 @@ class OpenMMEngine(DynamicsEngine):
         :class:`.Snapshot`
             the snapshot after the constraints have been applied
         """
-        context = self.simulation.context
-        if self._current_snapshot is not None:
-            old_snap = self.current_snapshot
-        else:
-            old_snap = None
-
         if snapshot is not None:
-            self.current_snapshot = snapshot
+            # this leaves the state of the simulation alone
+            return self.apply_constraints_batch(
+                [snapshot],
+                position_tol=position_tol,
+                velocity_tol=velocity_tol
+            )[0]
 
+        context = self.simulation.context
         if position_tol is None:
             position_tol = context.getIntegrator().getConstraintTolerance()
         # default 1e-5 for velocity_tol comes from OpenMM's setVelToTemp
-        context.applyConstraints(position_tol)  
+        context.applyConstraints(position_tol)
         context.applyVelocityConstraints(velocity_tol)
-        result_snap = self.current_snapshot
-        if old_snap is not None:
-            self.current_snapshot = old_snap
-        return result_snap
+        self._current_snapshot = None
+        return self.current_snapshot
+
+    def _get_constraint_context(self):
+        """
+        The scratch context for :meth:`apply_constraints_batch`
+
+        It is created on first use, on the platform of the simulation, with
+        a cheap integrator that carries the constraint tolerance of the
+        engine's integrator. It is never used to integrate.
+        """
+        if self._constraint_context is None:
+            integrator = simtk.openmm.VerletIntegrator(
+                self.integrator.getStepSize())
+            integrator.setConstraintTolerance(
+                self.integrator.getConstraintTolerance())
+            self._constraint_context = simtk.openmm.Context(
+                self.system,
+                integrator,
+                self.simulation.context.getPlatform(),
+                self.openmm_properties
+            )
+
+        return self._constraint_context
+
+    def apply_constraints_batch(self, snapshots, position_tol=None,
+                                velocity_tol=1e-5):
+        """Apply position and velocity constraints to several snapshots.
+
+        All snapshots are passed through a separate scratch context, so the
+        current state of the engine (and its current snapshot) is not
+        touched and there is no need to restore it afterwards.
+
+        Parameters
+        ----------
+        snapshots : list of :class:`.Snapshot`
+            the snapshots to apply this engine's constraints to
+        position_tol : float or None
+            tolerance for position constraints; `None` takes the value from
+            the integrator
+        velocity_tol : float
+            tolerance for velocity constraints; default is 1e-5
+
+        Returns
+        -------
+        list of :class:`.Snapshot`
+            the snapshots after the constraints have been applied, in the
+            order of `snapshots`
+        """
+        context = self._get_constraint_context()
+        if position_tol is None:
+            position_tol = self.integrator.getConstraintTolerance()
+
+        constrained = []
+        for snapshot in snapshots:
+            self.check_snapshot_type(snapshot)
+            self._load_into_context(context, snapshot)
+            context.applyConstraints(position_tol)
+            context.applyVelocityConstraints(velocity_tol)
+            constrained.append(self._snapshot_from_context(context))
+
+        return constrained
@@ -0,0 +1,145 @@
+"""
+A pool of equivalent engines to generate several trajectories at once.
+"""
+
+import logging
+import sys
+import threading
+import Queue
+
+logger = logging.getLogger(__name__)
+
+
+class EnginePool(object):
+    """
+    A set of equivalent engines that can be used concurrently
+
+    Each engine in the pool has its own state (e.g. its own OpenMM context)
+    so that independent trajectories can be generated at the same time.
+    Engines are checked out and returned to the pool, which means that
+    contexts are recycled and not re-created for each trajectory.
+
+    Parameters
+    ----------
+    engines : list of :class:`openpathsampling.engines.DynamicsEngine`
+        the engines in the pool. These should all simulate the same system
+        with the same options, but can, e.g., use different platforms
+
+    Examples
+    --------
+    >>> pool = EnginePool.from_engine(engine, 2)
+    >>> with pool.engine() as eng:
+    ...     traj = eng.generate(snapshot, running=[ensemble.can_append])
+    """
+
+    def __init__(self, engines):
+        self.engines = list(engines)
+        self._available = Queue.Queue()
+        for engine in self.engines:
+            self._available.put(engine)
+
+    @classmethod
+    def from_engine(cls, engine, n_engines):
+        """
+        Create a pool of `n_engines` duplicates of a template engine
+
+        Parameters
+        ----------
+        engine : :class:`openpathsampling.engines.DynamicsEngine`
+            the engine to be duplicated, see
+            :meth:`DynamicsEngine.duplicate`
+        n_engines : int
+            the number of engines in the pool
+
+        Returns
+        -------
+        :class:`EnginePool`
+        """
+        return cls([engine.duplicate() for _ in range(n_engines)])
+
+    def __len__(self):
+        return len(self.engines)
+
+    def acquire(self):
+        """
+        Take an engine out of the pool; blocks until one is available
+
+        Returns
+        -------
+        :class:`openpathsampling.engines.DynamicsEngine`
+        """
+        return self._available.get()
+
+    def release(self, engine):
+        """
+        Return an engine previously obtained by :meth:`acquire`
+        """
+        self._available.put(engine)
+
+    def engine(self):
+        """
+        Context manager that acquires an engine and releases it afterwards
+        """
+        return _PooledEngine(self)
+
+    def map(self, function, items):
+        """
+        Call `function(engine, item)` for all items concurrently
+
+        Each call runs in its own thread with its own engine from the pool.
+        If there are more items than engines, calls wait for an engine to
+        become available.
+
+        Parameters
+        ----------
+        function : callable
+            function of an engine and an item
+        items : list
+            the items to be processed
+
+        Returns
+        -------
+        list
+            the results in the order of `items`. If any of the calls raised
+            an exception, the first one (in the order of `items`) is raised
+            after all calls have finished.
+        """
+        items = list(items)
+        results = [None] * len(items)
+        errors = [None] * len(items)
+
+        def run(idx, item):
+            try:
+                with self.engine() as engine:
+                    results[idx] = function(engine, item)
+            except:
+                errors[idx] = sys.exc_info()
+
+        threads = [
+            threading.Thread(target=run, args=(idx, item))
+            for idx, item in enumerate(items)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for error in errors:
+            if error is not None:
+                raise error[0], error[1], error[2]
+
+        return results
+
+
+class _PooledEngine(object):
+    def __init__(self, pool):
+        self.pool = pool
+        self._engine = None
+
+    def __enter__(self):
+        self._engine = self.pool.acquire()
+        return self._engine
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.pool.release(self._engine)
+        self._engine = None
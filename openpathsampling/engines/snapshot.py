@@ -21,6 +21,10 @@ class BaseSnapshot(StorableObject):
 
     __metaclass__ = abc.ABCMeta
 
+    # subclasses created with `SnapshotFactory(..., use_slots=True)` have no
+    # instance `__dict__`; all other subclasses get one as usual
+    __slots__ = ()
+
     def __init__(self, topology=None):
         """
         Attributes
@@ -108,8 +112,30 @@ class BaseSnapshot(StorableObject):
         return this
 
     def copy_with_replacement(self, **kwargs):
-        cp = self.copy()  # this will copy all, but it is simple
+        """
+        Returns a copy with some features replaced
+
+        The copy shares all other data with this snapshot. The new values
+        are not copied either: the snapshot takes ownership of them, so do
+        not change them in place afterwards.
+
+        Parameters
+        ----------
+        kwargs
+            the features to be replaced and their new values
+
+        Returns
+        -------
+        :class:`openpathsampling.BaseSnapshot`
+            the modified copy
+        """
+        cp = self.copy()  # this shares all data, so it is cheap
+        features = getattr(self, '__features__', None)
+        numpy_features = features.numpy if features is not None else []
         for key, value in kwargs.iteritems():
+            if key in numpy_features:
+                value = feats.freeze_array(value)
+
             if hasattr(cp, key):
                 setattr(cp, key, value)
             else:
@@ -129,7 +155,8 @@ def SnapshotFactory(
         features,
         description=None,
         use_lazy_reversed=False,
-        base_class=None):
+        base_class=None,
+        use_slots=False):
     """
     Helper to create a new Snapshot class
     
@@ -150,6 +177,14 @@ def SnapshotFactory(
     base_class : :obj:`openpathsampling.BaseSnapshot`
         The base class the Snapshot is derived from.
         Default is the `BaseSnapshot` class.
+    use_slots : bool
+        if `True` the class uses `__slots__` with one slot per (non-lazy)
+        feature instead of a `__dict__` per instance. This saves memory and
+        makes attribute access a little faster, which helps if millions of
+        small snapshots are kept in memory. The base classes have to use
+        `__slots__` as well (`BaseSnapshot` does), otherwise instances still
+        get a `__dict__`. Arbitrary attributes cannot be added to instances
+        and reversed snapshots negate their velocities on creation.
 
     Returns
     -------
@@ -163,7 +198,17 @@ def SnapshotFactory(
     if type(base_class) is not tuple:
         base_class = (base_class,)
 
-    cls = type(name, base_class, {})
+    attributes = {}
+    if use_slots:
+        # slots have to be known when the class is created, so we let a
+        # throw-away class collect the features first
+        template = feats.attach_features(
+            features,
+            use_lazy_reversed=use_lazy_reversed)(type(name, base_class, {}))
+        attributes['__slots__'] = _snapshot_slots(
+            template.__features__, base_class, use_lazy_reversed)
+
+    cls = type(name, base_class, attributes)
     if description is not None:
         cls.__doc__ = description
 
@@ -174,6 +219,48 @@ def SnapshotFactory(
     return cls
 
 
+def _snapshot_slots(features, base_classes, use_lazy_reversed):
+    """
+    The names of the `__slots__` a snapshot class with `features` needs
+
+    Parameters
+    ----------
+    features : :obj:`openpathsampling.engines.features.base.FeatureTuple`
+        the `__features__` of the snapshot class
+    base_classes : tuple of class
+        the base classes; slots these already have are not repeated
+    use_lazy_reversed : bool
+        if `True` `_reversed` is handled by a descriptor and needs no slot
+
+    Returns
+    -------
+    list of str
+    """
+    names = [attr for attr in features.variables if attr not in features.lazy]
+
+    if features.lazy or use_lazy_reversed:
+        names.append('_lazy')
+
+    if not use_lazy_reversed:
+        names.append('_reversed')
+
+    names.append('__uuid__')
+
+    existing = set()
+    for base in base_classes:
+        for klass in base.__mro__:
+            slots = klass.__dict__.get('__slots__', ())
+            if isinstance(slots, basestring):
+                slots = [slots]
+            existing.update(slots)
+
+    if not any(hasattr(base, '__weakref__') for base in base_classes):
+        # needed for the weak caches used in storage
+        names.append('__weakref__')
+
+    return [name for name in names if name not in existing]
+
+
 class SnapshotDescriptor(frozenset, StorableObject):
     def __init__(self, contents):
         StorableObject.__init__(self)
@@ -20,6 +20,10 @@ class ToyEngine(DynamicsEngine):
             'n_steps_per_frame' : int
                 number of integration steps per returned snapshot, default
                 is 10.
+            'float32' : bool
+                whether snapshots store coordinates and velocities in single
+                precision, default is False. The integration always runs in
+                double precision.
 
     topology : :class:`.ToyTopology`
         object which includes masses, potential energy surface, and the
@@ -115,18 +119,20 @@ class ToyEngine(DynamicsEngine):
     def current_snapshot(self):
         snap_pos = self.positions
         snap_vel = self.velocities
+        dtype = self.snapshot_dtype
         return Snapshot(
-            coordinates=np.array([snap_pos]),
-            velocities=np.array([snap_vel]),
-            engine=self
+            coordinates=np.array([snap_pos], dtype=dtype),
+            velocities=np.array([snap_vel], dtype=dtype),
+            engine=self.snapshot_engine
         )
 
     @current_snapshot.setter
     def current_snapshot(self, snap):
         self.check_snapshot_type(snap)
 
-        coords = np.copy(snap.coordinates)
-        vels = np.copy(snap.velocities)
+        # integrate in double precision, even for float32 snapshots
+        coords = np.array(snap.coordinates, dtype=np.float64)
+        vels = np.array(snap.velocities, dtype=np.float64)
         self.positions = coords[0]
         self.velocities = vels[0]
 
@@ -3,6 +3,8 @@
 @author: JH Prinz
 """
 
+import itertools
+
 import numpy as np
 import mdtraj as md
 import simtk.unit as u
@@ -10,6 +12,9 @@ import simtk.unit as u
 from openpathsampling.netcdfplus import StorableObject
 import openpathsampling as paths
 
+# versions are unique over all trajectories, see `Trajectory.content_version`
+_content_versions = itertools.count(1)
+
 # ==============================================================================
 # TRAJECTORY
 # ==============================================================================
@@ -18,10 +23,27 @@ import openpathsampling as paths
 class Trajectory(list, StorableObject):
     """
     Simulation trajectory. Essentially a python list of snapshots
+
+    Attributes
+    ----------
+    max_delta_depth : int
+        trajectories created by slicing and adding remember the trajectories
+        they share frames with (see :meth:`shared_parts`). This limits the
+        length of such chains, which also limits how many older
+        trajectories are kept in memory by a new one.
     """
 
     engine = None
 
+    max_delta_depth = 8
+    max_shared_parts = 4
+
+    # (parent, start, stop, position) for each part of this trajectory
+    # that is a slice `parent[start:stop]`; see `shared_parts`
+    _shared_parts = ()
+    _delta_depth = 0
+    _content_version = 0
+
     def __init__(self, trajectory=None):
         """
         Create a simulation trajectory object
@@ -36,6 +58,7 @@ class Trajectory(list, StorableObject):
         # Initialize list.
         list.__init__(self)
         StorableObject.__init__(self)
+        self._changed()
 
         if trajectory is not None:
             if type(trajectory) is Trajectory:
@@ -43,12 +66,76 @@ class Trajectory(list, StorableObject):
             else:
                 self.extend(trajectory)
 
+    @property
+    def content_version(self):
+        """
+        int : changes whenever the list of snapshots is changed in place
+
+        The number is unique over all trajectories in the process, so
+        together with the UUID it identifies the content of a trajectory
+        without looking at its snapshots. Results computed from a
+        trajectory can be cached with it.
+        """
+        return self._content_version
+
+    def _changed(self):
+        self._content_version = next(_content_versions)
+
     def extend(self, iterable):
+        self._changed()
         if type(iterable) is Trajectory:
             list.extend(self, iterable.iter_proxies())
         else:
             list.extend(self, iterable)
 
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __imul__(self, n):
+        self._changed()
+        return list.__imul__(self, n)
+
+    def append(self, snapshot):
+        self._changed()
+        list.append(self, snapshot)
+
+    def insert(self, index, snapshot):
+        self._changed()
+        list.insert(self, index, snapshot)
+
+    def pop(self, index=-1):
+        self._changed()
+        return list.pop(self, index)
+
+    def remove(self, snapshot):
+        self._changed()
+        list.remove(self, snapshot)
+
+    def reverse(self):
+        self._changed()
+        list.reverse(self)
+
+    def sort(self, *args, **kwargs):
+        self._changed()
+        list.sort(self, *args, **kwargs)
+
+    def __setitem__(self, index, value):
+        self._changed()
+        list.__setitem__(self, index, value)
+
+    def __delitem__(self, index):
+        self._changed()
+        list.__delitem__(self, index)
+
+    def __setslice__(self, i, j, sequence):
+        self._changed()
+        list.__setslice__(self, i, j, sequence)
+
+    def __delslice__(self, i, j):
+        self._changed()
+        list.__delslice__(self, i, j)
+
     def to_dict(self):
         return {
             'snapshots': self.as_proxies()
@@ -191,6 +278,8 @@ class Trajectory(list, StorableObject):
         ret = list.__getslice__(self, *args, **kwargs)
         if type(ret) is list:
             ret = Trajectory(ret)
+            start = slice(*args).indices(len(self))[0]
+            ret._add_shared_parts([(self, start, start + len(ret), 0)])
 
         return ret
 
@@ -333,8 +422,69 @@ class Trajectory(list, StorableObject):
     def __add__(self, other):
         t = Trajectory(self)
         t.extend(other)
+
+        # a trajectory that is derived from others passes on its parts,
+        # otherwise it is a part itself
+        parts = []
+        for traj, offset in [(self, 0), (other, len(self))]:
+            if type(traj) is not Trajectory:
+                continue
+            if traj._shared_parts:
+                parts.extend(
+                    (parent, start, stop, position + offset)
+                    for parent, start, stop, position in traj._shared_parts
+                )
+            else:
+                parts.append((traj, 0, len(traj), offset))
+
+        t._add_shared_parts(parts)
         return t
 
+    def _add_shared_parts(self, parts):
+        parts = [
+            part for part in parts
+            if part[2] > part[1]
+            and part[0]._delta_depth < self.max_delta_depth
+        ]
+        if parts:
+            parts = sorted(list(self._shared_parts) + parts,
+                           key=lambda part: part[1] - part[2])
+            self._shared_parts = parts[:self.max_shared_parts]
+            self._delta_depth = 1 + max(
+                part[0]._delta_depth for part in self._shared_parts)
+
+    def shared_parts(self):
+        """
+        Parts of this trajectory that are slices of other trajectories
+
+        Slicing a trajectory and adding trajectories (e.g. in a shooting
+        move) remembers where the frames come from. Storage uses this to
+        save a trajectory as the difference to one it shares many frames
+        with. Parts are only reported while the frames still agree, e.g.
+        not after the trajectory has been changed in place.
+
+        Returns
+        -------
+        list of tuple
+            `(parent, start, stop, position)` such that
+            ``self[position:position + stop - start]`` are the frames
+            ``parent[start:stop]``; longest parts first
+        """
+        return [
+            part for part in self._shared_parts
+            if self._is_shared_part(*part)
+        ]
+
+    def _is_shared_part(self, parent, start, stop, position):
+        mine = list.__getslice__(self, position, position + stop - start)
+        theirs = list.__getslice__(parent, start, stop)
+        if len(mine) != stop - start or len(theirs) != stop - start:
+            return False
+
+        return all(
+            a is b or a.__uuid__ == b.__uuid__
+            for a, b in zip(mine, theirs))
+
     # ==========================================================================
     # PATH ENSEMBLE FUNCTIONS
     # ==========================================================================
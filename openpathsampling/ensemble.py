@@ -6,6 +6,7 @@ Created on 03.09.2014
 
 import logging
 import itertools
+import collections
 
 from openpathsampling.netcdfplus import StorableNamedObject
 import openpathsampling as paths
@@ -168,6 +169,99 @@ class EnsembleCache(object):
         return reset
 
 
+class EnsembleResultMemo(object):
+    """Bounded memo of the results of full ensemble checks.
+
+    Results are keyed by the UUIDs of the ensemble and the trajectory, and
+    the least recently used entries are dropped when `max_size` is reached.
+    Since trajectories are mutable lists, each entry also records the
+    :attr:`.Trajectory.content_version` of the trajectory; if the
+    trajectory has been changed since the result was stored, the result is
+    recalculated. Trajectories without a UUID or a version (e.g., plain
+    lists) are not memoized.
+
+    Only the UUIDs are stored, so the memo doesn't keep trajectories or
+    ensembles alive. A single, process-wide instance is available as
+    `Ensemble.result_memo`.
+
+    Parameters
+    ----------
+    max_size : int
+        maximum number of results to keep
+
+    Attributes
+    ----------
+    enabled : bool
+        if False, results are always calculated and not stored
+    hits : int
+        number of results taken from the memo
+    misses : int
+        number of results that had to be calculated
+    """
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._results = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._results)
+
+    def __call__(self, ensemble, trajectory):
+        """Result of `ensemble(trajectory)`, using the memo if possible.
+
+        Parameters
+        ----------
+        ensemble : :class:`.Ensemble`
+            the ensemble to check
+        trajectory : :class:`.Trajectory`
+            the trajectory to check
+
+        Returns
+        -------
+        bool
+            whether the trajectory is in the ensemble
+        """
+        content = getattr(trajectory, 'content_version', None)
+        if not self.enabled or content is None:
+            return ensemble(trajectory)
+
+        key = (ensemble.__uuid__, trajectory.__uuid__)
+        try:
+            (stored_content, result) = self._results.pop(key)
+        except KeyError:
+            pass
+        else:
+            if stored_content == content:
+                self.hits += 1
+                self._results[key] = (content, result)
+                return result
+
+        self.misses += 1
+        result = ensemble(trajectory)
+        self._results[key] = (content, result)
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+        return result
+
+    def invalidate(self, trajectory=None):
+        """Remove stored results.
+
+        Parameters
+        ----------
+        trajectory : :class:`.Trajectory` or None
+            if given, only remove results for this trajectory; otherwise
+            remove all results
+        """
+        if trajectory is None:
+            self._results.clear()
+        else:
+            for key in [k for k in self._results
+                        if k[1] == trajectory.__uuid__]:
+                del self._results[key]
+
+
 class Ensemble(StorableNamedObject):
     """
     Path ensemble object.
@@ -192,6 +286,8 @@ class Ensemble(StorableNamedObject):
 
     __metaclass__ = abc.ABCMeta
 
+    result_memo = EnsembleResultMemo()
+
     def __init__(self):
         """
         A path volume defines a set of paths.
@@ -228,6 +324,22 @@ class Ensemble(StorableNamedObject):
     def check(self, trajectory):
         return self(trajectory, trusted=False)
 
+    def memoized_call(self, trajectory):
+        """
+        Return `True` if the trajectory is part of the path ensemble.
+
+        Same as a full (untrusted) call, but the result is taken from
+        `Ensemble.result_memo` if this ensemble has already checked the
+        unchanged trajectory. Use this where the same trajectory is checked
+        repeatedly, e.g., when checking the samples of a sample set.
+
+        Parameters
+        ----------
+        trajectory: :class:`.Trajectory`
+            The trajectory to be checked
+        """
+        return self.result_memo(self, trajectory)
+
     def trajectory_summary(self, trajectory):
         """
         Return dict with info on how this ensemble "sees" the trajectory.
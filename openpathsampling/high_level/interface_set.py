@@ -1,5 +1,6 @@
 import openpathsampling as paths
 import openpathsampling.netcdfplus as netcdfplus
+import numpy as np
 import copy
 
 class InterfaceSet(netcdfplus.StorableNamedObject):
@@ -47,6 +48,75 @@ class InterfaceSet(netcdfplus.StorableNamedObject):
             vlambdas = [None]*len(self.volumes)
         self._lambda_dict = {vol: lmbda 
                              for (vol, lmbda) in zip(self.volumes, vlambdas)}
+        self._set_lambda_array()
+
+    def _set_lambda_array(self):
+        # sorted array of the lambdas in terms of _lambda_coordinates; None
+        # if we can't sort the interfaces
+        self._lambda_array = None
+        if self.lambdas is not None and self.direction != 0:
+            coords = self._lambda_coordinates(self.lambdas)
+            if np.all(np.diff(coords) >= 0):
+                self._lambda_array = coords
+
+    def _lambda_coordinates(self, cv_values):
+        """Map CV values to a coordinate increasing across the interfaces.
+        """
+        return self.direction * np.asarray(cv_values, dtype=float)
+
+    def _checked_lambda_array(self):
+        if self._lambda_array is None:
+            raise RuntimeError("Interface lookup requires lambdas that are "
+                               + "monotonic in the interface direction")
+        return self._lambda_array
+
+    def max_lambda(self, cv_values):
+        """Most extreme CV value in the direction of the interfaces.
+
+        This is the maximum for increasing interfaces and the minimum for
+        decreasing interfaces; for periodic interface sets, it takes the
+        periodic domain into account.
+
+        Parameters
+        ----------
+        cv_values : array-like
+            values of the CV (e.g., for each frame of a trajectory)
+
+        Returns
+        -------
+        float
+            the CV value furthest out through the interfaces; the maximum if
+            the direction is unknown
+        """
+        # needs only the direction, not the lambdas
+        values = np.asarray(cv_values, dtype=float)
+        if self.direction == 0:
+            return np.max(values)
+        return values[np.argmax(self._lambda_coordinates(values))]
+
+    def interface_index(self, cv_values):
+        """Index of the outermost interface that a CV value is beyond.
+
+        A value is beyond an interface if it is strictly past that
+        interface's lambda in the direction of the interface set; a value
+        equal to the lambda is not beyond it. Uses a binary search over the
+        sorted lambdas, and works on arrays.
+
+        Parameters
+        ----------
+        cv_values : float or array-like
+            values of the CV
+
+        Returns
+        -------
+        int or np.ndarray of int
+            index of the outermost interface crossed for each value; -1 if
+            the value is inside the innermost interface
+        """
+        lambda_array = self._checked_lambda_array()
+        return np.searchsorted(lambda_array,
+                               self._lambda_coordinates(cv_values),
+                               side='left') - 1
 
     def get_lambda(self, volume):
         """Lambda (value of the CV) associated with a given interface volume
@@ -315,6 +385,20 @@ class PeriodicVolumeInterfaceSet(GenericVolumeInterfaceSet):
                                                          intersect_with,
                                                          volume_func)
 
+    def _lambda_coordinates(self, cv_values):
+        # distance from the fixed end of the interfaces, measured (in the
+        # direction of the interfaces) within the periodic domain
+        if self.period_min is None or self.period_max is None:
+            return super(PeriodicVolumeInterfaceSet,
+                         self)._lambda_coordinates(cv_values)
+        period = self.period_max - self.period_min
+        values = np.asarray(cv_values, dtype=float)
+        if self.direction > 0:
+            distance = values - np.ravel(self.minvals)[0]
+        else:
+            distance = np.ravel(self.maxvals)[0] - values
+        return distance % period
+
     def to_dict(self):
         dct = super(PeriodicVolumeInterfaceSet, self).to_dict()
         dct['period_min'] = self.period_min
@@ -326,11 +410,12 @@ class PeriodicVolumeInterfaceSet(GenericVolumeInterfaceSet):
         interface_set = PeriodicVolumeInterfaceSet.__new__(
             PeriodicVolumeInterfaceSet
         )
-        interface_set._load_from_dict(dct)
         interface_set.period_min = dct['period_min']
         interface_set.period_max = dct['period_max']
+        interface_set._load_from_dict(dct)
         volume_func = lambda minv, maxv: paths.PeriodicCVDefinedVolume(
-            interface_set.cv, minv, maxv, self.period_min, self.period_max
+            interface_set.cv, minv, maxv, interface_set.period_min,
+            interface_set.period_max
         )
         super(InterfaceSet, interface_set).__init__()
         interface_set._set_volume_func(volume_func)
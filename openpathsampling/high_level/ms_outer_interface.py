@@ -1,5 +1,6 @@
 import openpathsampling as paths
 import openpathsampling.netcdfplus as netcdfplus
+import numpy as np
 
 class MSOuterTISInterface(netcdfplus.StorableNamedObject):
     """
@@ -85,6 +86,37 @@ class MSOuterTISInterface(netcdfplus.StorableNamedObject):
         """
         return self._interface_set_to_lambda[interface_set]
 
+    def interface_index(self, interface_set, cv_values):
+        """
+        Index of the outermost interface crossed, including the MS outer.
+
+        The MS outer interface is treated as one more interface after the
+        last interface of the given interface set, so values beyond the MS
+        outer lambda give `len(interface_set)`. Uses the interface set's
+        (vectorized) :meth:`.InterfaceSet.interface_index`.
+
+        Parameters
+        ----------
+        interface_set : :class:`.InterfaceSet`
+            the interface set in question
+        cv_values : float or array-like
+            values of the interface set's CV
+
+        Returns
+        -------
+        int or np.ndarray of int
+            index of the outermost interface crossed for each value; -1 if
+            the value is inside the innermost interface
+        """
+        index = interface_set.interface_index(cv_values)
+        outer_lambda = self.lambda_for_interface_set(interface_set)
+        if outer_lambda is None:
+            raise RuntimeError("No lambda for the MS outer interface of "
+                               + "this interface set")
+        beyond_outer = (interface_set._lambda_coordinates(cv_values)
+                        > interface_set._lambda_coordinates(outer_lambda))
+        return np.where(beyond_outer, len(interface_set), index)
+
     @staticmethod
     def from_lambdas(interface_sets_lambdas):
         """
@@ -158,11 +158,18 @@ class TISTransition(Transition):
         self._flux = None
         self._rate = None
 
+        # use the interface set's lookup for the max lambda when it knows
+        # the (increasing) order of its lambdas; this also handles periodic
+        # interface sets
+        max_lambda_args = {'orderparameter' : self.orderparameter}
+        if getattr(self.interfaces, 'direction', 0) > 0:
+            max_lambda_args['interfaces'] = self.interfaces
+
         self.hist_args = {} # shortcut to ensemble_histogram_info[].hist_args
         self.ensemble_histogram_info = {
             'max_lambda' : Histogrammer(
                 f=max_lambdas,
-                f_args={'orderparameter' : self.orderparameter},
+                f_args=max_lambda_args,
                 hist_args={}
             ),
             'pathlength' : Histogrammer(
@@ -37,6 +37,8 @@ class MoveChange(TreeMixin, StorableObject):
         self._results = None
         self._trials = None
         self._accepted = None
+        self._canonical = None
+        self._canonical_depth = None
         self.mover = mover
         if subchanges is None:
             self.subchanges = []
@@ -135,12 +137,13 @@ class MoveChange(TreeMixin, StorableObject):
 
         """
         if self._collapsed is None:
-            s = paths.SampleSet([]).apply_samples(self.results)
+            # applying samples in order keeps the last one of each replica
+            last = {samp.replica: samp for samp in self.results}
 
             # keep order just for being thorough
             self._collapsed = [
                 samp for samp in self.results
-                if samp in s
+                if last[samp.replica] is samp
             ]
 
         return self._collapsed
@@ -265,13 +268,46 @@ class MoveChange(TreeMixin, StorableObject):
         >>> change = a.move(sset)
         >>> change.canonical.mover  # returns either Forward or Backward
         """
-        pmc = self
-        while pmc.subchange is not None:
-            if pmc.mover.is_canonical is True:
-                return pmc
-            pmc = pmc.subchange
+        if self._canonical is None:
+            pmc = self
+            if self._canonical_depth is not None:
+                # the depth is known, e.g. from storage
+                for _ in range(self._canonical_depth):
+                    pmc = pmc.subchange
+            else:
+                while pmc.subchange is not None:
+                    if pmc.mover.is_canonical is True:
+                        break
+                    pmc = pmc.subchange
+
+            self._canonical = pmc
 
-        return pmc
+        return self._canonical
+
+    @property
+    def canonical_depth(self):
+        """
+        The number of single-subchange levels above `.canonical`
+
+        This is 0 if the change is its own canonical change. Storage keeps
+        this number, so that `.canonical` of a loaded change does not need
+        to look at the movers of the intermediate changes.
+
+        Returns
+        -------
+        int
+        """
+        if self._canonical_depth is None:
+            depth = 0
+            pmc = self
+            canonical = self.canonical
+            while pmc is not canonical:
+                pmc = pmc.subchange
+                depth += 1
+
+            self._canonical_depth = depth
+
+        return self._canonical_depth
 
     @property
     def description(self):
@@ -413,13 +449,13 @@ class SequentialMoveChange(MoveChange):
     def _get_results(self):
         samples = []
         for subchange in self.subchanges:
-            samples = samples + subchange.results
+            samples.extend(subchange.results)
         return samples
 
     def _get_trials(self):
         samples = []
         for subchange in self.subchanges:
-            samples = samples + subchange.trials
+            samples.extend(subchange.trials)
         return samples
 
     def __str__(self):
@@ -559,8 +595,12 @@ class FilterSamplesMoveChange(SubMoveChange):
     def _get_results(self):
         sample_set = self.subchange.results
 
+        if len(sample_set) == 0:
+            return []
+
         # allow for negative indices to be picked, e.g. -1 is the last sample
-        samples = [ idx % len(sample_set) for idx in self.mover.selected_samples]
+        samples = [sample_set[idx % len(sample_set)]
+                   for idx in self.mover.selected_samples]
 
         return samples
 
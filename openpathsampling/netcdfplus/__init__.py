@@ -1,4 +1,5 @@
 from netcdfplus import NetCDFPlus
+from batch import WriteBatch
 from base import StorableNamedObject, StorableObject, create_to_dict
 from proxy import DelayedLoader, lazy_loading_attributes, LoaderProxy
 from cache import WeakKeyCache, WeakLRUCache, WeakValueCache, MaxCache, \
@@ -1,5 +1,6 @@
 import inspect
 import logging
+import threading
 import weakref
 import uuid
 from types import MethodType
@@ -12,6 +13,9 @@ class StorableObject(object):
 
     """
 
+    # no instance attributes here, so subclasses can use `__slots__`
+    __slots__ = ()
+
     _weak_cache = weakref.WeakKeyDictionary()
     _weak_index = 0L
 
@@ -23,14 +27,17 @@ class StorableObject(object):
     INSTANCE_UUID = list(uuid.uuid1().fields[:-1])
     CREATION_COUNT = 0L
 
+    # objects can be created in several threads at once
+    _creation_lock = threading.Lock()
+
     @staticmethod
     def get_uuid():
-        StorableObject.CREATION_COUNT += 2
+        with StorableObject._creation_lock:
+            StorableObject.CREATION_COUNT += 2
+            count = StorableObject.CREATION_COUNT
+
         return uuid.UUID(
-            fields=tuple(
-                StorableObject.INSTANCE_UUID +
-                [StorableObject.CREATION_COUNT]
-            )
+            fields=tuple(StorableObject.INSTANCE_UUID + [count])
         )
 
     def reverse_uuid(self):
@@ -0,0 +1,277 @@
+"""
+Collect the writes of several saves and write them to the file at once.
+"""
+
+import logging
+
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# marks a position that had no pending value before a write
+_missing = object()
+
+
+class WriteBatch(object):
+    """
+    Collects all writes to some stores and writes them to the file at once
+
+    While a batch is open, objects saved in one of its stores get their
+    index as usual but their values are kept in memory. When the batch is
+    closed with :meth:`commit` the values of each variable are written in
+    as few slices as possible and the file is synced. If the batch is closed
+    with :meth:`rollback` instead, nothing is written and the objects are
+    marked as not saved, so the file never contains only a part of the
+    batch.
+
+    Variables are written in the order they were last written to. Objects
+    referenced by another object are saved before it, so a reference in the
+    file always points to an object that has been written already.
+
+    A batch can be used as a context manager. Nested batches of the same
+    storage are merged into the outermost one. A :meth:`savepoint` marks a
+    position in the batch that :meth:`rollback_to` returns to, so a part of
+    the batch can be dropped while the rest is still written.
+
+    Parameters
+    ----------
+    storage : :class:`openpathsampling.netcdfplus.NetCDFPlus`
+        the storage to write to
+    stores : list of :class:`openpathsampling.netcdfplus.ObjectStore`
+        the stores to collect. These need to use the index reservation of
+        :meth:`ObjectStore.save`
+
+    Notes
+    -----
+    Until the batch is committed the objects are found by their index and
+    in the `index` of their store, but `len(store)` does not include them
+    and reading the netCDF variables directly will not show them.
+    """
+
+    def __init__(self, storage, stores):
+        self.storage = storage
+        self.stores = list(stores)
+        self._prefixes = tuple(store.prefix + '_' for store in self.stores)
+        self._depth = 0
+        self._writes = OrderedDict()
+        self._variables = {}
+        self._objects = {store: {} for store in self.stores}
+        self._log = []
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+
+        return False
+
+    @property
+    def active(self):
+        """
+        bool : whether the batch is open
+        """
+        return self._depth > 0
+
+    def begin(self):
+        """
+        Open the batch so that following saves are collected
+        """
+        if self._depth == 0:
+            if self.storage._batch is not None:
+                raise RuntimeError(
+                    'Storage `%s` has another open batch.' %
+                    self.storage.filename)
+            self.storage._batch = self
+
+        self._depth += 1
+
+    def commit(self):
+        """
+        Close the batch and write everything collected if it is the outermost
+        """
+        self._depth -= 1
+        if self._depth == 0:
+            self.storage._batch = None
+            self.flush()
+
+    def rollback(self):
+        """
+        Close the batch and drop everything collected
+        """
+        self._depth = 0
+        self.storage._batch = None
+        self.discard()
+
+    def savepoint(self):
+        """
+        Mark the current position in the batch
+
+        Returns
+        -------
+        int
+            the savepoint to be passed to :meth:`rollback_to`
+        """
+        return len(self._log)
+
+    def rollback_to(self, savepoint):
+        """
+        Drop everything collected after `savepoint`
+
+        The batch stays open. Objects saved after the savepoint are marked as
+        not saved and their indices are free again.
+
+        Parameters
+        ----------
+        savepoint : int
+            a savepoint returned by :meth:`savepoint` of this batch
+        """
+        while len(self._log) > savepoint:
+            entry = self._log.pop()
+            if entry[0] == 'object':
+                _, store, idx = entry
+                self._drop_object(store, idx)
+            else:
+                _, name, idx, previous = entry
+                writes = self._writes[name]
+                if previous is _missing:
+                    del writes[idx]
+                    if not writes:
+                        del self._writes[name]
+                        del self._variables[name]
+                else:
+                    writes[idx] = previous
+
+    def covers(self, store):
+        """
+        Whether objects saved in `store` are collected by this batch
+        """
+        return store in self._objects
+
+    def covers_variable(self, variable):
+        """
+        Whether writes to the netCDF `variable` are collected by this batch
+        """
+        return variable.name.startswith(self._prefixes)
+
+    def add(self, store, idx, obj):
+        """
+        Register the object `obj` saved at index `idx` of `store`
+
+        The index stays reserved until the batch is closed.
+        """
+        self._objects[store][idx] = obj
+        self._log.append(('object', store, idx))
+
+    def pending_object(self, store, idx):
+        """
+        The object saved at index `idx` of `store` in this batch
+
+        Raises
+        ------
+        KeyError
+            if no such object is waiting to be written
+        """
+        return self._objects[store][idx]
+
+    def write(self, variable, idx, value):
+        """
+        Keep the already converted `value` for position `idx` of `variable`
+        """
+        name = variable.name
+        writes = self._writes.pop(name, None)
+        if writes is None:
+            writes = {}
+            self._variables[name] = variable
+
+        self._log.append(('write', name, idx, writes.get(idx, _missing)))
+        writes[idx] = value
+        # keep the variables in the order of their last write
+        self._writes[name] = writes
+
+    def pending_value(self, variable, idx):
+        """
+        The converted value waiting to be written to `idx` of `variable`
+
+        Raises
+        ------
+        KeyError
+            if no value is waiting to be written
+        """
+        return self._writes[variable.name][idx]
+
+    @staticmethod
+    def _runs(writes):
+        indices = sorted(writes)
+        start = 0
+        for pos in range(1, len(indices) + 1):
+            if pos == len(indices) or indices[pos] != indices[pos - 1] + 1:
+                yield indices[start], [writes[idx]
+                                       for idx in indices[start:pos]]
+                start = pos
+
+    @staticmethod
+    def _write_run(variable, start, values):
+        if len(values) > 1 and isinstance(variable.dtype, np.dtype):
+            stacked = np.asarray(values)
+            if stacked.dtype.kind in 'biuf' and \
+                    stacked.shape[1:] == variable.shape[1:]:
+                variable[start:start + len(values)] = stacked
+                return
+
+        for offset, value in enumerate(values):
+            variable[start + offset] = value
+
+    def _release(self):
+        for store, objects in self._objects.items():
+            for idx in objects:
+                store.release_idx(idx)
+            objects.clear()
+
+        self._writes.clear()
+        self._variables.clear()
+        del self._log[:]
+
+    def _drop_object(self, store, idx):
+        obj = self._objects[store].pop(idx)
+        if obj in store.index:
+            del store.index[obj]
+
+        if hasattr(store, 'cache'):
+            try:
+                del store.cache[idx]
+            except KeyError:
+                pass
+
+        store.release_idx(idx)
+
+    def flush(self):
+        """
+        Write all collected values and sync the file
+        """
+        n_objects = sum(len(objects) for objects in self._objects.values())
+        logger.debug('Writing batch of %d objects' % n_objects)
+
+        for name, writes in self._writes.items():
+            variable = self._variables[name]
+            for start, values in self._runs(writes):
+                self._write_run(variable, start, values)
+
+        self._release()
+        self.storage.sync()
+
+    def discard(self):
+        """
+        Drop all collected values and mark the objects as not saved
+        """
+        for store, objects in self._objects.items():
+            for idx in list(objects):
+                self._drop_object(store, idx)
+
+        self._release()
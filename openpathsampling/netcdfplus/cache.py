@@ -41,6 +41,9 @@ class Cache(object):
     def __setitem__(self, key, value):
         pass
 
+    def __delitem__(self, item):
+        raise KeyError(item)
+
     def get(self, item, default=None):
         """
         get value by key if it exists, None else
@@ -193,6 +196,9 @@ class LRUCache(Cache):
         self._cache[key] = value
         self._check_size_limit()
 
+    def __delitem__(self, item):
+        del self._cache[item]
+
     def _check_size_limit(self):
         while len(self._cache) > self.size_limit:
             self._cache.popitem(last=False)
@@ -282,6 +288,12 @@ class WeakLRUCache(Cache):
         self._cache[key] = value
         self._check_size_limit()
 
+    def __delitem__(self, item):
+        if item in self._cache:
+            del self._cache[item]
+        else:
+            del self._weak_cache[item]
+
     def get_silent(self, item):
         """
         Return item from the without reordering the LRU
@@ -4,6 +4,7 @@ author
 
 import logging
 
+from batch import WriteBatch
 from dictify import StorableObjectJSON, UUIDObjectJSON
 from proxy import LoaderProxy
 
@@ -85,12 +86,17 @@ class NetCDFPlus(netCDF4.Dataset):
             on the variable
         store : openpathsampling.netcdfplus.ObjectStore
             a reference to an object store used for convenience in some cases
+        storage : openpathsampling.netcdfplus.NetCDFPlus
+            the storage of the variable. Single values are kept in its open
+            :class:`WriteBatch` instead of being written, if there is one
 
         """
 
-        def __init__(self, variable, getter=None, setter=None, store=None):
+        def __init__(self, variable, getter=None, setter=None, store=None,
+                     storage=None):
             self.variable = variable
             self.store = store
+            self.storage = storage
 
             if setter is None:
                 setter = lambda v: v
@@ -100,10 +106,33 @@ class NetCDFPlus(netCDF4.Dataset):
                 getter = lambda v: v
             self.getter = getter
 
+        def _batch(self, key):
+            if self.storage is None or \
+                    not isinstance(key, (int, long, np.integer)):
+                return None
+
+            batch = self.storage._batch
+            if batch is not None and batch.covers_variable(self.variable):
+                return batch
+
+            return None
+
         def __setitem__(self, key, value):
-            self.variable[key] = self.setter(value)
+            batch = self._batch(key)
+            if batch is not None:
+                batch.write(self.variable, int(key), self.setter(value))
+            else:
+                self.variable[key] = self.setter(value)
 
         def __getitem__(self, key):
+            batch = self._batch(key)
+            if batch is not None:
+                try:
+                    return self.getter(batch.pending_value(self.variable,
+                                                           int(key)))
+                except KeyError:
+                    pass
+
             return self.getter(self.variable[key])
 
         def __getattr__(self, item):
@@ -403,6 +432,7 @@ class NetCDFPlus(netCDF4.Dataset):
         self._storages_base_cls = {}
         self.vars = dict()
         self.units = dict()
+        self._batch = None
 
     def create_store(self, name, store, register_attr=True):
         """
@@ -598,6 +628,28 @@ class NetCDFPlus(netCDF4.Dataset):
         raise RuntimeWarning("Objects of type '%s' cannot be stored!" %
                              obj.__class__.__name__)
 
+    def batch(self, stores):
+        """
+        A batch that collects the saves to `stores` and writes them at once
+
+        Parameters
+        ----------
+        stores : list of :class:`openpathsampling.netcdfplus.ObjectStore`
+            the stores to collect
+
+        Returns
+        -------
+        :class:`openpathsampling.netcdfplus.WriteBatch`
+            the batch. Open it with `with` or :meth:`WriteBatch.begin`
+
+        Examples
+        --------
+        >>> with storage.batch([storage.samples, storage.steps]):
+        ...     for step in steps:
+        ...         storage.save(step)
+        """
+        return WriteBatch(self, stores)
+
     def __contains__(self, item):
         if type(item) is list:
             # a list of objects will be stored one by one
@@ -1036,7 +1088,7 @@ class NetCDFPlus(netCDF4.Dataset):
                         getter = _get2(lambda v: v)
 
             self.vars[var_name] = \
-                NetCDFPlus.ValueDelegate(var, getter, setter, store)
+                NetCDFPlus.ValueDelegate(var, getter, setter, store, self)
 
         else:
             raise ValueError("Variable '%s' is already taken!" % var_name)
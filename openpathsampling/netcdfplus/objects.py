@@ -778,6 +778,14 @@ class ObjectStore(StorableNamedObject):
         except KeyError:
             pass
 
+        # if it is saved in an open batch, it is not in the file yet
+        batch = self.storage._batch
+        if batch is not None and batch.covers(self):
+            try:
+                return batch.pending_object(self, n_idx)
+            except KeyError:
+                pass
+
         logger.debug(
             'Calling load object of type `%s` @ IDX #%d' %
             (self.content_class.__name__, n_idx))
@@ -933,7 +941,13 @@ class ObjectStore(StorableNamedObject):
             self.release_idx(n_idx)
             raise
 
-        self.release_idx(n_idx)
+        batch = self.storage._batch
+        if batch is not None and batch.covers(self):
+            # keep the idx reserved until the batch is written
+            batch.add(self, n_idx, obj)
+        else:
+            self.release_idx(n_idx)
+
         self._set_id(n_idx, obj)
 
         return self.reference(obj)
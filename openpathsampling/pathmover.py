@@ -7,12 +7,14 @@ Created on 19.07.2014
 
 import abc
 import logging
-import random
+import threading
 
 import numpy as np
 import openpathsampling as paths
 from openpathsampling.netcdfplus import StorableNamedObject, StorableObject
+from openpathsampling.netcdfplus.cache import LRUCache
 from openpathsampling.pathmover_inout import InOutSet, InOut
+from openpathsampling.random_streams import RandomStreamUser, random_choice
 from ops_logging import initialization_logging
 from treelogic import TreeMixin
 
@@ -70,6 +72,81 @@ def make_list_of_pairs(l):
     return outlist
 
 
+class AliasTable(object):
+    """
+    Draws indices with fixed relative weights in constant time
+
+    This uses Walker's alias method: after an O(n) setup every draw needs a
+    single random number, independent of the number of weights.
+
+    Parameters
+    ----------
+    weights : list of float
+        the relative weights (do not need to be normalized). At least one
+        must be positive.
+
+    Attributes
+    ----------
+    total : float
+        the sum of all weights
+    """
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=float)
+        n_weights = len(weights)
+        self.total = weights.sum()
+        if not self.total > 0.0:
+            raise ValueError(
+                "Weights " + repr(list(weights)) + " have no positive sum")
+
+        prob = weights * n_weights / self.total
+        alias = np.arange(n_weights)
+        small = [idx for idx in range(n_weights) if prob[idx] < 1.0]
+        large = [idx for idx in range(n_weights) if prob[idx] >= 1.0]
+        while small and large:
+            low = small.pop()
+            high = large.pop()
+            alias[low] = high
+            prob[high] -= 1.0 - prob[low]
+            if prob[high] < 1.0:
+                small.append(high)
+            else:
+                large.append(high)
+
+        # the remaining ones are only off by rounding errors
+        for idx in small + large:
+            prob[idx] = 1.0
+
+        self.prob = prob.tolist()
+        self.alias = alias.tolist()
+
+    def __len__(self):
+        return len(self.prob)
+
+    def draw(self, rand=None):
+        """
+        Draw an index
+
+        Parameters
+        ----------
+        rand : float or None
+            a uniform random number in [0, 1); if `None` one is drawn from
+            `numpy.random`
+
+        Returns
+        -------
+        int
+        """
+        if rand is None:
+            rand = np.random.random_sample()
+        scaled = rand * len(self.prob)
+        idx = int(scaled)
+        if scaled - idx < self.prob[idx]:
+            return idx
+        else:
+            return self.alias[idx]
+
+
 class SampleNaNError(Exception):
     def __init__(self, message, trial_sample, details):
         super(SampleNaNError, self).__init__(message)
@@ -88,7 +165,7 @@ class MoveChangeNaNError(Exception):
     pass
 
 
-class PathMover(TreeMixin, StorableNamedObject):
+class PathMover(TreeMixin, StorableNamedObject, RandomStreamUser):
     """
     A PathMover is the description of a move in replica space.
     
@@ -362,41 +439,49 @@ class PathMover(TreeMixin, StorableNamedObject):
             the ensembles to pick from
         replicas : list of int or `all`
             the replicas to pick or `'all'` for all
-        """
-        mover_replicas = sample_set.replica_list()
-
-        if replicas == 'all':
-            selected_replicas = sample_set.replica_list()
-        else:
-            selected_replicas = replicas
-
-        reps = list(set(mover_replicas) & set(selected_replicas))
-        rep_samples = []
-        for rep in reps:
-            rep_samples.extend(sample_set.all_from_replica(rep))
-
-        # logger.debug("ensembles = " + str([ensembles]))
-        # logger.debug("self.ensembles = " + str(self.ensembles))
-        if ensembles is None:
-            ensembles = 'all'
 
-        if ensembles == 'all':
-            legal_samples = rep_samples
-        else:
-            ens_samples = []
-            if type(ensembles) is not list:
-                ensembles = [ensembles]
-            for ens in ensembles:
-                # try:
-                #     ens_samples.extend(sample_set.all_from_ensemble(ens[0]))
-                # except TypeError:
-                ens_samples.extend(sample_set.all_from_ensemble(ens))
-            legal_samples = list(set(rep_samples) & set(ens_samples))
+        Returns
+        -------
+        list of `openpathsampling.Sample`
+            the matching samples, looked up in the ensemble and replica
+            dictionaries of `sample_set`. They are ordered by the given
+            ensembles, so a seeded choice among them is reproducible.
+        """
+        # `ensemble == 'all'` would compare the string forms of ensembles
+        all_ensembles = ensembles is None or isinstance(ensembles, str)
+        all_replicas = isinstance(replicas, str)
+        if not all_replicas:
+            replicas = set(replicas)
+
+        # use the indexes of the sample set instead of scanning all samples
+        if all_ensembles:
+            if all_replicas:
+                return list(sample_set.samples)
+
+            return [sample
+                    for rep in sample_set.replica_list() if rep in replicas
+                    for sample in sample_set.all_from_replica(rep)]
+
+        if type(ensembles) is not list:
+            ensembles = [ensembles]
+
+        legal_samples = []
+        seen = set()
+        for ens in ensembles:
+            if ens in seen:
+                continue
+            seen.add(ens)
+            ens_samples = sample_set.all_from_ensemble(ens)
+            if all_replicas:
+                legal_samples.extend(ens_samples)
+            else:
+                legal_samples.extend(sample for sample in ens_samples
+                                     if sample.replica in replicas)
 
         return legal_samples
 
     @staticmethod
-    def select_sample(sample_set, ensembles=None, replicas=None):
+    def select_sample(sample_set, ensembles=None, replicas=None, rng=None):
         """
         Returns one of the legal samples given self.replica and the ensemble
         set in ensembles.
@@ -410,26 +495,45 @@ class PathMover(TreeMixin, StorableNamedObject):
             the ensembles to pick from or `None` for all
         replicas : list of int or None
             the replicas to pick or `None` for all
+        rng : `numpy.random.RandomState` or None
+            the random stream to pick from; `None` uses `numpy.random`
 
         """
+        if rng is None:
+            rng = np.random
         if replicas is None:
             replicas = 'all'
 
-        logger.debug(
-            "replicas: " + str(replicas) + " ensembles: " + repr(ensembles))
-        legal = PathMover.legal_sample_set(sample_set, ensembles, replicas)
-        for sample in legal:
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("replicas: " + str(replicas) +
+                         " ensembles: " + repr(ensembles))
+
+        if replicas == 'all' and ensembles is not None and \
+                not isinstance(ensembles, (str, list)):
+            # the common case: pick directly from the list of the ensemble
+            legal = sample_set.all_from_ensemble(ensembles)
+        else:
+            legal = PathMover.legal_sample_set(sample_set, ensembles,
+                                               replicas)
+
+        if debug:
+            for sample in legal:
+                logger.debug(
+                    "legal: (" + str(sample.replica) +
+                    "," + str(sample.trajectory) +
+                    "," + repr(sample.ensemble) +
+                    ")")
+
+        selected = random_choice(rng, legal)
+
+        if debug:
             logger.debug(
-                "legal: (" + str(sample.replica) +
-                "," + str(sample.trajectory) +
-                "," + repr(sample.ensemble) +
+                "selected sample: (" + str(selected.replica) +
+                "," + str(selected.trajectory) +
+                "," + repr(selected.ensemble) +
                 ")")
-        selected = random.choice(legal)
-        logger.debug(
-            "selected sample: (" + str(selected.replica) +
-            "," + str(selected.trajectory) +
-            "," + repr(selected.ensemble) +
-            ")")
+
         return selected
 
     @abc.abstractmethod
@@ -495,7 +599,7 @@ class SampleMover(PathMover):
         super(SampleMover, self).__init__()
 
     @classmethod
-    def metropolis(cls, trials):
+    def metropolis(cls, trials, rand=None):
         """Implements the Metropolis acceptance for a list of trial samples
 
         The Metropolis uses the .bias for each sample and checks of samples
@@ -507,6 +611,10 @@ class SampleMover(PathMover):
         ----------
         trials : list of openpathsampling.Sample
             the list of all samples to be applied in a change.
+        rand : float or None
+            the random number to compare the acceptance probability to. If
+            `None` (default) a new one is drawn from `numpy.random`. Movers
+            pass a number drawn from their own random stream.
 
         Returns
         -------
@@ -531,7 +639,7 @@ class SampleMover(PathMover):
         # TODO: This isn't right. `bias` should be associated with the 
         # change; not with each individual sample. ~~~DWHS
         for ens, sample in trial_dict.iteritems():
-            valid = ens(sample.trajectory)
+            valid = ens.memoized_call(sample.trajectory)
             if not valid:
                 # one sample not valid reject
                 accepted = False
@@ -540,7 +648,8 @@ class SampleMover(PathMover):
             else:
                 probability *= sample.bias
 
-        rand = random.random()
+        if rand is None:
+            rand = np.random.random_sample()
 
         if rand > probability:
             # rejected
@@ -584,7 +693,8 @@ class SampleMover(PathMover):
         ensembles = self._called_ensembles()
 
         # 2. pick samples from these ensembles
-        samples = [self.select_sample(sample_set, ens) for ens in ensembles]
+        samples = [self.select_sample(sample_set, ens, rng=self.rng)
+                   for ens in ensembles]
 
         try:
             # 3. pass these samples to the generator which might throw
@@ -611,7 +721,7 @@ class SampleMover(PathMover):
             )
 
         # 4. accept/reject
-        accepted, acceptance_details = self._accept(trials)
+        accepted, acceptance_details = self._accept(trials, call_details)
 
         # update details
         kwargs = {}
@@ -649,13 +759,21 @@ class SampleMover(PathMover):
         # Default is that the original samples are returned
         return args
 
-    def _accept(self, trials):
+    def _accept(self, trials, details=None):
         """Function to determine the acceptance of a trial
 
         Defaults to calling the Metropolis acceptance criterion for all returned
-        trial samples. Means all samples most be valid and accepted.
+        trial samples. Means all samples most be valid and accepted. If the
+        details returned by the call already contain a `metropolis_random`
+        (drawn before the trial was generated) it is used for the decision,
+        otherwise it is drawn from the random stream of the mover.
         """
-        return self.metropolis(trials)
+        rand = None
+        if details is not None:
+            rand = details.get('metropolis_random')
+        if rand is None:
+            rand = self.rng.random_sample()
+        return self.metropolis(trials, rand=rand)
 
 
 ###############################################################################
@@ -686,10 +804,19 @@ class EngineMover(SampleMover):
       calls the functions to make the trajectories (depending on the nature
       of the mover). Frequently, this is the only thing to override (two-way
       shooting, shifting).
+
+    If ``reject_early`` is set, the random number for the Metropolis
+    acceptance is drawn before the trial is generated. If the selector can
+    bound the length of an acceptable trial
+    (:meth:`.ShootingPointSelector.max_trial_length`), this bound is passed
+    to the engine as ``max_length`` and trials exceeding it are aborted and
+    rejected right away instead of being run to the end. This does not
+    change the sampled distribution.
     """
 
     default_engine = None
     reject_max_length = True
+    reject_early = False
 
     # this will store the engine attribute for all subclasses as well
     _included_attr = ['_engine']
@@ -730,26 +857,42 @@ class EngineMover(SampleMover):
         initial_trajectory = input_sample.trajectory
         shooting_index = self.selector.pick(initial_trajectory)
 
+        early_details = {}
+        max_length = None
+        if self.reject_early:
+            rand = self.rng.random_sample()
+            max_length = self.selector.max_trial_length(initial_trajectory,
+                                                        rand)
+            early_details['metropolis_random'] = rand
+            if max_length is not None:
+                early_details['max_trial_length'] = max_length
+
         try:
             trial_trajectory, run_details = self._run(initial_trajectory,
-                                                      shooting_index)
+                                                      shooting_index,
+                                                      max_length)
 
         except paths.engines.EngineNaNError as e:
             trial, details = self._build_sample(
                 input_sample, shooting_index, e.last_trajectory, 'nan')
+            details.update(early_details)
 
             raise SampleNaNError('Sample with NaN', trial, details)
 
         except paths.engines.EngineMaxLengthError as e:
             trial, details = self._build_sample(
                 input_sample, shooting_index, e.last_trajectory, 'max_length')
+            details.update(early_details)
 
-            if EngineMover.reject_max_length:
+            if EngineMover.reject_max_length or max_length is not None:
                 raise SampleMaxLengthError('Sample with MaxLength', trial, details)
 
+            run_details = {}
+
         else:
             trial, details = self._build_sample(
                 input_sample, shooting_index, trial_trajectory)
+            details.update(early_details)
 
         trials = [trial]
         details.update(run_details)
@@ -800,24 +943,41 @@ class EngineMover(SampleMover):
 
         return trial, trial_details
 
-    def _make_forward_trajectory(self, trajectory, shooting_index):
+    @staticmethod
+    def _partial_max_length(max_length, n_fixed):
+        # maximal length of a new partial trajectory if `n_fixed` frames of
+        # the trial are already known
+        if max_length is None:
+            return None
+        return max(max_length - n_fixed, 1)
+
+    def _make_forward_trajectory(self, trajectory, shooting_index,
+                                 max_length=None):
         initial_snapshot = trajectory[shooting_index]  # .copy()
         run_f = paths.PrefixTrajectoryEnsemble(self.target_ensemble,
                                                trajectory[0:shooting_index]
                                               ).can_append
-        partial_trajectory = self.engine.generate(initial_snapshot,
-                                                  running=[run_f])
+        partial_trajectory = self.engine.generate(
+            initial_snapshot,
+            running=[run_f],
+            max_length=self._partial_max_length(max_length, shooting_index)
+        )
         trial_trajectory = (trajectory[0:shooting_index] +
                             partial_trajectory)
         return trial_trajectory
 
-    def _make_backward_trajectory(self, trajectory, shooting_index):
+    def _make_backward_trajectory(self, trajectory, shooting_index,
+                                  max_length=None):
         initial_snapshot = trajectory[shooting_index].reversed  # _copy()
         run_f = paths.SuffixTrajectoryEnsemble(self.target_ensemble,
                                                trajectory[shooting_index + 1:]
                                               ).can_prepend
-        partial_trajectory = self.engine.generate(initial_snapshot,
-                                                  running=[run_f])
+        partial_trajectory = self.engine.generate(
+            initial_snapshot,
+            running=[run_f],
+            max_length=self._partial_max_length(
+                max_length, len(trajectory) - shooting_index - 1)
+        )
         trial_trajectory = (partial_trajectory.reversed +
                             trajectory[shooting_index + 1:])
         return trial_trajectory
@@ -830,9 +990,9 @@ class EngineMover(SampleMover):
     def direction(self):
         return 'unknown'
 
-    def _run(self, trajectory, shooting_index):
+    def _run(self, trajectory, shooting_index, max_length=None):
         """Takes initial trajectory and shooting point; return trial
-        trajectory"""
+        trajectory. If `max_length` is given, longer trials are aborted"""
         shoot_str = "Running {sh_dir} from frame {fnum} in [0:{maxt}]"
         logger.info(shoot_str.format(
             fnum=shooting_index,
@@ -842,11 +1002,11 @@ class EngineMover(SampleMover):
 
         if self.direction == "forward":
             trial_trajectory = self._make_forward_trajectory(
-                trajectory, shooting_index
+                trajectory, shooting_index, max_length
             )
         elif self.direction == "backward":
             trial_trajectory = self._make_backward_trajectory(
-                trajectory, shooting_index
+                trajectory, shooting_index, max_length
             )
         else:
             raise RuntimeError("Unknown direction: " + str(self.direction))
@@ -985,11 +1145,11 @@ class ReplicaExchangeMover(SampleMover):
         replica1 = sample1.replica
         replica2 = sample2.replica
 
-        from1to2 = ensemble2(trajectory1)
+        from1to2 = ensemble2.memoized_call(trajectory1)
         logger.debug("trajectory " + repr(trajectory1) +
                      " into ensemble " + repr(ensemble2) +
                      " : " + str(from1to2))
-        from2to1 = ensemble1(trajectory2)
+        from2to1 = ensemble1.memoized_call(trajectory2)
         logger.debug("trajectory " + repr(trajectory2) +
                      " into ensemble " + repr(ensemble1) +
                      " : " + str(from2to1))
@@ -1071,11 +1231,11 @@ class StateSwapMover(SampleMover):
         replica1 = sample1.replica
         replica2 = sample2.replica
 
-        from1to2 = ensemble2(trajectory1)
+        from1to2 = ensemble2.memoized_call(trajectory1)
         logger.debug("trajectory " + repr(trajectory1) +
                      " into ensemble " + repr(ensemble2) +
                      " : " + str(from1to2))
-        from2to1 = ensemble1(trajectory2)
+        from2to1 = ensemble1.memoized_call(trajectory2)
         logger.debug("trajectory " + repr(trajectory2) +
                      " into ensemble " + repr(ensemble1) +
                      " : " + str(from2to1))
@@ -1200,7 +1360,7 @@ class RandomSubtrajectorySelectMover(SubtrajectorySelectMover):
     """
 
     def _choose(self, trajectory_list):
-        return random.choice(trajectory_list), {}
+        return random_choice(self.rng, trajectory_list), {}
 
 
 class FirstSubtrajectorySelectMover(SubtrajectorySelectMover):
@@ -1389,8 +1549,10 @@ class EnsembleHopMover(SampleMover):
         logger.debug("  selected replica: " + str(replica))
         logger.debug("  initial ensemble: " + repr(rep_sample.ensemble))
 
-        logger.info("Hop starts from legal ensemble: "+str(ens_from(trajectory)))
-        logger.info("Hop ends in legal ensemble: "+str(ens_to(trajectory)))
+        logger.info("Hop starts from legal ensemble: "
+                    + str(ens_from.memoized_call(trajectory)))
+        logger.info("Hop ends in legal ensemble: "
+                    + str(ens_to.memoized_call(trajectory)))
 
 
         # TODO: remove this and generalize!!!
@@ -1444,12 +1606,19 @@ class SelectionMover(PathMover):
     ----------
     movers : list of openpathsampling.PathMover
         the PathMovers to choose from
+    alias_cache_size : int
+        the number of different weight lists for which the
+        :class:`AliasTable` is kept
     """
 
+    alias_cache_size = 8
+
     def __init__(self, movers):
         super(SelectionMover, self).__init__()
 
         self.movers = movers
+        self._alias_tables = LRUCache(self.alias_cache_size)
+        self._ensemble_index = None
 
         initialization_logging(init_log, self,
                                entries=['movers'])
@@ -1482,23 +1651,45 @@ class SelectionMover(PathMover):
     def _selector(self, sample_set):
         pass
 
+    def _alias_table(self, weights):
+        # the weights of most selectors do not change between moves, so the
+        # table is built once per list of weights
+        key = tuple(weights)
+        try:
+            return self._alias_tables[key]
+        except KeyError:
+            table = AliasTable(weights)
+            self._alias_tables[key] = table
+            return table
+
+    def _disallowed_movers(self, sample_set):
+        """
+        Indices of the movers with input ensembles missing in `sample_set`
+
+        Uses an index from each input ensemble to the movers that need it,
+        so only the ensembles are looked up and not every mover.
+        """
+        if self._ensemble_index is None:
+            index = {}
+            for idx, mover in enumerate(self.movers):
+                for ens in mover.input_ensembles:
+                    index.setdefault(ens, []).append(idx)
+            self._ensemble_index = index
+
+        disallowed = set()
+        for ens, movers in self._ensemble_index.iteritems():
+            if ens not in sample_set.ensemble_dict:
+                # ens might be required but is not present
+                disallowed.update(movers)
+
+        return disallowed
+
     def move(self, sample_set):
         weights = self._selector(sample_set)
 
-        rand = np.random.random() * sum(weights)
-
-        idx = 0
-        prob = weights[0]
         logger.debug(self.name + " " + str(weights))
-        while prob <= rand and idx < len(weights):
-            idx += 1
-            try:
-                prob += weights[idx]
-            except IndexError as e:
-                msg = ("Attempted to get index " + str(idx) + " from " +
-                       str(repr(weights)) + ": ")
-                e.args = tuple([msg + e.args[0]] + list(e.args[1:]))
-                raise
+        table = self._alias_table(weights)
+        idx = table.draw(self.rng.random_sample())
 
         logger_str = "{name} ({cls}) selecting {mtype} (index {idx})"
         logger.info(logger_str.format(
@@ -1513,7 +1704,7 @@ class SelectionMover(PathMover):
         kwargs = {
             'choice': idx,
             'chosen_mover': mover,
-            'probability': weights[idx] / sum(weights),
+            'probability': weights[idx] / table.total,
             'weights': weights
         }
 
@@ -1581,19 +1772,17 @@ class RandomAllowedChoiceMover(RandomChoiceMover):
         if self.weights is None:
             weights = [1.0] * len(self.movers)
         else:
-            weights = list(self.weights)  # make a copy
+            weights = self.weights
 
         # this is implemented by setting all weights locally to zero that
         # correspond to movers that will potentially fail since the required
         # input ensembles are not present in the sample_set
 
-        present_ensembles = sample_set.ensembles
-
-        for idx, mover in enumerate(self.movers):
-            for ens in mover.input_ensembles:
-                if ens not in present_ensembles:
-                    # ens might be required but is not present
-                    weights[idx] = 0.0
+        disallowed = self._disallowed_movers(sample_set)
+        if disallowed:
+            weights = list(weights)  # make a copy
+            for idx in disallowed:
+                weights[idx] = 0.0
 
         return weights
 
@@ -1616,23 +1805,14 @@ class FirstAllowedMover(SelectionMover):
     """
 
     def _selector(self, sample_set):
-        weights = [1.0] * len(self.movers)
-
-        present_ensembles = sample_set.ensembles
+        weights = [0.0] * len(self.movers)
 
-        found = False
-
-        for idx, mover in enumerate(self.movers):
-            if not found:
-                for ens in mover.input_ensembles:
-                    if ens not in present_ensembles:
-                        # ens might be required but is not present
-                        weights[idx] = 0.0
+        disallowed = self._disallowed_movers(sample_set)
 
-                if weights[idx] > 0.0:
-                    found = True
-            else:
-                weights[idx] = 0.0
+        for idx in range(len(self.movers)):
+            if idx not in disallowed:
+                weights[idx] = 1.0
+                break
 
         return weights
 
@@ -1655,23 +1835,14 @@ class LastAllowedMover(SelectionMover):
     """
 
     def _selector(self, sample_set):
-        weights = [1.0] * len(self.movers)
-
-        present_ensembles = sample_set.ensembles
+        weights = [0.0] * len(self.movers)
 
-        found = False
+        disallowed = self._disallowed_movers(sample_set)
 
-        for idx, mover in reversed(list(enumerate(self.movers))):
-            if not found:
-                for ens in mover.input_ensembles:
-                    if ens not in present_ensembles:
-                        # ens might be required but is not present
-                        weights[idx] = 0.0
-
-                if weights[idx] > 0.0:
-                    found = True
-            else:
-                weights[idx] = 0.0
+        for idx in reversed(range(len(self.movers))):
+            if idx not in disallowed:
+                weights[idx] = 1.0
+                break
 
         return weights
 
@@ -2166,6 +2337,20 @@ class OneWayExtendMover(RandomChoiceMover):
 
 
 class AbstractTwoWayShootingMover(EngineMover):
+    """
+    Base class for two-way shooting
+
+    If an :class:`.EnginePool` is set as ``engine_pool``, the forward and
+    the backward segment are generated at the same time with two engines
+    from the pool. The second segment is speculative: it decides when to
+    stop based on the initial trajectory instead of the first segment.
+    Afterwards it is truncated or continued to where the sequential
+    algorithm would have stopped, so the generated trials follow the same
+    distribution as without the pool.
+    """
+
+    _engine_pool = None
+
     def __init__(self, ensemble, selector, modifier, engine=None):
         super(AbstractTwoWayShootingMover, self).__init__(
             ensemble=ensemble,
@@ -2180,33 +2365,147 @@ class AbstractTwoWayShootingMover(EngineMover):
     def direction(self):  # pragma: no cover
         return 'bidrectional'
 
+    @property
+    def engine_pool(self):
+        """
+        :class:`.EnginePool` or None : engines used to generate the
+        forward and backward segments concurrently
+        """
+        return self._engine_pool
+
+    @engine_pool.setter
+    def engine_pool(self, pool):
+        self._engine_pool = pool
+
     def _make_forward_trajectory(self, trajectory, initial_snapshot,
-                                 shooting_index):
+                                 shooting_index, max_length=None,
+                                 speculative=None):
         fwd_ens = paths.PrefixTrajectoryEnsemble(
             self.target_ensemble,
             trajectory[0:shooting_index]
         )
-        fwd_partial = self.engine.generate(initial_snapshot,
-                                           running=[fwd_ens.can_append])
+        fwd_partial = self._complete_segment(speculative,
+                                             initial_snapshot,
+                                             fwd_ens.can_append,
+                                             max_length)
         return fwd_partial
 
     def _make_backward_trajectory(self, trajectory, initial_snapshot,
-                                  shooting_index):
+                                  shooting_index, max_length=None,
+                                  speculative=None):
         # run backward
         bkwd_ens = paths.SuffixTrajectoryEnsemble(
             self.target_ensemble,
             trajectory[shooting_index + 1:]
         )
-        bkwd_partial = self.engine.generate(initial_snapshot.reversed,
-                                            running=[bkwd_ens.can_prepend])
+        bkwd_partial = self._complete_segment(speculative,
+                                              initial_snapshot.reversed,
+                                              bkwd_ens.can_prepend,
+                                              max_length)
         return bkwd_partial
 
-    def _run(self, trajectory, shooting_index):
+    def _make_speculative_segments(self, trajectory, initial_snapshot,
+                                   shooting_index, max_length=None):
+        """
+        Generate the forward and backward segment concurrently
+
+        Both segments decide when to stop based on `trajectory`. The stopping
+        conditions share the target ensemble with its caches, so they are
+        checked one at a time; only the integration of frames overlaps.
+
+        Returns
+        -------
+        fwd_partial, bkwd_partial : :class:`.Trajectory` or Exception
+            the generated segments or the exception raised while
+            generating them. Both are `None` if there is no engine pool.
+        """
+        if self.engine_pool is None:
+            return None, None
+
+        fwd_ens = paths.PrefixTrajectoryEnsemble(
+            self.target_ensemble,
+            trajectory[0:shooting_index]
+        )
+        bkwd_ens = paths.SuffixTrajectoryEnsemble(
+            self.target_ensemble,
+            trajectory[shooting_index + 1:]
+        )
+        lock = threading.Lock()
+
+        def locked(condition):
+            def running(trajectory, trusted=True):
+                with lock:
+                    return condition(trajectory, trusted)
+            return running
+
+        tasks = [
+            (initial_snapshot, locked(fwd_ens.can_append)),
+            (initial_snapshot.reversed, locked(bkwd_ens.can_prepend))
+        ]
+
+        def generate(engine, task):
+            snapshot, running = task
+            try:
+                return engine.generate(snapshot, running=[running],
+                                       max_length=max_length)
+            except Exception as e:
+                return e
+
+        fwd_partial, bkwd_partial = self.engine_pool.map(generate, tasks)
+        return fwd_partial, bkwd_partial
+
+    def _complete_segment(self, speculative, snapshot, running,
+                          max_length=None):
+        """
+        Return the segment the engine generates from `snapshot`
+
+        Parameters
+        ----------
+        speculative : :class:`.Trajectory` or Exception or None
+            a segment that was generated from `snapshot` with different
+            stopping conditions. It is truncated to where `running` stops
+            or, if `running` would go on, continued by the engine. If it is
+            `None` or an exception, the segment is generated from scratch.
+        snapshot : :class:`.BaseSnapshot`
+            the initial snapshot of the segment
+        running : callable
+            the continue condition of the segment
+        max_length : int or None
+            maximal length of the segment
+
+        Returns
+        -------
+        :class:`.Trajectory`
+        """
+        if speculative is None or isinstance(speculative, Exception):
+            return self.engine.generate(snapshot, running=[running],
+                                        max_length=max_length)
+
+        # replay the checks the engine does while generating
+        segment = paths.Trajectory([speculative[0]])
+        if not running(segment, False):
+            return segment
+
+        for frame in speculative[1:]:
+            segment.append(frame)
+            if max_length is not None and len(segment) > max_length:
+                del segment[-1]
+                raise paths.engines.EngineMaxLengthError(
+                    'Hit maximal length of %d frames.' % max_length,
+                    segment
+                )
+            if not running(segment, True):
+                return segment
+
+        return self.engine.generate(segment, running=[running],
+                                    max_length=max_length)
+
+    def _run(self, trajectory, shooting_index, max_length=None):
         # to override the default implementation in EngineMover
         raise NotImplementedError
 
 class ForwardFirstTwoWayShootingMover(AbstractTwoWayShootingMover):
-    def _run(self, trajectory, shooting_index):
+    def _run(self, trajectory, shooting_index, max_length=None):
         """
         The actual shooting process (after shooting point is chosen).
 
@@ -2216,6 +2515,9 @@ class ForwardFirstTwoWayShootingMover(AbstractTwoWayShootingMover):
             input trajectory
         shooting_index : int
             index of the shooting point within `trajectory`
+        max_length : int or None
+            maximal length of the trial trajectory; longer trials are
+            aborted with an :class:`.EngineMaxLengthError`
 
         Returns
         -------
@@ -2234,13 +2536,25 @@ class ForwardFirstTwoWayShootingMover(AbstractTwoWayShootingMover):
         original = trajectory[shooting_index]
         modified = self.modifier(original)
 
+        fwd_speculative, bkwd_speculative = \
+            self._make_speculative_segments(trajectory, modified,
+                                            shooting_index, max_length)
+        if isinstance(fwd_speculative, Exception):
+            raise fwd_speculative
+
+        # the backward part adds at least the shooting point
         fwd_partial = self._make_forward_trajectory(trajectory, modified,
-                                                    shooting_index)
+                                                    shooting_index,
+                                                    max_length,
+                                                    fwd_speculative)
         # TODO: come up with a test that shows why you need mid_traj here;
         # should be a SeqEns with OptionalEnsembles. Exact example is hard!
         mid_traj = trajectory[0:shooting_index] + fwd_partial
-        bkwd_partial = self._make_backward_trajectory(mid_traj, modified,
-                                                      shooting_index)
+        bkwd_partial = self._make_backward_trajectory(
+            mid_traj, modified, shooting_index,
+            self._partial_max_length(max_length, len(fwd_partial) - 1),
+            bkwd_speculative
+        )
 
         # join the two
         trial_trajectory = bkwd_partial.reversed + fwd_partial[1:]
@@ -2250,7 +2564,7 @@ class ForwardFirstTwoWayShootingMover(AbstractTwoWayShootingMover):
 
 
 class BackwardFirstTwoWayShootingMover(AbstractTwoWayShootingMover):
-    def _run(self, trajectory, shooting_index):
+    def _run(self, trajectory, shooting_index, max_length=None):
         """
         The actual shooting process (after shooting point is chosen).
 
@@ -2260,6 +2574,9 @@ class BackwardFirstTwoWayShootingMover(AbstractTwoWayShootingMover):
             input trajectory
         shooting_index : int
             index of the shooting point within `trajectory`
+        max_length : int or None
+            maximal length of the trial trajectory; longer trials are
+            aborted with an :class:`.EngineMaxLengthError`
 
         Returns
         -------
@@ -2278,13 +2595,25 @@ class BackwardFirstTwoWayShootingMover(AbstractTwoWayShootingMover):
         original = trajectory[shooting_index]
         modified = self.modifier(original)
 
+        fwd_speculative, bkwd_speculative = \
+            self._make_speculative_segments(trajectory, modified,
+                                            shooting_index, max_length)
+        if isinstance(bkwd_speculative, Exception):
+            raise bkwd_speculative
+
+        # the forward part adds at least the shooting point
         bkwd_partial = self._make_backward_trajectory(trajectory, modified,
-                                                      shooting_index)
+                                                      shooting_index,
+                                                      max_length,
+                                                      bkwd_speculative)
         # TODO: come up with a test that shows why you need mid_traj here;
         # should be a SeqEns with OptionalEnsembles. Exact example is hard!
         mid_traj = bkwd_partial.reversed + trajectory[shooting_index + 1:]
-        fwd_partial = self._make_forward_trajectory(mid_traj, modified,
-                                                    shooting_index)
+        fwd_partial = self._make_forward_trajectory(
+            mid_traj, modified, shooting_index,
+            self._partial_max_length(max_length, len(bkwd_partial) - 1),
+            fwd_speculative
+        )
 
         # join the two
         trial_trajectory = bkwd_partial.reversed + fwd_partial[1:]
@@ -2330,6 +2659,15 @@ class TwoWayShootingMover(RandomChoiceMover):
     def modifier(self):
         return self.movers[0].modifier
 
+    @property
+    def engine_pool(self):
+        return self.movers[0].engine_pool
+
+    @engine_pool.setter
+    def engine_pool(self, pool):
+        for mover in self.movers:
+            mover.engine_pool = pool
+
 
 class MinusMover(SubPathMover):
     """
@@ -1,6 +1,8 @@
 import time
 import sys
 import logging
+import threading
+import Queue
 import numpy as np
 import pandas as pd
 
@@ -9,7 +11,10 @@ from openpathsampling.netcdfplus import StorableNamedObject, StorableObject
 import openpathsampling as paths
 import openpathsampling.tools
 
+from openpathsampling.checkpoint import Checkpoint
 from openpathsampling.pathmover import SubPathMover
+from openpathsampling.random_streams import RandomStreams
+from openpathsampling.step_scheduler import StepScheduler
 from ops_logging import initialization_logging
 import abc
 
@@ -37,13 +42,18 @@ class MCStep(StorableObject):
         the final (post) sampleset
     change : MoveChange
         the movechange describing the transition from pre to post
+    random_seed : int or None
+        the seed of the random streams of the simulation. Together with
+        `mccycle` this determines all random numbers drawn in the step.
+        `None` if the global random state was used.
     """
     def __init__(self,
                  simulation=None,
                  mccycle=-1,
                  previous=None,
                  active=None,
-                 change=None
+                 change=None,
+                 random_seed=None
                  ):
 
         super(MCStep, self).__init__()
@@ -52,6 +62,7 @@ class MCStep(StorableObject):
         self.active = active
         self.change = change
         self.mccycle = mccycle
+        self.random_seed = random_seed
 
 
 class PathSimulator(StorableNamedObject):
@@ -68,6 +79,20 @@ class PathSimulator(StorableNamedObject):
         Results should be sync'd (saved to disk) after every
         ``save_frequency`` steps. Note: subclasses must directly implement
         this, the attribute is just a placeholder.
+    full_sanity_check_frequency : int or None
+        by default the sanity checks during a simulation only check the
+        samples that changed since the previous check. If set, every
+        ``full_sanity_check_frequency``-th check looks at all samples
+        again. Default is None (never).
+    random_streams : :class:`.RandomStreams` or None
+        if set (see :meth:`set_random_seed`) each mover, selector and
+        modifier draws from its own random stream, derived from the seed
+        and the step number. Otherwise the global random state is used.
+    batch_save : bool
+        if `True` (default) the steps, sample sets, samples and move changes
+        saved between two syncs are kept in memory and written at once
+        when the storage is synced (see :meth:`.NetCDFPlus.batch`). A step
+        that failed to save is never written in part.
     output_stream : file
         Subclasses should write output to this, allowing a standard way to
         redirect any output.
@@ -80,13 +105,19 @@ class PathSimulator(StorableNamedObject):
 
     calc_name = "PathSimulator"
     _excluded_attr = ['sample_set', 'step', 'save_frequency',
-                      'output_stream']
+                      'full_sanity_check_frequency', 'random_streams',
+                      'batch_save', 'output_stream']
 
     def __init__(self, storage):
         super(PathSimulator, self).__init__()
         self.storage = storage
         # self.engine = engine
         self.save_frequency = 1
+        self.full_sanity_check_frequency = None
+        self._n_sanity_checks = 0
+        self.random_streams = None
+        self.batch_save = True
+        self._batch = None
         self.step = 0
         initialization_logging(
             logger=init_log, obj=self,
@@ -96,11 +127,96 @@ class PathSimulator(StorableNamedObject):
         self.output_stream = sys.stdout  # user can change to file handler
         self.allow_refresh =  True
 
+    def sanity_check(self, sample_set):
+        """
+        Check that the samples in `sample_set` satisfy their ensembles
+
+        Only samples that changed since the last check are checked, except
+        for every ``full_sanity_check_frequency``-th call.
+
+        Parameters
+        ----------
+        sample_set : :class:`.SampleSet`
+            the sample set to check
+        """
+        self._n_sanity_checks += 1
+        frequency = self.full_sanity_check_frequency
+        full = bool(frequency) and self._n_sanity_checks % frequency == 0
+        sample_set.sanity_check(full=full)
+
+    def set_random_seed(self, seed=None):
+        """
+        Draw all random numbers of the simulation from seeded streams
+
+        Every mover, selector and modifier and the sample set get their own
+        random stream. The streams are derived anew in each step from the
+        seed and the step number, which makes runs reproducible independent
+        of the order in which the parts of a step draw their numbers. The
+        seed is stored with each :class:`MCStep`.
+
+        Parameters
+        ----------
+        seed : int or None
+            the seed; `None` takes a seed from the operating system
+
+        Returns
+        -------
+        int
+            the seed used
+        """
+        self.random_streams = RandomStreams(seed)
+        return self.random_streams.seed
+
+    @property
+    def random_seed(self):
+        """
+        int or None : the seed of the random streams, if any
+        """
+        if self.random_streams is None:
+            return None
+        return self.random_streams.seed
+
+    def _assign_random_streams(self, mover):
+        # give the movers of the tree of `mover` their streams
+        if self.random_streams is not None:
+            self.random_streams.assign(mover)
+
+    def _set_random_step(self):
+        # derive the random streams for the current step
+        if self.random_streams is not None:
+            self.random_streams.set_step(self.step)
+            self.sample_set.set_random_stream(self.random_streams,
+                                              'sample_set')
+
+    def _begin_batch(self):
+        # collect the saves of the steps until the next sync
+        if self.storage is not None and self.batch_save and \
+                self._batch is None:
+            storage = self.storage
+            self._batch = storage.batch([storage.samples, storage.samplesets,
+                                         storage.movechanges, storage.steps])
+            self._batch.begin()
+
+    def _commit_batch(self):
+        if self._batch is not None:
+            batch, self._batch = self._batch, None
+            batch.commit()
+
+    def _rollback_batch(self, savepoint=None):
+        # drop the saves after `savepoint` or, without one, the whole batch
+        if self._batch is not None:
+            if savepoint is not None:
+                self._batch.rollback_to(savepoint)
+            else:
+                batch, self._batch = self._batch, None
+                batch.rollback()
+
     def sync_storage(self):
         """
         Will sync all collective variables and the storage to disk
         """
         if self.storage is not None:
+            self._commit_batch()
             self.storage.sync_all()
 
     @abc.abstractmethod
@@ -247,6 +363,7 @@ class Bootstrapping(PathSimulator):
 
     def run(self, n_steps):
         bootstrapmove = self._bootstrapmove
+        self._assign_random_streams(bootstrapmove)
 
         cvs = []
         n_samples = 0
@@ -277,6 +394,7 @@ class Bootstrapping(PathSimulator):
                 refresh=self.allow_refresh
             )
 
+            self._set_random_step()
             movepath = bootstrapmove.move(self.sample_set)
             samples = movepath.results
             new_sampleset = self.sample_set.apply_samples(samples)
@@ -295,7 +413,8 @@ class Bootstrapping(PathSimulator):
                 mccycle=self.step,
                 previous=self.sample_set,
                 active=new_sampleset,
-                change=movepath
+                change=movepath,
+                random_seed=self.random_seed
             )
 
 
@@ -325,7 +444,7 @@ class Bootstrapping(PathSimulator):
                 failsteps += 1
 
             if self.step % self.save_frequency == 0:
-                self.sample_set.sanity_check()
+                self.sanity_check(self.sample_set)
                 self.sync_storage()
 
         self.sync_storage()
@@ -501,6 +620,24 @@ class PathSampling(PathSimulator):
     
     Takes a single move_scheme and generates samples from that, keeping one
     per replica after each move. 
+
+    Attributes
+    ----------
+    max_concurrent_steps : int
+        the number of MC steps that may run at the same time. Only used
+        with seeded random streams (see :meth:`set_random_seed`), which
+        allow to predict the mover of each step. A step is started early
+        (in its own thread) only if it uses none of the ensembles and
+        engines of the earlier steps that are not finished, so the steps
+        are the same as in a sequential run. Movers, ensembles and the
+        storage are not thread-safe, so only the integration of frames by
+        the engines runs in parallel; everything else runs one step at a
+        time. This pays off if, e.g., shooting moves with different engines
+        or replica exchange and path reversal steps run while a shooting
+        move waits for its engine. Default is 1 (sequential).
+    checkpoint_frequency : int or None
+        if set, a checkpoint (see :meth:`write_checkpoint`) is written
+        every ``checkpoint_frequency`` steps. Default is None (never).
     """
 
     calc_name = "PathSampling"
@@ -539,6 +676,8 @@ class PathSampling(PathSimulator):
                                ['move_scheme', 'sample_set'])
         self.live_visualizer = None
         self.status_update_frequency = 1
+        self.max_concurrent_steps = 1
+        self.checkpoint_frequency = None
 
         if initialize:
             samples = []
@@ -600,6 +739,59 @@ class PathSampling(PathSimulator):
         if self.storage is not None and self._current_step is not None:
             self.storage.steps.save(self._current_step)
 
+    def write_checkpoint(self, filename=None):
+        """
+        Write a checkpoint to restart from the current step
+
+        The storage is synced first. See :meth:`from_checkpoint`.
+
+        Parameters
+        ----------
+        filename : str or None
+            the name of the checkpoint file; by default the name of the
+            storage file with `.checkpoint` appended
+
+        Returns
+        -------
+        str
+            the name of the checkpoint file
+        """
+        if self.storage is None:
+            raise RuntimeError('A checkpoint needs a storage.')
+
+        self.sync_storage()
+        if filename is None:
+            filename = Checkpoint.default_filename(self.storage)
+
+        Checkpoint.from_simulation(self).write(filename)
+        return filename
+
+    @classmethod
+    def from_checkpoint(cls, storage, filename=None):
+        """
+        Continue a simulation from its last checkpoint
+
+        The current step is loaded by its index in the storage, and the
+        random state and the settings of the simulation are restored.
+
+        Parameters
+        ----------
+        storage : :class:`openpathsampling.storage.Storage`
+            the storage of the simulation, opened for appending
+        filename : str or None
+            the name of the checkpoint file; by default the name of the
+            storage file with `.checkpoint` appended
+
+        Returns
+        -------
+        :class:`openpathsampling.PathSampling`
+            the simulation, ready to continue with :meth:`run`
+        """
+        if filename is None:
+            filename = Checkpoint.default_filename(storage)
+
+        return Checkpoint.read(filename).restore(storage)
+
     @classmethod
     def from_step(cls, storage, step, initialize=True):
         """
@@ -665,6 +857,8 @@ class PathSampling(PathSimulator):
         self.step = step.mccycle
         self.sample_set = step.active
         self.root = step.simulation.root
+        if getattr(step, 'random_seed', None) is not None:
+            self.set_random_seed(step.random_seed)
 
         self._current_step = step
 
@@ -675,85 +869,203 @@ class PathSampling(PathSimulator):
         n_steps_to_run = n_steps - self.step
         self.run(n_steps_to_run)
 
-    def run(self, n_steps):
-        mcstep = None
+    def _status_update(self, nn, n_steps, initial_time, mcstep):
+        # report the progress before step `nn` of `n_steps`
+        refresh = self.allow_refresh
+        if self.step % self.status_update_frequency == 0:
+            # do we visualize this step?
+            if self.live_visualizer is not None and mcstep is not None:
+                # do we visualize at all?
+                self.live_visualizer.draw_ipynb(mcstep)
+                refresh = False
 
-        # cvs = list()
-        # n_samples = 0
-
-        # if self.storage is not None:
-        #     n_samples = len(self.storage.snapshots)
-        #     cvs = list(self.storage.cvs)
-
-        initial_time = time.time()
+            elapsed = time.time() - initial_time
 
-        for nn in range(n_steps):
-            self.step += 1
-            logger.info("Beginning MC cycle " + str(self.step))
-            refresh = self.allow_refresh
-            if self.step % self.status_update_frequency == 0:
-                # do we visualize this step?
-                if self.live_visualizer is not None and mcstep is not None:
-                    # do we visualize at all?
-                    self.live_visualizer.draw_ipynb(mcstep)
-                    refresh = False
-
-                elapsed = time.time() - initial_time
-
-                if nn > 0:
-                    time_per_step = elapsed / nn
-                else:
-                    time_per_step = 1.0
+            if nn > 0:
+                time_per_step = elapsed / nn
+            else:
+                time_per_step = 1.0
 
-                paths.tools.refresh_output(
-                    "Working on Monte Carlo cycle number " + str(self.step)
-                    + "\n"
-                    + "Running for %d seconds - %5.2f steps per second\n" % (
-                        elapsed,
-                        1.0 / time_per_step
-                    )
-                    + "Expected time to finish: %d seconds\n" % (
-                        1.0 * (n_steps - nn) * time_per_step
-                    ),
-                    refresh=refresh,
-                    output_stream=self.output_stream
+            paths.tools.refresh_output(
+                "Working on Monte Carlo cycle number " + str(self.step)
+                + "\n"
+                + "Running for %d seconds - %5.2f steps per second\n" % (
+                    elapsed,
+                    1.0 / time_per_step
                 )
+                + "Expected time to finish: %d seconds\n" % (
+                    1.0 * (n_steps - nn) * time_per_step
+                ),
+                refresh=refresh,
+                output_stream=self.output_stream
+            )
 
-            time_start = time.time() 
-            movepath = self._mover.move(self.sample_set, step=self.step)
-            samples = movepath.results
-            new_sampleset = self.sample_set.apply_samples(samples)
-            time_elapsed = time.time() - time_start
+    def _apply_change(self, movepath, time_elapsed):
+        # apply the change of the current step, save and return the MCStep
+        samples = movepath.results
+        new_sampleset = self.sample_set.apply_samples(samples)
 
-            # TODO: we can save this with the MC steps for timing? The bit
-            # below works, but is only a temporary hack
-            setattr(movepath.details, "timing", time_elapsed)
+        # TODO: we can save this with the MC steps for timing? The bit
+        # below works, but is only a temporary hack
+        setattr(movepath.details, "timing", time_elapsed)
 
-            mcstep = MCStep(
-                simulation=self,
-                mccycle=self.step,
-                previous=self.sample_set,
-                active=new_sampleset,
-                change=movepath
-            )
+        mcstep = MCStep(
+            simulation=self,
+            mccycle=self.step,
+            previous=self.sample_set,
+            active=new_sampleset,
+            change=movepath,
+            random_seed=self.random_seed
+        )
 
-            self._current_step = mcstep
+        self._current_step = mcstep
+        self._begin_batch()
+        savepoint = None
+        if self._batch is not None:
+            savepoint = self._batch.savepoint()
+
+        try:
             self.save_current_step()
+        except:
+            # do not write a step that is only partly saved, but keep the
+            # earlier steps of the batch
+            self._rollback_batch(savepoint)
+            raise
+
+        if self.step % self.save_frequency == 0:
+            self.sanity_check(self.sample_set)
+            self.sync_storage()
+
+        if self.checkpoint_frequency and \
+                self.step % self.checkpoint_frequency == 0:
+            self.write_checkpoint()
+
+        self.sample_set = new_sampleset
+        return mcstep
+
+    def _run_concurrent(self, n_steps, initial_time):
+        # Run steps in threads as soon as they are independent of all
+        # earlier steps that are not applied yet. Steps are applied and
+        # saved in order.
+        #
+        # Movers, ensembles (with their caches and the result memo) and the
+        # storage are not thread-safe. All of this runs under `lock`, held
+        # by this thread while it schedules, applies and saves steps and by
+        # a running step otherwise. Only the engines release it while they
+        # integrate frames, and the steps running at the same time use
+        # different engines.
+        scheduler = StepScheduler(self._mover, self.random_streams)
+        last_step = self.step + n_steps
+        finished = Queue.Queue()
+        running = {}
+        changes = {}
+        errors = {}
+        mcstep = None
 
-            # if self.storage is not None:
-            #     # I think this is done automatically when saving snapshots
-            #     # for cv in cvs:
-            #     #     n_len = len(self.storage.snapshots)
-            #     #     cv(self.storage.snapshots[n_samples:n_len])
-            #     #     n_samples = n_len
-            #
-            #     self.storage.steps.save(mcstep)
+        lock = threading.Lock()
+        engines = {
+            submover.engine for submover in self._mover
+            if getattr(submover, 'engine', None) is not None
+        }
 
-            if self.step % self.save_frequency == 0:
-                self.sample_set.sanity_check()
-                self.sync_storage()
+        def run_step(step, sample_set):
+            time_start = time.time()
+            try:
+                with lock:
+                    self.random_streams.set_step(step)
+                    movepath = self._mover.move(sample_set, step=step)
+                changes[step] = (movepath, time.time() - time_start)
+            except:
+                errors[step] = sys.exc_info()
+            finally:
+                finished.put(step)
+
+        for engine in engines:
+            engine._step_lock = lock
+
+        lock.acquire()
+        try:
+            nn = 0
+            while self.step < last_step:
+                first = self.step + 1
+                window = range(
+                    first,
+                    min(last_step, self.step + self.max_concurrent_steps) + 1)
+                for step in window:
+                    if len(running) >= self.max_concurrent_steps:
+                        break
+                    if step in running or step in changes or step in errors:
+                        continue
+                    if scheduler.independent(step, range(first, step)):
+                        logger.info("Beginning MC cycle " + str(step))
+                        self.sample_set.set_random_stream(
+                            self.random_streams, 'sample_set')
+                        thread = threading.Thread(
+                            target=run_step, args=(step, self.sample_set))
+                        running[step] = thread
+                        thread.start()
+
+                lock.release()
+                try:
+                    done = finished.get()
+                finally:
+                    lock.acquire()
+                running.pop(done).join()
+
+                while self.step + 1 in changes or self.step + 1 in errors:
+                    if self.step + 1 in errors:
+                        error = errors[self.step + 1]
+                        raise error[0], error[1], error[2]
+
+                    self.step += 1
+                    scheduler.forget(self.step)
+                    self._status_update(nn, n_steps, initial_time, mcstep)
+                    movepath, time_elapsed = changes.pop(self.step)
+                    mcstep = self._apply_change(movepath, time_elapsed)
+                    nn += 1
+        finally:
+            # let the remaining steps finish before returning
+            lock.release()
+            for thread in running.values():
+                thread.join()
+            for engine in engines:
+                engine._step_lock = None
+
+        return mcstep
 
-            self.sample_set = new_sampleset
+    def run(self, n_steps):
+        mcstep = None
+
+        # cvs = list()
+        # n_samples = 0
+
+        # if self.storage is not None:
+        #     n_samples = len(self.storage.snapshots)
+        #     cvs = list(self.storage.cvs)
+
+        initial_time = time.time()
+        self._assign_random_streams(self._mover)
+
+        try:
+            if self.max_concurrent_steps > 1 and \
+                    self.random_streams is not None:
+                mcstep = self._run_concurrent(n_steps, initial_time)
+            else:
+                for nn in range(n_steps):
+                    self.step += 1
+                    logger.info("Beginning MC cycle " + str(self.step))
+                    self._status_update(nn, n_steps, initial_time, mcstep)
+
+                    time_start = time.time()
+                    self._set_random_step()
+                    movepath = self._mover.move(self.sample_set,
+                                                step=self.step)
+                    mcstep = self._apply_change(movepath,
+                                                time.time() - time_start)
+        except:
+            # the steps completed before the error are still written
+            self._commit_batch()
+            raise
 
         self.sync_storage()
 
@@ -853,6 +1165,12 @@ class CommittorSimulation(PathSimulator):
         snap_num = 0
         for snapshot in self.initial_snapshots:
             start_snap = snapshot
+            if not as_chain:
+                # modify all copies at once, so that e.g. constraints can be
+                # applied in a single batch
+                start_snaps = self.randomizer.modify_all(
+                    [snapshot] * n_per_snapshot)
+
             # do what we need to get the snapshot set up
             for step in range(n_per_snapshot):
                 paths.tools.refresh_output(
@@ -867,7 +1185,7 @@ class CommittorSimulation(PathSimulator):
                 if as_chain:
                     start_snap = self.randomizer(start_snap)
                 else:
-                    start_snap = self.randomizer(snapshot)
+                    start_snap = start_snaps[step]
 
                 sample_set = paths.SampleSet([
                     paths.Sample(replica=0,
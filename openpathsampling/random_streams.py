@@ -0,0 +1,233 @@
+"""
+Independent, reproducible random number streams for the parts of a
+simulation.
+"""
+
+import hashlib
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def random_choice(rng, sequence):
+    """
+    Pick a random element of `sequence` using the random stream `rng`
+
+    Unlike `rng.choice` this does not convert the sequence to an array, so
+    it works for any objects.
+
+    Parameters
+    ----------
+    rng : `numpy.random.RandomState` or `numpy.random`
+        the random stream
+    sequence : list
+        the elements to pick from
+
+    Returns
+    -------
+    object
+        the picked element
+
+    Raises
+    ------
+    IndexError
+        if `sequence` is empty
+    """
+    if len(sequence) == 0:
+        raise IndexError('Cannot choose from an empty sequence')
+    return sequence[rng.randint(len(sequence))]
+
+
+class RandomStreamUser(object):
+    """
+    Mixin for objects that draw random numbers
+
+    Random numbers are drawn from :attr:`rng`. Unless a stream has been
+    assigned with :meth:`set_random_stream` this is the global
+    `numpy.random` state, so nothing changes for objects used outside of a
+    seeded simulation.
+    """
+    _random_streams = None
+    _random_key = None
+
+    @property
+    def rng(self):
+        """
+        `numpy.random.RandomState` or `numpy.random`: the random stream
+        """
+        if self._random_streams is None:
+            return np.random
+        return self._random_streams.stream(self._random_key)
+
+    def set_random_stream(self, streams, key):
+        """
+        Draw random numbers from the stream `key` of `streams`
+
+        Parameters
+        ----------
+        streams : :class:`RandomStreams` or None
+            the streams to use; `None` switches back to `numpy.random`
+        key : str
+            the name of the stream
+        """
+        self._random_streams = streams
+        self._random_key = key
+
+
+class RandomStreams(object):
+    """
+    A set of independent random streams derived from one seed
+
+    Each stream is a `numpy.random.RandomState` seeded from a hash of the
+    simulation seed, the current step and the name of the stream. The
+    numbers an object draws therefore do not depend on how many numbers
+    other objects drew before, or in which order they did so, and a step
+    can be repeated exactly from the seed and the step number alone.
+
+    The current step is kept per thread, so several steps can run in
+    different threads at the same time.
+
+    Parameters
+    ----------
+    seed : int or None
+        the seed of the simulation; if `None` a seed is taken from the
+        operating system
+
+    Attributes
+    ----------
+    seed : int
+        the seed of the simulation
+    step : int
+        the step the streams of the current thread are derived for, see
+        :meth:`set_step`
+    """
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = int(np.random.RandomState().randint(2 ** 31 - 1))
+        self.seed = int(seed)
+        self._local = threading.local()
+
+    @property
+    def step(self):
+        return getattr(self._local, 'step', 0)
+
+    @property
+    def _streams(self):
+        try:
+            return self._local.streams
+        except AttributeError:
+            self._local.streams = {}
+            return self._local.streams
+
+    def set_step(self, step):
+        """
+        Derive all streams of the current thread for step number `step`
+
+        All streams start from the beginning, also if `step` is the current
+        step already.
+
+        Parameters
+        ----------
+        step : int
+            the step number, usually the `mccycle` of the :class:`MCStep`
+        """
+        self._local.step = step
+        self._local.streams = {}
+
+    def _derive_seed(self, key, step=None):
+        if step is None:
+            step = self.step
+        digest = hashlib.sha256(
+            '%d:%d:%s' % (self.seed, step, key)).digest()
+        return np.frombuffer(digest, dtype=np.uint32)
+
+    def stream(self, key):
+        """
+        The random stream with name `key` in the current step
+
+        Parameters
+        ----------
+        key : str
+            the name of the stream
+
+        Returns
+        -------
+        `numpy.random.RandomState`
+        """
+        try:
+            return self._streams[key]
+        except KeyError:
+            rng = np.random.RandomState(self._derive_seed(key))
+            self._streams[key] = rng
+            return rng
+
+    def stream_for_step(self, key, step):
+        """
+        A new random stream with name `key` for step number `step`
+
+        This does not change the streams in use, so it can be used to
+        look at the numbers a step will draw before it is run.
+
+        Parameters
+        ----------
+        key : str
+            the name of the stream
+        step : int
+            the step number
+
+        Returns
+        -------
+        `numpy.random.RandomState`
+        """
+        return np.random.RandomState(self._derive_seed(key, step))
+
+    def spawn(self, key):
+        """
+        Independent streams for a part of the simulation
+
+        Parameters
+        ----------
+        key : str
+            the name of the part
+
+        Returns
+        -------
+        :class:`RandomStreams`
+            streams with a seed derived from the seed, the current step and
+            `key`
+        """
+        derived = self._derive_seed('spawn:' + key)
+        return RandomStreams(int(derived[0]) * 2 ** 32 + int(derived[1]))
+
+    def assign(self, mover, prefix='mover'):
+        """
+        Give each mover in the tree of `mover` its own stream
+
+        Movers are numbered in pre-order, so the same tree of movers always
+        gets the same streams. The `selector` and `modifier` of a mover get
+        streams of their own.
+
+        Parameters
+        ----------
+        mover : :class:`.PathMover`
+            the root mover
+        prefix : str
+            prepended to the names of the streams
+        """
+        seen = set()
+        n_movers = 0
+        for submover in mover:
+            if id(submover) in seen:
+                continue
+            seen.add(id(submover))
+            key = '%s/%d' % (prefix, n_movers)
+            n_movers += 1
+            if isinstance(submover, RandomStreamUser):
+                submover.set_random_stream(self, key)
+            for attr in ['selector', 'modifier']:
+                part = getattr(submover, attr, None)
+                if isinstance(part, RandomStreamUser):
+                    part.set_random_stream(self, key + '/' + attr)
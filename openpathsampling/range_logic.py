@@ -91,8 +91,29 @@ dictionary maps those labels to the actual input values, and out comes the
 correct range tuple.
 
 Total no-brainer, right?
+
+
+RANGE SETS
+==========
+
+The pairwise functions above are fine when combining two volumes, but they
+return nested `VolumeCombination`s as soon as the result is not a single
+range, and combining many volumes that way builds deep trees. For that case
+we also provide functions that act on "range sets": lists of (min, max)
+tuples in canonical form, i.e., sorted by minimum and non-overlapping. The
+combination of any number of range sets is done in a single pass over the
+sorted array of all boundaries: we evaluate membership at every boundary
+and at the midpoint between neighboring boundaries, apply the logical
+operation, and read off the runs where the result is true.
+
+Periodic range sets are handled by unwrapping: a range with min > max is
+split into two ranges at the edges of the periodic domain, the logic is
+done as in the nonperiodic case, and the result can be wrapped back by
+`wrap_periodic_ranges`. This requires the periodic domain to be known.
 '''
 
+import numpy as np
+
 def range_and(amin, amax, bmin, bmax):
     if amin == bmin and amax == bmax:
         return 1
@@ -269,3 +290,194 @@ def periodic_range_sub(amin, amax, bmin, bmax):
         sub_res = range_sub(order[0], order[1], order[2], order[3])
         return recover_periodic_range(sub_res, order, adict)
 
+
+
+def flat_ranges(ranges):
+    """Flat, sorted array of boundaries for a canonical range set.
+
+    Parameters
+    ----------
+    ranges : list of 2-tuples
+        range set in canonical form
+
+    Returns
+    -------
+    np.ndarray
+        array [min_0, max_0, min_1, max_1, ...]
+    """
+    return np.asarray(ranges, dtype=float).reshape(-1)
+
+
+def in_ranges(values, bounds):
+    """Test which values are inside a (closed) canonical range set.
+
+    Parameters
+    ----------
+    values : float or array-like
+        the values to test
+    bounds : np.ndarray
+        flat boundaries of the range set, as given by `flat_ranges`
+
+    Returns
+    -------
+    bool or np.ndarray of bool
+        whether each value is in one of the ranges
+    """
+    # inside a range, the number of boundaries to the left is odd; we
+    # check both sides of the search so that the boundaries are included
+    left = np.searchsorted(bounds, values, side='left')
+    right = np.searchsorted(bounds, values, side='right')
+    return (left % 2 == 1) | (right % 2 == 1)
+
+
+def canonical_ranges(ranges):
+    """Sort and merge a list of ranges into canonical form.
+
+    Parameters
+    ----------
+    ranges : list of 2-tuples
+        (min, max) of each range; order and overlap are arbitrary
+
+    Returns
+    -------
+    list of 2-tuples
+        sorted, non-overlapping ranges covering the same set
+
+    Raises
+    ------
+    ValueError
+        if any range has min > max
+    """
+    arr = np.asarray(ranges, dtype=float).reshape(-1, 2)
+    if len(arr) == 0:
+        return []
+    if np.any(arr[:, 0] > arr[:, 1]):
+        raise ValueError("Range with min > max in nonperiodic range set: "
+                         + str(ranges))
+    arr = arr[np.argsort(arr[:, 0], kind='mergesort')]
+    running_max = np.maximum.accumulate(arr[:, 1])
+    new_group = np.ones(len(arr), dtype=bool)
+    new_group[1:] = arr[1:, 0] > running_max[:-1]
+    starts = np.nonzero(new_group)[0]
+    ends = np.append(starts[1:] - 1, len(arr) - 1)
+    return list(zip(arr[starts, 0].tolist(), running_max[ends].tolist()))
+
+
+def _sample_points(bounds):
+    """Boundaries interleaved with the midpoints between them.
+
+    Midpoints next to an infinite boundary are placed one unit away from
+    the finite neighbor (or at 0 if both are infinite).
+    """
+    lower = bounds[:-1]
+    upper = bounds[1:]
+    with np.errstate(invalid='ignore'):
+        mids = 0.5 * (lower + upper)
+    mids = np.where(np.isinf(lower) & np.isfinite(upper), upper - 1.0, mids)
+    mids = np.where(np.isinf(upper) & np.isfinite(lower), lower + 1.0, mids)
+    mids = np.where(np.isnan(mids), 0.0, mids)
+    samples = np.empty(2 * len(bounds) - 1, dtype=float)
+    samples[0::2] = bounds
+    samples[1::2] = mids
+    return samples
+
+
+def range_set_logic(range_sets, logic):
+    """Combine any number of canonical range sets with a logical function.
+
+    Parameters
+    ----------
+    range_sets : list of list of 2-tuples
+        the range sets to combine, each in canonical form
+    logic : callable
+        takes a list of boolean arrays (membership in each range set) and
+        returns the boolean array of membership in the result
+
+    Returns
+    -------
+    list of 2-tuples
+        the resulting range set, in canonical form
+    """
+    flats = [flat_ranges(rset) for rset in range_sets]
+    bounds = np.unique(np.concatenate(flats + [np.empty(0)]))
+    if len(bounds) == 0:
+        return []
+    samples = _sample_points(bounds)
+    keep = np.asarray(logic([in_ranges(samples, flat) for flat in flats]),
+                      dtype=bool)
+    # runs of consecutive kept samples give the resulting ranges; a run
+    # starting (ending) at a midpoint starts (ends) at the boundary next to
+    # that midpoint
+    padded = np.concatenate([[False], keep, [False]])
+    edges = np.diff(padded.astype(int))
+    run_starts = np.nonzero(edges == 1)[0]
+    run_ends = np.nonzero(edges == -1)[0] - 1
+    lmins = bounds[run_starts // 2]
+    lmaxs = bounds[(run_ends + 1) // 2]
+    return list(zip(lmins.tolist(), lmaxs.tolist()))
+
+
+def range_set_or(*range_sets):
+    """Union of canonical range sets"""
+    return canonical_ranges([rng for rset in range_sets for rng in rset])
+
+
+def range_set_and(*range_sets):
+    """Intersection of canonical range sets"""
+    return range_set_logic(range_sets, lambda ins: np.logical_and.reduce(ins))
+
+
+def range_set_sub(set_a, set_b):
+    """Relative complement (A - B) of canonical range sets"""
+    return range_set_logic([set_a, set_b],
+                           lambda ins: ins[0] & ~ins[1])
+
+
+def range_set_xor(set_a, set_b):
+    """Symmetric difference of canonical range sets"""
+    return range_set_logic([set_a, set_b],
+                           lambda ins: ins[0] ^ ins[1])
+
+
+def unwrap_periodic_ranges(ranges, period_min, period_max):
+    """Convert periodic ranges to a canonical nonperiodic range set.
+
+    Ranges with min > max wrap around the periodic boundary, and are split
+    into two ranges at the edges of the periodic domain. All values must
+    already be wrapped into the domain [period_min, period_max].
+
+    Parameters
+    ----------
+    ranges : list of 2-tuples
+        periodic ranges
+    period_min : float
+        minimum of the periodic domain
+    period_max : float
+        maximum of the periodic domain
+
+    Returns
+    -------
+    list of 2-tuples
+        canonical (nonperiodic) range set within the periodic domain
+    """
+    unwrapped = []
+    for (lmin, lmax) in ranges:
+        if lmin > lmax:
+            unwrapped.extend([(period_min, lmax), (lmin, period_max)])
+        else:
+            unwrapped.append((lmin, lmax))
+    return canonical_ranges(unwrapped)
+
+
+def wrap_periodic_ranges(ranges, period_min, period_max):
+    """Join ranges that touch across the periodic boundary.
+
+    Inverse of :func:`unwrap_periodic_ranges`: if the canonical range set
+    starts at `period_min` and ends at `period_max`, the first and last
+    ranges are merged into a single range with min > max.
+    """
+    ranges = list(ranges)
+    if (len(ranges) > 1 and ranges[0][0] == period_min
+            and ranges[-1][1] == period_max):
+        ranges = ranges[1:-1] + [(ranges[-1][0], ranges[0][1])]
+    return ranges
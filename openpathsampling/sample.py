@@ -1,8 +1,8 @@
-import random
 import logging
 
 import openpathsampling as paths
 from openpathsampling.netcdfplus import StorableObject, lazy_loading_attributes
+from openpathsampling.random_streams import RandomStreamUser, random_choice
 
 from openpathsampling.tools import refresh_output
 
@@ -21,7 +21,7 @@ class SampleKeyError(Exception):
 
 
 @lazy_loading_attributes('movepath')
-class SampleSet(StorableObject):
+class SampleSet(StorableObject, RandomStreamUser):
     """
     SampleSet is essentially a list of samples, with a few conveniences.  It
     can be treated as a list of samples (using, e.g., .append), or as a
@@ -59,14 +59,43 @@ class SampleSet(StorableObject):
         values.
     replica_dict : dict
         A dictionary with replica IDs as keys and lists of Samples as values
+    max_diff_depth : int
+        the maximal number of sample sets in a chain of differences, see
+        :meth:`diff_from_base`
+
+    Notes
+    -----
+    Copies made by :meth:`copy` (and so by :meth:`apply_samples`) share the
+    containers with the original set. Each set copies a container only
+    before changing it, so replacing a sample does not depend on the number
+    of samples in the set and the previous set stays intact.
     """
 
+    max_diff_depth = 16
+
     def __init__(self, samples, movepath=None):
         super(SampleSet, self).__init__()
 
         self.samples = []
         self.ensemble_dict = {}
         self.replica_dict = {}
+        self._members = set()
+
+        # copy-on-write: `_shared` marks the containers above as shared
+        # with another sample set; the `_owned_*` sets hold the keys whose
+        # lists in the dicts belong to this set (`None` means all of them)
+        self._shared = False
+        self._owned_ensembles = None
+        self._owned_replicas = None
+
+        # samples not yet checked by `sanity_check`
+        self._unchecked = set()
+
+        # the changes relative to the sample set this one was copied from
+        self._version = 0
+        self._diff = None
+        self._diff_depth = 0
+
         self.extend(samples)
         self.movepath = movepath
 
@@ -80,9 +109,9 @@ class SampleSet(StorableObject):
 
     def __getitem__(self, key):
         if isinstance(key, paths.Ensemble):
-            return random.choice(self.ensemble_dict[key])
+            return random_choice(self.rng, self.ensemble_dict[key])
         elif type(key) is int:
-            return random.choice(self.replica_dict[key])
+            return random_choice(self.rng, self.replica_dict[key])
         elif hasattr(key, '__iter__'):
             return (self[element] for element in key)
         elif type(key) is slice:
@@ -105,7 +134,7 @@ class SampleSet(StorableObject):
             if key != value.replica:
                 raise SampleKeyError(key, value, value.replica)
 
-        if value in self.samples:
+        if value in self._members:
             # if value is already in this, we don't need to do anything
             return
         # Setting works by replacing one with the same key. We pick one with
@@ -124,13 +153,26 @@ class SampleSet(StorableObject):
         return Counter(self.samples) == Counter(other.samples)
 
     def __delitem__(self, sample):
-        self.ensemble_dict[sample.ensemble].remove(sample)
-        self.replica_dict[sample.replica].remove(sample)
+        self._unshare()
+        self._own_list(self.ensemble_dict, self._owned_ensembles,
+                       sample.ensemble).remove(sample)
+        self._own_list(self.replica_dict, self._owned_replicas,
+                       sample.replica).remove(sample)
         if len(self.ensemble_dict[sample.ensemble]) == 0:
             del self.ensemble_dict[sample.ensemble]
         if len(self.replica_dict[sample.replica]) == 0:
             del self.replica_dict[sample.replica]
         self.samples.remove(sample)
+        self._members.discard(sample)
+        self._unchecked.discard(sample)
+
+        self._version += 1
+        if self._diff is not None:
+            added, removed = self._diff[2:]
+            if sample in added:
+                added.remove(sample)
+            else:
+                removed.append(sample)
 
     # TODO: add support for remove and pop
 
@@ -143,7 +185,7 @@ class SampleSet(StorableObject):
 
     def __contains__(self, item):
         # check for Sample, replica (int) and Ensemble, too
-        if item in self.samples:
+        if item in self._members:
             return True
         elif item in self.ensemble_dict:
             return True
@@ -165,21 +207,104 @@ class SampleSet(StorableObject):
             return []
 
     def append(self, sample):
-        if sample in self.samples:
+        if sample in self._members:
             # question: would it make sense to raise an error here? can't
             # have more than one copy of the same sample, but should we
             # ignore it silently or complain?
             return
 
+        self._unshare()
         self.samples.append(sample)
-        try:
-            self.ensemble_dict[sample.ensemble].append(sample)
-        except KeyError:
-            self.ensemble_dict[sample.ensemble] = [sample]
-        try:
-            self.replica_dict[sample.replica].append(sample)
-        except KeyError:
-            self.replica_dict[sample.replica] = [sample]
+        self._members.add(sample)
+        self._unchecked.add(sample)
+        self._append_to_dict(self.ensemble_dict, self._owned_ensembles,
+                             sample.ensemble, sample)
+        self._append_to_dict(self.replica_dict, self._owned_replicas,
+                             sample.replica, sample)
+
+        self._version += 1
+        if self._diff is not None:
+            self._diff[2].append(sample)
+
+    def _unshare(self):
+        # take over the containers before they are changed
+        if self._shared:
+            self.samples = list(self.samples)
+            self._members = set(self._members)
+            self.ensemble_dict = dict(self.ensemble_dict)
+            self.replica_dict = dict(self.replica_dict)
+            self._shared = False
+
+    @staticmethod
+    def _own_list(dct, owned, key):
+        # the list for `key` in `dct`, copied first if it is still shared
+        samples = dct[key]
+        if owned is not None and key not in owned:
+            samples = list(samples)
+            dct[key] = samples
+            owned.add(key)
+        return samples
+
+    def _append_to_dict(self, dct, owned, key, sample):
+        if key in dct:
+            self._own_list(dct, owned, key).append(sample)
+        else:
+            dct[key] = [sample]
+            if owned is not None:
+                owned.add(key)
+
+    def copy(self):
+        """
+        Return a copy of this SampleSet
+
+        The copy shares all containers with this set until either of them is
+        changed, so copying does not depend on the number of samples. The
+        copy also knows which samples have passed :meth:`sanity_check`
+        already. The `movepath` is not copied.
+
+        Returns
+        -------
+        :class:`SampleSet`
+        """
+        new = SampleSet([])
+        new.samples = self.samples
+        new._members = self._members
+        new.ensemble_dict = self.ensemble_dict
+        new.replica_dict = self.replica_dict
+        new._unchecked = set(self._unchecked)
+        new.set_random_stream(self._random_streams, self._random_key)
+        for sample_set in [self, new]:
+            sample_set._shared = True
+            sample_set._owned_ensembles = set()
+            sample_set._owned_replicas = set()
+
+        return new
+
+    def diff_from_base(self):
+        """
+        The changes of this SampleSet relative to the one it was copied from
+
+        :meth:`apply_samples` records the sample set it started from and
+        all samples added and removed since. The sample set is equal to the
+        samples of the base without the removed ones followed by the added
+        ones (in this order). Storage uses this to save only the changes.
+        Chains of differences are limited to `max_diff_depth` sample sets.
+
+        Returns
+        -------
+        tuple or None
+            `(base, added, removed)` where `base` is a :class:`SampleSet`
+            and `added` and `removed` are lists of :class:`Sample`. `None`
+            if there is no base or the base has been changed since.
+        """
+        if self._diff is None:
+            return None
+
+        base, base_version, added, removed = self._diff
+        if base._version != base_version:
+            return None
+
+        return base, list(added), list(removed)
 
     def extend(self, samples):
         # note that this works whether the parameter samples is a list of
@@ -200,7 +325,10 @@ class SampleSet(StorableObject):
         elif isinstance(samples, paths.MoveChange):
             samples = samples.results
         if copy:
-            newset = SampleSet(self)
+            newset = self.copy()
+            if self._diff_depth < self.max_diff_depth:
+                newset._diff = (self, self._version, [], [])
+                newset._diff_depth = self._diff_depth + 1
         else:
             newset = self
         for sample in samples:
@@ -223,16 +351,32 @@ class SampleSet(StorableObject):
         """
         return self.ensemble_dict.keys()
 
-    def sanity_check(self):
+    def sanity_check(self, full=False):
         """Checks that the sample trajectories satisfy their ensembles
 
+        Samples are immutable, so a sample that passed the check once does
+        not need to be checked again. By default only the samples added
+        since the last check (of this set or of the set it was copied from)
+        are checked.
+
+        Parameters
+        ----------
+        full : bool
+            if `True` all samples are checked; default is `False`
         """
         logger.info("Starting sanity check")
-        for sample in self:
+        if full:
+            to_check = list(self.samples)
+        elif self._unchecked:
+            to_check = [s for s in self.samples if s in self._unchecked]
+        else:
+            to_check = []
+
+        for sample in to_check:
             logger.info("Checking sanity of " + repr(sample.ensemble) +
                         " with " + str(sample.trajectory))
             try:
-                assert(sample.ensemble(sample.trajectory))
+                assert(sample.ensemble.memoized_call(sample.trajectory))
             except AssertionError as e:
                 failmsg = ("Trajectory does not match ensemble for replica "
                            + str(sample.replica))
@@ -243,6 +387,8 @@ class SampleSet(StorableObject):
                     e.args = tuple([arg0] + list(e.args[1:]))
                 raise  # re-raise last exception
 
+            self._unchecked.discard(sample)
+
     def consistency_check(self):
         """Check that all internal dictionaries are consistent
 
@@ -259,6 +405,9 @@ class SampleSet(StorableObject):
         for rep in self.replica_dict.keys():
             nsamps_rep += len(self.replica_dict[rep])
         nsamps = len(self.samples)
+        assert nsamps == len(self._members), \
+            "nsamps != nsamps_members : %d != %d" % (
+                nsamps, len(self._members))
         assert nsamps == nsamps_ens, \
             "nsamps != nsamps_ens : %d != %d" % (nsamps, nsamps_ens)
         assert nsamps == nsamps_rep, \
@@ -275,8 +424,8 @@ class SampleSet(StorableObject):
 
         # finally, check to be sure that thre are no duplicates in
         # self.samples; this completes the consistency check
-        for samp in self.samples:
-            assert self.samples.count(samp) == 1, \
+        for samp, count in Counter(self.samples).iteritems():
+            assert count == 1, \
                     "More than one instance of %r!" % samp
 
     def append_as_new_replica(self, sample):
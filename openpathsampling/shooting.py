@@ -4,14 +4,30 @@ import logging
 import numpy as np
 
 from openpathsampling.netcdfplus import StorableNamedObject
+from openpathsampling.netcdfplus.cache import LRUCache
+from openpathsampling.random_streams import RandomStreamUser
 
 logger = logging.getLogger(__name__)
 init_log = logging.getLogger('openpathsampling.initialization')
 
 
-class ShootingPointSelector(StorableNamedObject):
+class ShootingPointSelector(StorableNamedObject, RandomStreamUser):
+    """
+    Base class for the selection of shooting points
+
+    Attributes
+    ----------
+    bias_cache_size : int
+        number of trajectories for which the cumulative biases are kept.
+        Shooting only needs the old and the new trajectory, so this can be
+        small.
+    """
+
+    bias_cache_size = 4
+
     def __init__(self):
         super(ShootingPointSelector, self).__init__()
+        self._cumulative_cache = LRUCache(self.bias_cache_size)
 
     @property
     def identifier(self):
@@ -50,6 +66,30 @@ class ShootingPointSelector(StorableNamedObject):
         '''
         return [self.f(s, trajectory) for s in trajectory]
 
+    def _cumulative_biases(self, trajectory):
+        '''
+        Returns the cumulative sum of `_biases` as a numpy array
+
+        The result is cached by the UUID and the
+        :attr:`.Trajectory.content_version` of the trajectory, so picking a
+        shooting point and computing the acceptance for the same
+        trajectory evaluates the biases only once, while a trajectory
+        changed in place is evaluated again.
+        '''
+        version = getattr(trajectory, 'content_version', None)
+        if version is not None:
+            key = trajectory.__uuid__
+            if key in self._cumulative_cache:
+                (cached_version, cumulative) = self._cumulative_cache[key]
+                if cached_version == version:
+                    return cumulative
+
+        cumulative = np.cumsum(
+            np.ravel(np.asarray(self._biases(trajectory), dtype=float)))
+        if version is not None:
+            self._cumulative_cache[key] = (version, cumulative)
+        return cumulative
+
     def sum_bias(self, trajectory):
         '''
         Returns the unnormalized probability probability of a trajectory.
@@ -65,8 +105,38 @@ class ShootingPointSelector(StorableNamedObject):
         only for the non-symmetric proposal of different snapshots is given
         by `probability(old_trajectory) / probability(new_trajectory)`
         '''
+        cumulative = self._cumulative_biases(trajectory)
+        if len(cumulative) == 0:
+            return 0.0
+
+        return float(cumulative[-1])
+
+    def max_trial_length(self, trajectory, acceptance_random):
+        '''
+        Returns the maximal length of a trial that can still be accepted
+
+        Parameters
+        ----------
+        trajectory : :class:`openpathsampling.Trajectory`
+            the initial trajectory the shooting point was picked from
+        acceptance_random : float
+            the random number in [0, 1) the Metropolis acceptance will be
+            compared to
+
+        Returns
+        -------
+        int or None
+            the number of frames a trial trajectory can have without being
+            rejected by the selection bias alone. `None` if the selector
+            does not allow to bound the trial length.
 
-        return sum(self._biases(trajectory))
+        Notes
+        -----
+        This is only possible if `sum_bias` grows with the length of the
+        trajectory independent of its content. The default is not to
+        give a bound.
+        '''
+        return None
 
     def pick(self, trajectory):
         '''
@@ -74,21 +144,18 @@ class ShootingPointSelector(StorableNamedObject):
         
         Notes
         -----
-        The native implementation is very slow. Simple picking algorithm
-        should override this function.
+        This bisects the (cached) cumulative biases, so it is O(log n) once
+        the biases are known. Evaluating the biases is still O(n) and
+        selectors with a simple picking algorithm should override this
+        function.
         '''
+        cumulative = self._cumulative_biases(trajectory)
 
-        prob_list = self._biases(trajectory)
-        sum_bias = sum(prob_list)
-
-        rand = np.random.random() * sum_bias
-        idx = 0
-        prob = prob_list[0]
-        while prob <= rand and idx < len(prob_list):
-            idx += 1
-            prob += prob_list[idx]
+        rand = self.rng.random_sample() * cumulative[-1]
+        idx = int(np.searchsorted(cumulative, rand, side='right'))
 
-        return idx
+        # guard against round-off for rand close to the total bias
+        return min(idx, len(cumulative) - 1)
 
 
 class GaussianBiasSelector(ShootingPointSelector):
@@ -106,6 +173,12 @@ class GaussianBiasSelector(ShootingPointSelector):
         l_s = self.collectivevariable(snapshot)
         return math.exp(-self.alpha * (l_s - self.l_0) ** 2)
 
+    def _biases(self, trajectory):
+        # evaluate the CV for the whole trajectory at once
+        l_s = np.ravel(np.asarray(self.collectivevariable(trajectory),
+                                  dtype=float))
+        return np.exp(-self.alpha * (l_s - self.l_0) ** 2)
+
 
 class UniformSelector(ShootingPointSelector):
     """
@@ -131,9 +204,18 @@ class UniformSelector(ShootingPointSelector):
     def sum_bias(self, trajectory):
         return float(len(trajectory) - self.pad_start - self.pad_end)
 
+    def max_trial_length(self, trajectory, acceptance_random):
+        # acceptance is `sum_bias(old) / sum_bias(new) >= acceptance_random`
+        sum_bias = self.sum_bias(trajectory)
+        if acceptance_random <= 0.0 or sum_bias <= 0.0:
+            return None
+
+        return (int(sum_bias / acceptance_random)
+                + self.pad_start + self.pad_end)
+
     def pick(self, trajectory):
-        idx = np.random.random_integers(self.pad_start, 
-                                        len(trajectory) - self.pad_end - 1)
+        idx = self.rng.randint(self.pad_start,
+                               len(trajectory) - self.pad_end)
         return idx
 
 
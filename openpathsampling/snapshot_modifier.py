@@ -1,17 +1,45 @@
-import random
 import logging
-import copy
 import abc
 
 import numpy as np
+from simtk import unit as u
 
 import openpathsampling as paths
 from openpathsampling.netcdfplus import StorableNamedObject, StorableObject
+from openpathsampling.netcdfplus.cache import LRUCache
+from openpathsampling.random_streams import RandomStreamUser
 
 logger = logging.getLogger(__name__)
 
 
-class SnapshotModifier(StorableNamedObject):
+def _strip_units(value):
+    """
+    Split a `simtk.unit.Quantity` into its value and unit
+
+    Returns
+    -------
+    tuple
+        the value and the unit; the unit is `None` if `value` has no units
+    """
+    if isinstance(value, u.Quantity):
+        return value._value, value.unit
+    else:
+        return value, None
+
+
+def _value_in_unit(value, unit):
+    """
+    The plain number of `value` in `unit`; `value` may have no units
+    """
+    if isinstance(value, u.Quantity):
+        if unit is None:
+            return value._value
+        return value.value_in_unit(unit)
+    else:
+        return value
+
+
+class SnapshotModifier(StorableNamedObject, RandomStreamUser):
     """Abstract class for snapshot modification.
 
     In general, a snapshot modifer will take a snapshot and return a
@@ -24,6 +52,9 @@ class SnapshotModifier(StorableNamedObject):
         the subset to use (default None, meaning use all). The values
         select along the first axis of the input array. For example, in a
         typical shape=(n_atoms, 3) array, this will pick the atoms.
+    engine_cache_size : int
+        number of per-engine results (e.g. masses) that are kept, see
+        :meth:`_cached_per_engine`
 
     Note
     ----
@@ -37,9 +68,52 @@ class SnapshotModifier(StorableNamedObject):
 
     __metaclass__ = abc.ABCMeta
 
+    engine_cache_size = 8
+
     def __init__(self, subset_mask=None):
         super(SnapshotModifier, self).__init__()
         self.subset_mask = subset_mask
+        self._engine_cache = LRUCache(self.engine_cache_size)
+
+    def _cached_per_engine(self, snapshot, name, parameters, compute):
+        """
+        Result of `compute()`, cached for the engine of `snapshot`
+
+        Things like masses or the widths of velocity distributions only
+        depend on the engine and the parameters of the modifier, so they
+        are computed only once instead of for each snapshot.
+
+        Parameters
+        ----------
+        snapshot : :class:`.BaseSnapshot`
+            the snapshot; its engine is used as key. Without an engine
+            nothing is cached.
+        name : str
+            name of the cached quantity
+        parameters : tuple
+            the attributes of the modifier the result depends on. A cached
+            result is only used if these are still the same objects, so
+            replace them instead of changing them in place.
+        compute : callable
+            function without arguments that computes the result
+
+        Returns
+        -------
+        the (cached) result of `compute()`
+        """
+        engine = getattr(snapshot, 'engine', None)
+        if engine is None:
+            return compute()
+
+        key = (engine.__uuid__, name)
+        if key in self._engine_cache:
+            cached_parameters, result = self._engine_cache[key]
+            if all(p is q for p, q in zip(parameters, cached_parameters)):
+                return result
+
+        result = compute()
+        self._engine_cache[key] = (parameters, result)
+        return result
 
     def extract_subset(self, full_array):
         """Extracts elements from full_array according to self.subset_mask
@@ -90,6 +164,24 @@ class SnapshotModifier(StorableNamedObject):
     def __call__(self, snapshot):
         raise NotImplementedError
 
+    def modify_all(self, snapshots):
+        """Modify several snapshots at once
+
+        Subclasses can override this to share work between the snapshots,
+        e.g. to apply constraints to all of them in a single pass.
+
+        Parameters
+        ----------
+        snapshots : list of :class:`.Snapshot`
+            the input snapshots; the same snapshot may appear several times
+
+        Returns
+        -------
+        list of :class:`.Snapshot`
+            the modified snapshots, in the order of `snapshots`
+        """
+        return [self(snapshot) for snapshot in snapshots]
+
 class NoModification(SnapshotModifier):
     """Modifier with no change: returns a copy of the snapshot."""
     def __call__(self, snapshot):
@@ -123,42 +215,122 @@ class RandomVelocities(SnapshotModifier):
         self.beta = beta
         self.engine = engine
 
-    def __call__(self, snapshot):
-        # raises AttributeError is snapshot doesn't support velocities
-        velocities = copy.copy(snapshot.velocities)  # copy.copy for units
-        vel_subset = self.extract_subset(velocities)
+    def _sigmas(self, snapshot, velocity_unit):
+        """
+        Widths of the velocity distribution of the atoms in the subset
 
+        Parameters
+        ----------
+        snapshot : :class:`.BaseSnapshot`
+            snapshot with the `masses` feature
+        velocity_unit : simtk.unit.Unit or None
+            unit of the velocities of the snapshot
+
+        Returns
+        -------
+        numpy.ndarray, shape=(n_subset_atoms, 1)
+            the standard deviations as plain numbers in `velocity_unit`.
+            If the masses are given per degree of freedom the shape is that
+            of the masses.
+        """
         # raises AttributeError if snapshot doesn't support masses feature
-        all_masses = snapshot.masses
-        masses = self.extract_subset(all_masses)
-
-        n_spatial = len(vel_subset[0])
-        n_atoms = len(vel_subset)
-        for atom_i in range(n_atoms):
-            radicand = 1.0 / (self.beta * masses[atom_i])
-            try:  # preference that masses is quantity or np.array
-                sigma = radicand.sqrt()
-            except AttributeError:  # if masses regular list
-                sigma = np.sqrt(radicand)
-            vel_subset[atom_i] = sigma * np.random.normal(size=n_spatial)
-
-        self.apply_to_subset(velocities, vel_subset)
-        new_snap = snapshot.copy_with_replacement(velocities=velocities)
+        masses, mass_unit = _strip_units(snapshot.masses)
+        masses = np.asarray(masses, dtype=float)
+        if self.subset_mask is not None:
+            masses = masses[list(self.subset_mask)]
+
+        # unit handling for all atoms at once: `scale / masses` is in units
+        # of velocity**2
+        scale = 1.0 / self.beta
+        if mass_unit is not None:
+            scale = scale / mass_unit
+        if velocity_unit is not None:
+            scale = scale.value_in_unit(velocity_unit ** 2)
+
+        sigmas = np.sqrt(scale / masses)
+        return sigmas.reshape(len(sigmas), -1)
+
+    def _randomize(self, snapshot):
+        """Copy of the snapshot with new velocities, but no constraints"""
+        # raises AttributeError is snapshot doesn't support velocities
+        velocities, velocity_unit = _strip_units(snapshot.velocities)
+        velocities = np.asarray(velocities)
+        dtype = velocities.dtype if velocities.dtype.kind == 'f' else float
+
+        sigmas = self._cached_per_engine(
+            snapshot, 'sigmas', (self.beta, self.subset_mask),
+            lambda: self._sigmas(snapshot, velocity_unit)
+        )
 
-        # applying constraints, if they exist
+        shape = (len(sigmas),) + velocities.shape[1:]
+        random_velocities = sigmas * self.rng.normal(size=shape)
+
+        if self.subset_mask is None:
+            velocities = random_velocities.astype(dtype, copy=False)
+        else:
+            # the arrays of a snapshot are read-only: copy on write
+            velocities = np.array(velocities, dtype=dtype)
+            velocities[list(self.subset_mask)] = random_velocities
+
+        if velocity_unit is not None:
+            velocities = u.Quantity(velocities, velocity_unit)
+
+        return snapshot.copy_with_replacement(velocities=velocities)
+
+    def _apply_constraints(self, snapshots):
+        """Apply the constraints of the engine, if it has any"""
         if self.engine is None:
-            engine = new_snap.engine
+            engine = snapshots[0].engine
         else:
             engine = self.engine
 
+        try:
+            apply_constraints_batch = engine.apply_constraints_batch
+        except AttributeError:
+            pass
+        else:
+            return apply_constraints_batch(snapshots)
+
         try:
             apply_constraints = engine.apply_constraints
         except AttributeError:
-            pass  # fine if there isn't one
+            return snapshots  # fine if there isn't one
         else:
-            new_snap = apply_constraints(new_snap)
+            return [apply_constraints(snap) for snap in snapshots]
+
+    def __call__(self, snapshot):
+        return self._apply_constraints([self._randomize(snapshot)])[0]
+
+    def modify_all(self, snapshots):
+        """Randomize the velocities of several snapshots
+
+        The constraints are applied to all snapshots in one batch, if the
+        engine supports it (see
+        :meth:`.OpenMMEngine.apply_constraints_batch`).
+
+        Parameters
+        ----------
+        snapshots : list of :class:`.Snapshot`
+            the input snapshots; the same snapshot may appear several times
+
+        Returns
+        -------
+        list of :class:`.Snapshot`
+            the modified snapshots, in the order of `snapshots`
+        """
+        snapshots = list(snapshots)
+        if not snapshots:
+            return []
+
+        if self.engine is None:
+            # each snapshot is constrained by its own engine
+            engines = set(id(snap.engine) for snap in snapshots)
+            if len(engines) > 1:
+                return [self(snap) for snap in snapshots]
+
+        return self._apply_constraints(
+            [self._randomize(snap) for snap in snapshots])
 
-        return new_snap
 
 class GeneralizedDirectionModifier(SnapshotModifier):
     """
@@ -280,6 +452,29 @@ class GeneralizedDirectionModifier(SnapshotModifier):
         # assert len(dv_widths) == n_subset_atoms
         return dv_widths
 
+    def _dv_widths_array(self, n_atoms, n_subset_atoms, velocity_unit):
+        """
+        The velocity delta widths as plain numbers in `velocity_unit`
+
+        Parameters
+        ----------
+        n_atoms : int
+            number of total atoms
+        n_subset_atoms : int
+            number of atoms in the subset to be (possibly) changed
+        velocity_unit : simtk.unit.Unit or None
+            unit of the velocities
+
+        Returns
+        -------
+        numpy.ndarray, shape=(n_subset_atoms,)
+        """
+        return np.array(
+            [_value_in_unit(width, velocity_unit)
+             for width in self._dv_widths(n_atoms, n_subset_atoms)],
+            dtype=float
+        )
+
     @staticmethod
     def _remove_linear_momentum(velocities, masses):
         """
@@ -301,8 +496,11 @@ class GeneralizedDirectionModifier(SnapshotModifier):
         # to do most of this? and get KE from a snapshot feature?
         n_atoms = len(masses)
         inv_masses = 1.0 / masses
-        momenta = velocities * masses[:, np.newaxis] 
-        total_momenta = sum(momenta, 0*momenta[0])
+        momenta = velocities * masses[:, np.newaxis]
+        if isinstance(momenta, np.ndarray):
+            total_momenta = momenta.sum(axis=0)
+        else:
+            total_momenta = sum(momenta, 0*momenta[0])
         remove_momenta = total_momenta / n_atoms
         remove_velocities = inv_masses[:, np.newaxis] * remove_momenta
 
@@ -333,8 +531,11 @@ class GeneralizedDirectionModifier(SnapshotModifier):
         # can't just use the dot product because of simtk.units
         momenta = velocities * masses[:, np.newaxis]
         dof_ke = momenta * velocities
-        zero_energy = 0 * dof_ke[0][0]
-        new_ke = sum(sum(dof_ke, zero_energy), zero_energy)
+        if isinstance(dof_ke, np.ndarray):
+            new_ke = dof_ke.sum()
+        else:
+            zero_energy = 0 * dof_ke[0][0]
+            new_ke = sum(sum(dof_ke, zero_energy), zero_energy)
 
         rescale_factor = np.sqrt(double_KE / new_ke)
         velocities *= rescale_factor
@@ -360,40 +561,59 @@ class GeneralizedDirectionModifier(SnapshotModifier):
             modified snapshot
         """
         self._verify_snapshot(snapshot)
-        velocities = copy.copy(snapshot.velocities)
-        vel_subset = self.extract_subset(velocities)
-
-        atoms_to_change = self._select_atoms_to_modify(len(vel_subset))
-        dv_widths = self._dv_widths(n_atoms=len(velocities),
-                                    n_subset_atoms=len(vel_subset))
-
-        # zero_with_units is a hack for using units (or not) in `sum`
-        zero_with_units = (vel_subset[0][0] - vel_subset[0][0])**2
-        for atom_i in atoms_to_change:
-            initial_sum_sq_vel = sum([v**2 for v in vel_subset[atom_i]],
-                                     zero_with_units)
-            randoms = np.random.normal(size=len(vel_subset[atom_i]))
-            delta_v = dv_widths[atom_i] * randoms
-            vel_subset[atom_i] += delta_v
-            final_sum_sq_vel = sum([v**2 for v in vel_subset[atom_i]],
-                                   zero_with_units)
-            rescale_factor = np.sqrt(initial_sum_sq_vel / final_sum_sq_vel)
-            vel_subset[atom_i] *= rescale_factor
-
-        self.apply_to_subset(velocities, vel_subset)
-
-        # calculate the total KE so we can preserve it
-        masses = snapshot.masses
+        velocities, velocity_unit = _strip_units(snapshot.velocities)
+        # the arrays of a snapshot are read-only: copy on write. The
+        # rescaling is done in double precision, even for float32 snapshots
+        dtype = np.asarray(velocities).dtype
+        velocities = np.array(velocities, dtype=np.float64)
+        n_atoms = len(velocities)
+
+        if self.subset_mask is None:
+            subset = np.arange(n_atoms)
+        else:
+            subset = np.asarray(self.subset_mask, dtype=int)
+
+        to_change = np.asarray(self._select_atoms_to_modify(len(subset)),
+                               dtype=int)
+        dv_widths = self._cached_per_engine(
+            snapshot, 'dv_widths', (self.delta_v, self.subset_mask),
+            lambda: self._dv_widths_array(n_atoms, len(subset),
+                                          velocity_unit)
+        )
+
+        # change the direction of all selected atoms at once, keeping the
+        # speed of each atom
+        atoms = subset[to_change]
+        selected = velocities[atoms]
+        initial_sum_sq_vel = (selected ** 2).sum(axis=1)
+        randoms = self.rng.normal(size=selected.shape)
+        selected += dv_widths[to_change][:, np.newaxis] * randoms
+        final_sum_sq_vel = (selected ** 2).sum(axis=1)
+        rescale_factors = np.sqrt(initial_sum_sq_vel / final_sum_sq_vel)
+        selected *= rescale_factors[:, np.newaxis]
+        velocities[atoms] = selected
+
+        # calculate the total KE so we can preserve it. Everything is in
+        # plain numbers here; only ratios of energies are used
+        masses = self._cached_per_engine(
+            snapshot, 'masses', (),
+            lambda: np.asarray(_strip_units(snapshot.masses)[0],
+                               dtype=float)
+        )
         momenta = velocities * masses[:, np.newaxis]
-        dof_double_KE = momenta * velocities
-        zero_energy = 0 * dof_double_KE[0][0]
-        double_KE = sum(sum(dof_double_KE, zero_energy), zero_energy)
+        double_KE = (momenta * velocities).sum()
 
         if self.remove_linear_momentum:
             velocities = self._remove_linear_momentum(velocities, masses)
 
         self._rescale_kinetic_energy(velocities, masses, double_KE)
 
+        if dtype.kind == 'f':
+            velocities = velocities.astype(dtype, copy=False)
+
+        if velocity_unit is not None:
+            velocities = u.Quantity(velocities, velocity_unit)
+
         new_snap = snapshot.copy_with_replacement(velocities=velocities)
 
         # NOTE: no constraint correction here! constraints are not allowed!
@@ -458,5 +678,5 @@ class SingleAtomVelocityDirectionModifier(GeneralizedDirectionModifier):
     VelocityDirectionModifier
     """
     def _select_atoms_to_modify(self, n_subset_atoms):
-        return [np.random.choice(range(n_subset_atoms))]
+        return [self.rng.randint(n_subset_atoms)]
 
@@ -0,0 +1,156 @@
+"""
+Decide which upcoming Monte Carlo steps can run at the same time.
+"""
+
+import logging
+
+from openpathsampling.pathmover import (
+    PathSimulatorMover, RandomChoiceMover, SubPathMover
+)
+
+logger = logging.getLogger(__name__)
+
+
+class StepScheduler(object):
+    """
+    Predicts the movers of upcoming steps and checks them for conflicts
+
+    With seeded random streams (see :class:`.RandomStreams`) the random
+    choices of a step are known before the step runs. The scheduler replays
+    the choices of the :class:`.RandomChoiceMover` objects at the top of
+    the move tree, whose weights do not depend on the sample set, to find
+    the mover a step will run. The ensembles this mover can read or write
+    are taken from its :attr:`.PathMover.in_out`.
+
+    Two steps are independent if they use disjoint ensembles and no common
+    engine. A step that is independent of all earlier steps not yet applied
+    gives the same result if it runs before or together with them, because
+    it does not see their samples and draws its own random numbers.
+
+    Parameters
+    ----------
+    root_mover : :class:`.PathMover`
+        the mover called in each step
+    random_streams : :class:`.RandomStreams`
+        the random streams assigned to the movers
+    """
+    def __init__(self, root_mover, random_streams):
+        self.root_mover = root_mover
+        self.random_streams = random_streams
+        self._footprints = {}
+        self._mover_footprints = {}
+
+    def _fixed_choice(self, mover):
+        # random choices with weights that do not depend on the sample set
+        return (
+            isinstance(mover, RandomChoiceMover) and
+            type(mover)._selector.__func__ is
+            RandomChoiceMover._selector.__func__ and
+            mover._random_streams is self.random_streams
+        )
+
+    def predicted_mover(self, step):
+        """
+        The mover that step number `step` will run below the random choices
+
+        Parameters
+        ----------
+        step : int
+            the step number
+
+        Returns
+        -------
+        :class:`.PathMover`
+        """
+        mover = self.root_mover
+        while True:
+            if type(mover) in [PathSimulatorMover, SubPathMover]:
+                mover = mover.mover
+            elif self._fixed_choice(mover):
+                # the first number a RandomChoiceMover draws is its choice
+                rng = self.random_streams.stream_for_step(
+                    mover._random_key, step)
+                table = mover._alias_table(mover._selector(None))
+                mover = mover.movers[table.draw(rng.random_sample())]
+            else:
+                return mover
+
+    def _mover_footprint(self, mover):
+        try:
+            return self._mover_footprints[mover]
+        except KeyError:
+            pass
+
+        try:
+            in_out = mover.in_out
+            ensembles = set(in_out.ins) | set(in_out.outs)
+        except (NotImplementedError, AttributeError):
+            # unknown effect: conflicts with every other step
+            footprint = None
+        else:
+            engines = {
+                submover.engine for submover in mover
+                if getattr(submover, 'engine', None) is not None
+            }
+            footprint = (frozenset(ensembles), frozenset(engines))
+
+        self._mover_footprints[mover] = footprint
+        return footprint
+
+    def footprint(self, step):
+        """
+        The ensembles and engines that step number `step` might use
+
+        Parameters
+        ----------
+        step : int
+            the step number
+
+        Returns
+        -------
+        tuple of (frozenset, frozenset) or None
+            the ensembles and the engines; `None` if the effect of the step
+            cannot be determined
+        """
+        try:
+            return self._footprints[step]
+        except KeyError:
+            footprint = self._mover_footprint(self.predicted_mover(step))
+            self._footprints[step] = footprint
+            return footprint
+
+    def independent(self, step, others):
+        """
+        Whether step `step` uses nothing that steps `others` use
+
+        Parameters
+        ----------
+        step : int
+            the step number
+        others : iterable of int
+            the numbers of the other steps
+
+        Returns
+        -------
+        bool
+        """
+        footprint = self.footprint(step)
+        if footprint is None:
+            return not any(True for _ in others)
+
+        ensembles, engines = footprint
+        for other in others:
+            other_footprint = self.footprint(other)
+            if other_footprint is None:
+                return False
+            other_ensembles, other_engines = other_footprint
+            if ensembles & other_ensembles or engines & other_engines:
+                return False
+
+        return True
+
+    def forget(self, step):
+        """
+        Remove the cached prediction for step `step` once it is done
+        """
+        self._footprints.pop(step, None)
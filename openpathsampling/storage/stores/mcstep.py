@@ -6,7 +6,8 @@ class MCStepStore(VariableStore):
     def __init__(self):
         super(MCStepStore, self).__init__(
             MCStep,
-            ['change', 'active', 'previous', 'simulation', 'mccycle']
+            ['change', 'active', 'previous', 'simulation', 'mccycle',
+             'random_seed']
         )
 
     def initialize(self, units=None):
@@ -17,4 +18,5 @@ class MCStepStore(VariableStore):
         self.create_variable('active', 'obj.samplesets')
         self.create_variable('previous', 'obj.samplesets')
         self.create_variable('simulation', 'obj.pathsimulators')
-        self.create_variable('mccycle', 'int')
\ No newline at end of file
+        self.create_variable('mccycle', 'int')
+        self.create_variable('random_seed', 'json')
\ No newline at end of file
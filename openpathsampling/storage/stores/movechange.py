@@ -5,12 +5,34 @@ from uuid import UUID
 
 
 class MoveChangeStore(ObjectStore):
-    def __init__(self):
+    """
+    ObjectStore to store MoveChanges
+
+    If `store_flattened` is set when a new file is created, each change also
+    keeps its flattened `results` and `trials` and the depth of its
+    `canonical` change. Loaded changes then use these directly instead of
+    walking their subchanges, at the cost of a larger file: the flattened
+    views repeat the samples at each level of the tree.
+
+    Parameters
+    ----------
+    store_flattened : bool or None
+        whether new files keep the flattened views; `None` uses the class
+        attribute `store_flattened` (default `False`). Existing files keep
+        what they were created with.
+    """
+
+    store_flattened = False
+
+    def __init__(self, store_flattened=None):
         super(MoveChangeStore, self).__init__(
             MoveChange,
             json=False
         )
 
+        if store_flattened is not None:
+            self.store_flattened = store_flattened
+
         self._cached_all = False
         self.class_list = StorableObject.objects()
 
@@ -24,6 +46,15 @@ class MoveChangeStore(ObjectStore):
         self.write('details', idx, movechange)
         self.vars['mover'][idx] = movechange.mover
         self.vars['cls'][idx] = movechange.__class__.__name__
+        if self._flattened:
+            self.vars['results'][idx] = movechange.results
+            self.vars['trials'][idx] = movechange.trials
+            self.vars['canonical_depth'][idx] = movechange.canonical_depth
+
+    @property
+    def _flattened(self):
+        # only files created with `store_flattened` have the flattened views
+        return self.prefix + '_results' in self.storage.variables
 
     def _load(self, idx):
         cls_name = self.vars['cls'][idx]
@@ -40,6 +71,11 @@ class MoveChangeStore(ObjectStore):
         except KeyError:  # BACKWARDS COMPATIBILITY; REMOVE IN 2.0
             obj.input_samples = None
 
+        if self._flattened:
+            obj._results = self.vars['results'][idx]
+            obj._trials = self.vars['trials'][idx]
+            obj._canonical_depth = int(self.vars['canonical_depth'][idx])
+
         return obj
 
     def initialize(self, units=None):
@@ -62,6 +98,17 @@ class MoveChangeStore(ObjectStore):
                              dimensions='...',
                              chunksizes=(10240,))
 
+        if self.store_flattened:
+            self.create_variable('results', 'obj.samples',
+                                 dimensions='...',
+                                 chunksizes=(10240,))
+
+            self.create_variable('trials', 'obj.samples',
+                                 dimensions='...',
+                                 chunksizes=(10240,))
+
+            self.create_variable('canonical_depth', 'int')
+
     def cache_all(self):
         """Load all samples as fast as possible into the cache
 
@@ -99,6 +146,13 @@ class MoveChangeStore(ObjectStore):
                 self,
                 subchanges_idxss)]
 
+            if self._flattened:
+                [self._load_partial_flattened(c, r, t, d) for c, r, t, d in zip(
+                    self,
+                    self.variables['results'][:],
+                    self.variables['trials'][:],
+                    self.variables['canonical_depth'][:])]
+
             self._cached_all = True
 
     def _add_empty_to_cache(self, pos, uuid, cls_name, samples_idxs,
@@ -127,6 +181,25 @@ class MoveChangeStore(ObjectStore):
 
         return obj
 
+    def _load_partial_flattened(self, obj, results_idxs, trials_idxs,
+                                canonical_depth):
+        if obj._results is None:
+            obj._results = self._samples_from_idxs(results_idxs)
+        if obj._trials is None:
+            obj._trials = self._samples_from_idxs(trials_idxs)
+        obj._canonical_depth = int(canonical_depth)
+
+        return obj
+
+    def _samples_from_idxs(self, samples_idxs):
+        if len(samples_idxs) == 0:
+            return []
+        if self.reference_by_uuid:
+            samples_idxs = self.storage.to_uuid_chunks(samples_idxs)
+            return [self.storage.samples[UUID(idx)] for idx in samples_idxs]
+        else:
+            return [self.storage.samples[int(idx)] for idx in samples_idxs]
+
     def _load_partial_samples(self, cls_name, samples_idxs,
                               input_samples_idxs, mover_idx, details_idx):
         cls = self.class_list[cls_name]
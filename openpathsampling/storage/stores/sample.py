@@ -28,12 +28,71 @@ class SampleStore(VariableStore):
 
 
 class SampleSetStore(VariableStore):
+    """
+    Store for sample sets
+
+    A sample set that was created from a stored one by
+    :meth:`SampleSet.apply_samples` is saved as the difference to that
+    `base`: only the added and the removed samples are written. Files
+    created before this was possible do not have the `base` and `removed`
+    variables and always store all samples.
+    """
     def __init__(self):
         super(SampleSetStore, self).__init__(
             SampleSet,
-            ['samples', 'movepath']
+            ['samples', 'movepath', 'base', 'removed']
         )
 
+    def _save(self, sample_set, idx):
+        diff = None
+        if 'base' in self.var_names:
+            diff = sample_set.diff_from_base()
+
+        if diff is not None:
+            base, added, removed = diff
+            if len(added) + len(removed) >= len(sample_set):
+                diff = None
+
+        if diff is None:
+            self.vars['samples'][idx] = sample_set.samples
+            if 'base' in self.var_names:
+                self.vars['base'][idx] = None
+                self.vars['removed'][idx] = []
+        else:
+            self.vars['samples'][idx] = added
+            self.vars['base'][idx] = base
+            self.vars['removed'][idx] = removed
+
+        self.write('movepath', idx, sample_set)
+
+    def _load(self, idx):
+        return self._sample_set(
+            {var: self.vars[var][idx] for var in self.var_names})
+
+    def add_to_cache(self, idx, data):
+        if idx not in self.cache:
+            obj = self._sample_set({
+                var: self.vars[var].getter(data[nn])
+                for nn, var in enumerate(self.var_names)})
+            self._get_id(idx, obj)
+
+            self.index[obj] = idx
+            self.cache[idx] = obj
+
+    @staticmethod
+    def _sample_set(attr):
+        # create the sample set from the loaded variables
+        samples = attr['samples']
+        base = attr.get('base')
+        if base is not None:
+            removed = set(sample.__uuid__ for sample in attr['removed'])
+            samples = [
+                sample for sample in base
+                if sample.__uuid__ not in removed
+            ] + list(samples)
+
+        return SampleSet(samples, movepath=attr['movepath'])
+
     def sample_indices(self, idx):
         """
         Load sample indices for sample_set with ID 'idx' from the storage
@@ -46,7 +105,8 @@ class SampleSetStore(VariableStore):
         Returns
         -------
         list of int
-            list of sample indices
+            list of sample indices. If the sample set is stored as a
+            difference to its `base`, these are only the added samples.
         """
 
         return self.variables['samples'][idx].tolist()
@@ -69,3 +129,13 @@ class SampleSetStore(VariableStore):
         )
 
         self.create_variable('movepath', 'lazyobj.movechanges')
+
+        self.create_variable('base', 'obj.samplesets')
+        self.create_variable(
+            'removed',
+            'obj.samples',
+            dimensions='...',
+            description="sample_set[sample_set] are the samples of 'base' "
+                        "that are not part of 'sample_set'.",
+            chunksizes=(1024,)
+        )
@@ -3,14 +3,61 @@ from openpathsampling.netcdfplus import ObjectStore, LoaderProxy
 
 
 class TrajectoryStore(ObjectStore):
+    """
+    Store for trajectories
+
+    A trajectory that shares frames with an already stored trajectory (see
+    :meth:`Trajectory.shared_parts`) is stored as the difference to this
+    `parent`: the range of kept frames of the parent, where they are placed,
+    and the new frames. Chains of such differences are at most
+    `max_delta_depth` long. Files created before this was possible always
+    store all frames.
+    """
+
+    max_delta_depth = 8
+
     def __init__(self):
         super(TrajectoryStore, self).__init__(Trajectory)
 
     def to_dict(self):
         return {}
 
+    @property
+    def _delta_encoded(self):
+        # older files do not have the variables for differences
+        return self.prefix + '_parent' in self.storage.variables
+
+    def _stored_parent_part(self, trajectory):
+        # the longest shared part of a parent that is stored already
+        for part in trajectory.shared_parts():
+            parent_idx = self.index.get(part[0], -1)
+            if parent_idx >= 0:
+                depth = self.vars['delta_depth'][parent_idx]
+                if depth < self.max_delta_depth:
+                    return part, depth + 1
+
+        return None, 0
+
     def _save(self, trajectory, idx):
-        self.vars['snapshots'][idx] = trajectory
+        part = None
+        if self._delta_encoded:
+            part, depth = self._stored_parent_part(trajectory)
+
+        if part is None:
+            self.vars['snapshots'][idx] = trajectory
+            if self._delta_encoded:
+                self.vars['parent'][idx] = None
+                self._set_kept(idx, 0, 0, 0)
+                self.vars['delta_depth'][idx] = 0
+        else:
+            parent, start, stop, position = part
+            frames = trajectory.as_proxies()
+            self.vars['snapshots'][idx] = \
+                frames[:position] + frames[position + stop - start:]
+            self.vars['parent'][idx] = parent
+            self._set_kept(idx, start, stop, position)
+            self.vars['delta_depth'][idx] = depth
+
         store = self.storage.snapshots
 
 
@@ -37,9 +84,30 @@ class TrajectoryStore(ObjectStore):
         snap_store.only_mention = current_mention
 
     def _load(self, idx):
-        trajectory = Trajectory(self.vars['snapshots'][idx])
+        frames = self.vars['snapshots'][idx]
+        if self._delta_encoded:
+            parent = self.vars['parent'][idx]
+            if parent is not None:
+                # the frames of the parent are shared, not loaded again
+                start, stop, position = self._kept(idx)
+                frames = (frames[:position] +
+                          parent.as_proxies()[start:stop] +
+                          frames[position:])
+
+        trajectory = Trajectory(frames)
         return trajectory
 
+    def _kept(self, idx):
+        return [
+            int(self.vars[var][idx])
+            for var in ['kept_start', 'kept_stop', 'kept_position']
+        ]
+
+    def _set_kept(self, idx, start, stop, position):
+        self.vars['kept_start'][idx] = start
+        self.vars['kept_stop'][idx] = stop
+        self.vars['kept_position'][idx] = position
+
     def snapshot_indices(self, idx):
         """
         Load snapshot indices for trajectory with ID 'idx' from the storage
@@ -57,7 +125,17 @@ class TrajectoryStore(ObjectStore):
         """
 
         # get the values
-        return self.variables['snapshots'][idx].tolist()
+        indices = self.variables['snapshots'][idx].tolist()
+        if self._delta_encoded:
+            parent = self.vars['parent'][idx]
+            if parent is not None:
+                start, stop, position = self._kept(idx)
+                parent_indices = self.snapshot_indices(self.index[parent])
+                indices = (indices[:position] +
+                           parent_indices[start:stop] +
+                           indices[position:])
+
+        return indices
 
     def iter_snapshot_indices(self):
         """
@@ -88,3 +166,28 @@ class TrajectoryStore(ObjectStore):
                         "'trajectory'.",
             chunksizes=(10240,)
         )
+
+        self.create_variable(
+            'parent',
+            'obj.trajectories',
+            description="trajectory[trajectory] is the trajectory that "
+                        "shares frames with 'trajectory' or None."
+        )
+
+        # frames kept_start:kept_stop of 'parent' are placed at
+        # kept_position in the trajectory, the others are in 'snapshots'
+        for name in ['kept_start', 'kept_stop', 'kept_position']:
+            self.create_variable(
+                name,
+                'int',
+                description="trajectory[trajectory] is the %s of the frames "
+                            "of 'parent' in trajectory 'trajectory'."
+                            % name.replace('_', ' ')
+            )
+
+        self.create_variable(
+            'delta_depth',
+            'int',
+            description="trajectory[trajectory] is the length of the chain "
+                        "of parents of 'trajectory'."
+        )
@@ -0,0 +1,34 @@
+"""
+Stand-in for an external MD code, used to test ExternalEngine.
+
+Usage: python external_engine_standin.py INPUT OUTPUT [SLEEP]
+
+Reads a 1D position and velocity (one line "x v") from INPUT and writes one
+line per frame to OUTPUT, moving with constant velocity (dt = 0.1). After
+each frame it sleeps SLEEP seconds (default 0). It runs until it is killed
+or has written 100000 frames.
+"""
+
+import sys
+import time
+
+
+def main(argv):
+    input_file, output_file = argv[1], argv[2]
+    sleep = float(argv[3]) if len(argv) > 3 else 0.0
+
+    with open(input_file) as f:
+        x, v = [float(value) for value in f.read().split()]
+
+    dt = 0.1
+    with open(output_file, 'w') as f:
+        for _ in range(100000):
+            x += v * dt
+            f.write("%r %r\n" % (x, v))
+            f.flush()
+            if sleep > 0:
+                time.sleep(sleep)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
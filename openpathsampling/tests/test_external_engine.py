@@ -0,0 +1,138 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+from nose.tools import assert_equal, assert_true, raises
+from numpy.testing import assert_allclose
+
+import openpathsampling as paths
+import openpathsampling.engines.toy as toys
+from openpathsampling.engines import ExternalEngine, SnapshotDescriptor
+from test_helpers import data_filename
+
+
+class StandInEngine(ExternalEngine):
+    """Runs `external_engine_standin.py`; frames are lines of `x v`"""
+    def __init__(self, options, descriptor, sleep=0.0):
+        super(StandInEngine, self).__init__(options, descriptor)
+        self.sleep = sleep
+
+    def read_frame_from_file(self, filename, frame_num):
+        try:
+            with open(filename) as f:
+                lines = f.readlines()
+        except IOError:
+            return None
+
+        if len(lines) <= frame_num or not lines[frame_num].endswith('\n'):
+            return None
+
+        x, v = [float(value) for value in lines[frame_num].split()]
+        return toys.Snapshot(coordinates=np.array([[x]]),
+                             velocities=np.array([[v]]),
+                             engine=self)
+
+    def write_frame_to_file(self, filename, snapshot):
+        with open(filename, 'w') as f:
+            f.write("%r %r\n" % (snapshot.xyz[0][0],
+                                 snapshot.velocities[0][0]))
+
+    def engine_command(self):
+        return [sys.executable, data_filename('external_engine_standin.py'),
+                self.input_file, self.output_file, str(self.sleep)]
+
+
+class DeadEngine(StandInEngine):
+    """Process that ends without writing any frame"""
+    def engine_command(self):
+        return [sys.executable, '-c', 'pass']
+
+
+class testExternalEngine(object):
+    def setup(self):
+        self.directory = tempfile.mkdtemp()
+        self.options = {'n_frames_max': 10000,
+                        'engine_directory': self.directory,
+                        'poll_interval': 0.001}
+        self.descriptor = SnapshotDescriptor.construct(
+            toys.Snapshot,
+            {'n_atoms': 1, 'n_spatial': 1}
+        )
+        self.initial = toys.Snapshot(coordinates=np.array([[0.0]]),
+                                     velocities=np.array([[1.0]]))
+
+    def teardown(self):
+        shutil.rmtree(self.directory)
+
+    def test_generate(self):
+        engine = StandInEngine(self.options, self.descriptor)
+        traj = engine.generate(self.initial,
+                               running=[lambda t, trusted: len(t) < 5])
+        assert_equal(len(traj), 5)
+        assert_allclose([s.xyz[0][0] for s in traj],
+                        [0.0, 0.1, 0.2, 0.3, 0.4])
+        assert_equal(engine.proc, None)
+        assert_true(os.path.isfile(engine.input_file))
+        assert_true(os.path.isfile(engine.output_file))
+
+    def test_file_names(self):
+        engine = StandInEngine(self.options, self.descriptor)
+        running = [lambda t, trusted: len(t) < 2]
+        engine.generate(self.initial, running=running)
+        first = engine.output_file
+        engine.generate(self.initial, running=running)
+        assert_equal(first, os.path.join(self.directory,
+                                         'ops_trajectory0000000.out'))
+        assert_equal(engine.output_file,
+                     os.path.join(self.directory,
+                                  'ops_trajectory0000001.out'))
+
+    def test_file_names_not_reused(self):
+        running = [lambda t, trusted: len(t) < 2]
+        engine = StandInEngine(self.options, self.descriptor)
+        engine.generate(self.initial, running=running)
+        first = engine.output_file
+        # another engine in the same directory does not overwrite them
+        other = StandInEngine(self.options, self.descriptor)
+        other.generate(self.initial, running=running)
+        assert_equal(other.output_file,
+                     os.path.join(self.directory,
+                                  'ops_trajectory0000001.out'))
+        assert_true(os.path.isfile(first))
+
+    def test_process_stopped_on_error(self):
+        engine = StandInEngine(self.options, self.descriptor, sleep=0.05)
+        procs = []
+
+        def failing(trajectory, trusted):
+            procs.append(engine.proc)
+            if len(trajectory) > 1:
+                raise ValueError("condition failed")
+            return True
+
+        try:
+            engine.generate(self.initial, running=[failing])
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("the error was not raised")
+
+        assert_equal(engine.proc, None)
+        assert_true(procs[-1].poll() is not None)
+
+    def test_process_killed(self):
+        # a slow engine has to be stopped long before it finishes
+        engine = StandInEngine(self.options, self.descriptor, sleep=0.05)
+        engine.generate(self.initial,
+                        running=[lambda t, trusted: len(t) < 3])
+        with open(engine.output_file) as f:
+            n_lines = len(f.readlines())
+        assert_true(n_lines < 10)
+
+    @raises(RuntimeError)
+    def test_process_dies(self):
+        engine = DeadEngine(self.options, self.descriptor)
+        engine.generate(self.initial,
+                        running=[lambda t, trusted: len(t) < 3])
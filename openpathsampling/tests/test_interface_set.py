@@ -62,6 +62,37 @@ class testInterfaceSet(object):
             assert_equal(vol, self.volumes[3-i])
             i += 1
 
+    def test_interface_index(self):
+        values = [-0.1, 0.0, 0.05, 0.1, 0.25, 0.5]
+        assert_equal(list(self.interface_set.interface_index(values)),
+                     [-1, -1, 0, 0, 2, 3])
+        assert_equal(self.interface_set.interface_index(0.15), 1)
+        assert_equal(list(self.decreasing.interface_index(values)),
+                     [3, 2, 2, 1, 0, -1])
+
+    def test_interface_index_boundaries(self):
+        # a value at an interface's lambda has not crossed that interface
+        assert_equal(list(self.interface_set.interface_index(
+            [0.0, 0.1, 0.3, 0.3001])), [-1, 0, 2, 3])
+        assert_equal(list(self.decreasing.interface_index(
+            [0.3, 0.2, 0.0, -0.0001])), [-1, 0, 2, 3])
+
+    def test_max_lambda(self):
+        values = [0.05, 0.25, 0.15, -0.1]
+        assert_equal(self.interface_set.max_lambda(values), 0.25)
+        assert_equal(self.decreasing.max_lambda(values), -0.1)
+        # lambdas are not needed
+        assert_equal(self.no_lambda_set.max_lambda(values), 0.25)
+        unordered = paths.InterfaceSet(self.volumes, self.cv,
+                                       [0.0, 0.2, 0.1, 0.3], direction=1)
+        assert_equal(unordered.max_lambda(values), 0.25)
+        no_lambdas = paths.InterfaceSet(self.volumes, self.cv, direction=-1)
+        assert_equal(no_lambdas.max_lambda(values), -0.1)
+
+    @raises(RuntimeError)
+    def test_interface_index_no_lambdas(self):
+        self.no_lambda_set.interface_index([0.0, 0.1])
+
 
 class testGenericVolumeInterfaceSet(object):
     def test_sanitize_input(self):
@@ -116,6 +147,18 @@ class testVolumeInterfaceSet(object):
         expected = paths.CVDefinedVolume(self.cv, float("-inf"), 0.25)
         assert_equal(expected, new_iface)
 
+    def test_flat_volumes(self):
+        # interfaces cut by a CV range combination are flat range sets
+        left = paths.CVDefinedVolume(self.cv, float("-inf"), -0.5)
+        right = paths.CVDefinedVolume(self.cv, -0.3, float("inf"))
+        iface_set = paths.VolumeInterfaceSet(cv=self.cv,
+                                             minvals=float("-inf"),
+                                             maxvals=[0.0, 0.1],
+                                             intersect_with=left | right)
+        for (vol, lambda_i) in zip(iface_set, [0.0, 0.1]):
+            assert_equal(vol, paths.CVRangeSetVolume(
+                self.cv, [(float("-inf"), -0.5), (-0.3, lambda_i)]))
+
     @raises(TypeError)
     def test_bad_new_interface(self):
         self.weird_set.new_interface(0.25)
@@ -160,6 +203,14 @@ class testPeriodicVolumeInterfaceSet(object):
         assert_equal(len(self.increasing_set), 3)
         assert_equal(self.increasing_set.lambdas, [100, 150, -160])
 
+    def test_interface_index(self):
+        # lambdas are [100, 150, -160] from the fixed end at 0.0
+        values = [50, 120, 170, -150, 190]
+        assert_equal(list(self.increasing_set.interface_index(values)),
+                     [-1, 0, 1, 2, 1])
+        assert_equal(self.increasing_set.max_lambda([10, 120, 170, -170]),
+                     -170)
+
     def test_new_interface(self):
         new_iface = self.increasing_set.new_interface(-140)
         expected = paths.PeriodicCVDefinedVolume(self.cv, 0.0, -140, -180, 180)
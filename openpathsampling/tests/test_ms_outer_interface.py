@@ -89,6 +89,17 @@ class testMSOuterTISInterface(object):
             0.4
         )
 
+    def test_interface_index(self):
+        values = [-0.1, 0.05, 0.35, 0.45, 0.6]
+        assert_equal(
+            list(self.ms_outer.interface_index(self.interfaces_inc, values)),
+            [-1, 0, 3, 3, 4]
+        )
+        assert_equal(
+            list(self.ms_outer.interface_index(self.interfaces_dec, values)),
+            [-1, 0, 3, 4, 4]
+        )
+
     def test_relevant_transitions(self):
         extra_set = paths.VolumeInterfaceSet(self.cv_inc, 0.0, [0.2, 0.3])
         extra = paths.TISTransition(self.stateA, self.stateB, extra_set,
@@ -0,0 +1,106 @@
+from nose.tools import (assert_equal, assert_not_equal, assert_true,
+                        raises)
+import numpy as np
+
+import openpathsampling as paths
+from openpathsampling.random_streams import (RandomStreams,
+                                             RandomStreamUser,
+                                             random_choice)
+from openpathsampling.ensemble import LengthEnsemble
+from test_helpers import make_1d_traj
+
+
+class testRandomStreams(object):
+    def setup(self):
+        self.streams = RandomStreams(5)
+
+    def test_reproducible(self):
+        first = self.streams.stream('a').random_sample(5)
+        assert_true(self.streams.stream('a') is self.streams.stream('a'))
+        other = RandomStreams(5)
+        np.testing.assert_array_equal(other.stream('a').random_sample(5),
+                                      first)
+
+    def test_independent(self):
+        a = self.streams.stream('a').random_sample(5)
+        b = self.streams.stream('b').random_sample(5)
+        assert_true(np.all(a != b))
+        # drawing from `b` first does not change `a`
+        other = RandomStreams(5)
+        other.stream('b').random_sample(5)
+        np.testing.assert_array_equal(other.stream('a').random_sample(5), a)
+
+    def test_set_step(self):
+        first = self.streams.stream('a').random_sample()
+        self.streams.set_step(1)
+        assert_not_equal(self.streams.stream('a').random_sample(), first)
+        self.streams.set_step(0)
+        assert_equal(self.streams.stream('a').random_sample(), first)
+
+    def test_spawn(self):
+        spawned = self.streams.spawn('x')
+        assert_not_equal(spawned.seed, self.streams.seed)
+        assert_equal(spawned.seed, self.streams.spawn('x').seed)
+
+    def test_random_choice(self):
+        items = ['a', 'b', 'c']
+        picks = [random_choice(self.streams.stream('a'), items)
+                 for _ in range(20)]
+        assert_equal(set(picks), set(items))
+
+    @raises(IndexError)
+    def test_random_choice_empty(self):
+        random_choice(self.streams.stream('a'), [])
+
+    def test_default_rng(self):
+        assert_true(RandomStreamUser().rng is np.random)
+
+    def test_assign(self):
+        ensemble = LengthEnsemble(3)
+        selector = paths.UniformSelector()
+        mover = paths.OneWayShootingMover(ensemble=ensemble,
+                                          selector=selector)
+        self.streams.assign(mover)
+        keys = [submover._random_key for submover in mover]
+        assert_equal(len(set(keys)), len(keys))
+        assert_equal(mover._random_key, 'mover/0')
+        assert_true(selector._random_streams is self.streams)
+        assert_true(selector._random_key.endswith('/selector'))
+
+    def test_sample_set(self):
+        ensemble = LengthEnsemble(1)
+        samples = [paths.Sample(replica=idx, ensemble=ensemble,
+                                trajectory=make_1d_traj([float(idx)]))
+                   for idx in range(5)]
+        sample_set = paths.SampleSet(samples)
+        sample_set.set_random_stream(self.streams, 'sample_set')
+        picks = [sample_set[ensemble] for _ in range(10)]
+        copied = sample_set.copy()
+        self.streams.set_step(1)
+        self.streams.set_step(0)
+        assert_equal([copied[ensemble] for _ in range(10)], picks)
+
+    def _reversal_move(self, streams=None):
+        ensemble = paths.AllOutXEnsemble(paths.EmptyVolume())
+        sample_set = paths.SampleSet([paths.Sample(
+            replica=0, ensemble=ensemble,
+            trajectory=make_1d_traj([0.1, 0.2, 0.3]))])
+        mover = paths.PathReversalMover(ensemble)
+        if streams is not None:
+            streams.assign(mover)
+        return mover.move(sample_set)
+
+    def test_sample_mover_seeded(self):
+        change = self._reversal_move(self.streams)
+        assert_true(change.accepted)
+        rand = change.details.metropolis_random
+        assert_equal(self._reversal_move(RandomStreams(5))
+                     .details.metropolis_random, rand)
+
+    def test_sample_mover_global(self):
+        np.random.seed(3)
+        change = self._reversal_move()
+        assert_true(change.accepted)
+        np.random.seed(3)
+        assert_equal(self._reversal_move().details.metropolis_random,
+                     change.details.metropolis_random)
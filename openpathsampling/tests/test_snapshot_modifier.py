@@ -91,10 +91,11 @@ class testNoModification(object):
                                   new_3D.coordinates)
         assert_array_almost_equal(self.snapshot_3D.velocities,
                                   new_3D.velocities)
-        assert_true(self.snapshot_1D.coordinates is not new_1D.coordinates)
-        assert_true(self.snapshot_1D.velocities is not new_1D.velocities)
-        assert_true(self.snapshot_3D.coordinates is not new_3D.coordinates)
-        assert_true(self.snapshot_3D.velocities is not new_3D.velocities)
+        # read-only arrays are shared, not copied
+        assert_true(self.snapshot_1D.coordinates is new_1D.coordinates)
+        assert_true(self.snapshot_1D.velocities is new_1D.velocities)
+        assert_true(self.snapshot_3D.coordinates is new_3D.coordinates)
+        assert_true(self.snapshot_3D.velocities is new_3D.velocities)
 
 
 class testRandomizeVelocities(object):
@@ -137,7 +138,7 @@ class testRandomizeVelocities(object):
         assert_array_almost_equal(new_1x2D.coordinates,
                                   self.snap_1x2D.coordinates)
         assert_true(new_1x2D is not self.snap_1x2D)
-        assert_true(new_1x2D.coordinates is not self.snap_1x2D.coordinates)
+        assert_true(new_1x2D.coordinates is self.snap_1x2D.coordinates)
         assert_true(new_1x2D.velocities is not self.snap_1x2D.velocities)
         for val in new_1x2D.velocities.flatten():
             assert_not_equal(val, 0.0)
@@ -147,7 +148,7 @@ class testRandomizeVelocities(object):
         assert_array_almost_equal(new_2x3D.coordinates,
                                   self.snap_2x3D.coordinates)
         assert_true(new_2x3D is not self.snap_2x3D)
-        assert_true(new_2x3D.coordinates is not self.snap_2x3D.coordinates)
+        assert_true(new_2x3D.coordinates is self.snap_2x3D.coordinates)
         assert_true(new_2x3D.velocities is not self.snap_2x3D.velocities)
         for val in new_2x3D.velocities.flatten():
             assert_not_equal(val, 0.0)
@@ -157,7 +158,7 @@ class testRandomizeVelocities(object):
         assert_array_almost_equal(new_3x1D.coordinates,
                                   self.snap_3x1D.coordinates)
         assert_true(new_3x1D is not self.snap_3x1D)
-        assert_true(new_3x1D.coordinates is not self.snap_3x1D.coordinates)
+        assert_true(new_3x1D.coordinates is self.snap_3x1D.coordinates)
         assert_true(new_3x1D.velocities is not self.snap_3x1D.velocities)
         for val in new_3x1D.velocities.flatten():
             assert_not_equal(val, 0.0)
@@ -169,7 +170,7 @@ class testRandomizeVelocities(object):
         assert_array_almost_equal(new_2x3D.coordinates,
                                   self.snap_2x3D.coordinates)
         assert_true(new_2x3D is not self.snap_2x3D)
-        assert_true(new_2x3D.coordinates is not self.snap_2x3D.coordinates)
+        assert_true(new_2x3D.coordinates is self.snap_2x3D.coordinates)
         assert_true(new_2x3D.velocities is not self.snap_2x3D.velocities)
         # show that the unchanged atom is, in fact, unchanged
         assert_array_almost_equal(new_2x3D.velocities[1],
@@ -177,6 +178,37 @@ class testRandomizeVelocities(object):
         for val in new_2x3D.velocities[0]:
             assert_not_equal(val, 0.0)
 
+    def test_modify_all(self):
+        randomizer = RandomVelocities(beta=1.0/5.0)
+        new_snaps = randomizer.modify_all([self.snap_2x3D] * 3 +
+                                          [self.snap_1x2D])
+        assert_equal(len(new_snaps), 4)
+        assert_equal(len(set(new_snaps)), 4)
+        for snap in new_snaps[:3]:
+            assert_true(snap.coordinates is self.snap_2x3D.coordinates)
+        assert_true(not np.allclose(new_snaps[0].velocities,
+                                    new_snaps[1].velocities))
+        assert_equal(new_snaps[3].velocities.shape, (1, 2))
+
+    def test_sigmas_cached(self):
+        randomizer = RandomVelocities(beta=1.0/5.0, subset_mask=[1])
+        randomizer(self.snap_2x3D)
+        sigmas = randomizer._cached_per_engine(
+            self.snap_2x3D, 'sigmas', (randomizer.beta,
+                                       randomizer.subset_mask),
+            lambda: None
+        )
+        assert_array_almost_equal(sigmas, [[np.sqrt(5.0 / 3.0)]])
+        # a new beta invalidates the cached widths
+        randomizer.beta = 1.0 / 2.0
+        randomizer(self.snap_2x3D)
+        sigmas = randomizer._cached_per_engine(
+            self.snap_2x3D, 'sigmas', (randomizer.beta,
+                                       randomizer.subset_mask),
+            lambda: None
+        )
+        assert_array_almost_equal(sigmas, [[np.sqrt(2.0 / 3.0)]])
+
     def test_with_openmm_snapshot(self):
         # note: this is only a smoke test; correctness depends on OpenMM's
         # tests of its constraint approaches.
@@ -223,6 +255,15 @@ class testRandomizeVelocities(object):
         assert_equal(engine.current_snapshot, zero_snap)
         engine.generate(new_snap, [lambda x, foo: len(x) <= 4])
 
+        # constraints for several snapshots in one batch
+        engine.current_snapshot = zero_snap
+        new_snaps = randomizer.modify_all([template] * 3)
+        assert_equal(len(new_snaps), 3)
+        assert_equal(engine.current_snapshot, zero_snap)
+        for snap in new_snaps:
+            assert_array_almost_equal(template.coordinates, snap.coordinates)
+            assert_equal(snap.engine, engine)
+
 class testGeneralizedDirectionModifier(object):
     def setup(self):
         import openpathsampling.engines.toy as toys
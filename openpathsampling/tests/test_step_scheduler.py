@@ -0,0 +1,145 @@
+import os
+
+import numpy as np
+from nose.tools import assert_equal, assert_true
+
+import openpathsampling as paths
+import openpathsampling.engines.toy as toys
+from openpathsampling.ensemble import LengthEnsemble
+from openpathsampling.random_streams import RandomStreams
+from openpathsampling.step_scheduler import StepScheduler
+from test_helpers import make_1d_traj, data_filename
+
+
+class testStepScheduler(object):
+    def setup(self):
+        self.ens1 = LengthEnsemble(3)
+        self.ens2 = LengthEnsemble(4)
+        self.ens3 = LengthEnsemble(5)
+        self.repex = paths.ReplicaExchangeMover(self.ens1, self.ens2)
+        self.reversal1 = paths.PathReversalMover(self.ens1)
+        self.reversal3 = paths.PathReversalMover(self.ens3)
+        self.root = paths.RandomChoiceMover(
+            [self.repex, self.reversal3, self.reversal1])
+        self.ensembles = {
+            self.repex: {self.ens1, self.ens2},
+            self.reversal1: {self.ens1},
+            self.reversal3: {self.ens3}
+        }
+        self.sample_set = paths.SampleSet([
+            paths.Sample(replica=idx, ensemble=ens,
+                         trajectory=make_1d_traj(range(length)))
+            for idx, (ens, length) in enumerate([(self.ens1, 3),
+                                                 (self.ens2, 4),
+                                                 (self.ens3, 5)])
+        ])
+        self.streams = RandomStreams(11)
+        self.streams.assign(self.root)
+        self.scheduler = StepScheduler(self.root, self.streams)
+
+    def test_predicted_mover(self):
+        for step in range(1, 20):
+            predicted = self.scheduler.predicted_mover(step)
+            self.streams.set_step(step)
+            change = self.root.move(self.sample_set)
+            assert_true(change.subchange.mover is predicted)
+
+    def test_independent(self):
+        movers = [self.scheduler.predicted_mover(step)
+                  for step in range(1, 10)]
+        for step in range(2, 10):
+            expected = not (self.ensembles[movers[step - 1]] &
+                            self.ensembles[movers[step - 2]])
+            assert_equal(self.scheduler.independent(step, [step - 1]),
+                         expected)
+        assert_true(self.scheduler.independent(1, []))
+
+    def test_concurrent_run(self):
+        final = []
+        for max_concurrent_steps in [1, 3]:
+            scheme = paths.LockedMoveScheme(self.root)
+            sim = paths.PathSampling(storage=None, move_scheme=scheme,
+                                     sample_set=self.sample_set)
+            sim.output_stream = open(os.devnull, 'w')
+            sim.set_random_seed(3)
+            sim.max_concurrent_steps = max_concurrent_steps
+            sim.run(20)
+            assert_equal(sim.step, 20)
+            assert_equal(sim.current_step.mccycle, 20)
+            final.append({
+                sample.replica: [s.xyz[0][0] for s in sample.trajectory]
+                for sample in sim.sample_set
+            })
+
+        assert_equal(final[0], final[1])
+
+
+class testConcurrentShooting(object):
+    def setup(self):
+        # 1D motion on a flat potential, two TPS ensembles with their own
+        # engines, so that shooting moves in both can run at the same time
+        pes = toys.LinearSlope(m=[0.0], c=[0.0])
+        topology = toys.Topology(n_spatial=1, masses=[1.0], pes=pes)
+        self.engines = [
+            toys.Engine(options={'integ': toys.LeapfrogVerletIntegrator(0.1),
+                                 'n_frames_max': 1000,
+                                 'n_steps_per_frame': 5},
+                        topology=topology)
+            for _ in range(2)
+        ]
+        cv = paths.FunctionCV("x", lambda snap: snap.coordinates[0][0])
+        left = paths.CVDefinedVolume(cv, float("-inf"), -1.0)
+        right = paths.CVDefinedVolume(cv, 1.0, float("inf"))
+        self.ensembles = [paths.TPSNetwork(left, right).all_ensembles[0]
+                          for _ in range(2)]
+        self.root = paths.RandomChoiceMover([
+            paths.OneWayShootingMover(ensemble=ens,
+                                      selector=paths.UniformSelector(),
+                                      engine=engine)
+            for ens, engine in zip(self.ensembles, self.engines)
+        ])
+        trajectory = paths.Trajectory([
+            toys.Snapshot(coordinates=np.array([[x]]),
+                          velocities=np.array([[1.0]]),
+                          engine=self.engines[0])
+            for x in [-1.5, -0.5, 0.0, 0.5, 1.5]
+        ])
+        self.sample_set = paths.SampleSet([
+            paths.Sample(replica=idx, ensemble=ens, trajectory=trajectory)
+            for idx, ens in enumerate(self.ensembles)
+        ])
+        self.filenames = [data_filename("concurrent_shooting_%d.nc" % idx)
+                          for idx in range(2)]
+
+    def teardown(self):
+        for filename in self.filenames:
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+    def test_concurrent_shooting(self):
+        final = []
+        for filename, max_concurrent_steps in zip(self.filenames, [1, 2]):
+            storage = paths.Storage(filename, "w")
+            scheme = paths.LockedMoveScheme(self.root)
+            sim = paths.PathSampling(storage=storage, move_scheme=scheme,
+                                     sample_set=self.sample_set)
+            sim.output_stream = open(os.devnull, 'w')
+            sim.set_random_seed(5)
+            sim.max_concurrent_steps = max_concurrent_steps
+            sim.run(10)
+            for engine in self.engines:
+                assert_equal(engine._step_lock, None)
+            storage.close()
+
+            storage = paths.Storage(filename, "r")
+            assert_equal([step.mccycle for step in storage.steps],
+                         range(11))
+            final.append((
+                [step.change.accepted for step in storage.steps],
+                {sample.replica: [s.coordinates[0][0]
+                                  for s in sample.trajectory]
+                 for sample in storage.steps[10].active}
+            ))
+            storage.close()
+
+        assert_equal(final[0], final[1])
@@ -234,6 +234,22 @@ class testToyEngine(object):
         self.sim.start(snapshot=snap)
         self.sim.stop([snap])
 
+    def test_float32(self):
+        assert_equal(self.sim.snapshot_dtype, np.float64)
+        self.sim.options['float32'] = True
+        assert_equal(self.sim.snapshot_dtype, np.float32)
+        snap = self.sim.current_snapshot
+        assert_equal(snap.coordinates.dtype, np.float32)
+        assert_equal(snap.velocities.dtype, np.float32)
+
+        # the engine itself keeps integrating in double precision
+        self.sim.current_snapshot = snap
+        assert_equal(self.sim.positions.dtype, np.float64)
+
+        traj = paths.Trajectory([snap, self.sim.generate_next_frame()])
+        assert_equal(traj.coordinates.dtype, np.float32)
+        assert_equal(traj.reversed.velocities.dtype, np.float32)
+
 
 # === TESTS FOR TOY INTEGRATORS ===========================================
 
@@ -1,3 +1,4 @@
+import numpy as np
 import openpathsampling as paths
 
 from nose.tools import (assert_equal, assert_not_equal, raises)
@@ -21,6 +22,29 @@ class StupidEngine(paths.engines.DynamicsEngine):
         return self.attempted
 
 
+class ListEngine(paths.engines.DynamicsEngine):
+    """Returns the frames of `frames` in order and counts the NaN checks"""
+    _default_options = {}
+
+    def __init__(self, frames, options=None):
+        super(ListEngine, self).__init__(options)
+        self.frames = frames
+        self.n_checks = 0
+        self._next = 0
+
+    def start(self, snapshot=None):
+        self._next = 0
+
+    def generate_next_frame(self):
+        snapshot = self.frames[self._next]
+        self._next += 1
+        return snapshot
+
+    def is_valid_snapshot(self, snapshot):
+        self.n_checks += 1
+        return not np.any(np.isnan(snapshot.coordinates))
+
+
 class testDynamicsEngine(object):
     def setup(self):
         options = {'n_frames_max' : 100, 'random_option' : True}
@@ -61,3 +85,141 @@ class testDynamicsEngine(object):
         assert (self.engine.n_spatial == 1)
         assert(self.stupid.n_atoms == 1)
         assert (self.stupid.n_spatial == 1)
+
+    def test_duplicate(self):
+        duplicate = self.stupid.duplicate()
+        assert_not_equal(duplicate, self.stupid)
+        assert_equal(duplicate.__class__, StupidEngine)
+        assert_equal(duplicate.options, self.stupid.options)
+        assert_equal(duplicate.random_option, True)
+
+
+class testEnginePool(object):
+    def setup(self):
+        options = {'n_frames_max': 100}
+        self.engine = StupidEngine(options)
+        self.pool = paths.engines.EnginePool.from_engine(self.engine, 2)
+
+    def test_from_engine(self):
+        assert_equal(len(self.pool), 2)
+        assert_equal(len(set(self.pool.engines)), 2)
+        for engine in self.pool.engines:
+            assert_not_equal(engine, self.engine)
+            assert_equal(engine.n_frames_max, 100)
+            # snapshots of the duplicates refer to the original engine
+            assert(engine.snapshot_engine is self.engine)
+
+    def test_acquire_release(self):
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        assert_not_equal(first, second)
+        self.pool.release(first)
+        assert_equal(self.pool.acquire(), first)
+        self.pool.release(first)
+        self.pool.release(second)
+
+    def test_engine_context(self):
+        with self.pool.engine() as engine:
+            assert(engine in self.pool.engines)
+            with self.pool.engine() as other:
+                assert_not_equal(engine, other)
+        # both are back in the pool
+        engines = [self.pool.acquire(), self.pool.acquire()]
+        assert_equal(set(engines), set(self.pool.engines))
+
+    def test_map(self):
+        results = self.pool.map(lambda engine, x: (engine, 2 * x), range(5))
+        assert_equal([r[1] for r in results], [0, 2, 4, 6, 8])
+        for engine, _ in results:
+            assert(engine in self.pool.engines)
+
+    @raises(ValueError)
+    def test_map_raises(self):
+        def fail_on_odd(engine, x):
+            if x % 2:
+                raise ValueError("odd")
+            return x
+
+        self.pool.map(fail_on_odd, range(3))
+
+
+class testNaNCheckInterval(object):
+    def setup(self):
+        self.good = make_1d_traj(coordinates=[0.0, 0.1, 0.2, 0.3, 0.4, 0.5,
+                                              0.6, 0.7, 0.8])
+        self.bad = make_1d_traj(coordinates=[0.0, 0.1, 0.2, 0.3, float('nan'),
+                                             float('nan'), float('nan'),
+                                             float('nan'), float('nan')])
+        self.running = lambda traj, trusted: len(traj) < 8
+
+    def _engine(self, frames, interval):
+        return ListEngine(frames[1:], options={'n_frames_max': 100,
+                                               'nan_check_interval': interval,
+                                               'on_nan': 'fail'})
+
+    def test_check_every_frame(self):
+        engine = self._engine(self.good, 1)
+        traj = engine.generate(self.good[0], running=[self.running])
+        assert_equal(len(traj), 8)
+        assert_equal(engine.n_checks, 7)
+
+    def test_check_every_k_frames(self):
+        engine = self._engine(self.good, 3)
+        traj = engine.generate(self.good[0], running=[self.running])
+        assert_equal(len(traj), 8)
+        # frames 3 and 6 and the final check of frame 7
+        assert_equal(engine.n_checks, 3)
+
+    def test_check_at_end(self):
+        engine = self._engine(self.good, 0)
+        traj = engine.generate(self.good[0], running=[self.running])
+        assert_equal(len(traj), 8)
+        assert_equal(engine.n_checks, 1)
+
+    def _assert_rollback(self, interval):
+        engine = self._engine(self.bad, interval)
+        try:
+            engine.generate(self.bad[0], running=[self.running])
+        except paths.engines.EngineNaNError as e:
+            # rolled back to the last frame before the first NaN
+            assert_equal(len(e.last_trajectory), 4)
+            assert_equal(e.last_trajectory[-1], self.bad[3])
+        else:
+            raise AssertionError("NaN was not detected")
+
+    def test_rollback_every_frame(self):
+        self._assert_rollback(1)
+
+    def test_rollback_every_k_frames(self):
+        self._assert_rollback(3)
+
+    def test_rollback_at_end(self):
+        self._assert_rollback(0)
+
+
+class testAsyncFrames(testNaNCheckInterval):
+    # runs the NaN check tests with frames generated in a worker thread
+    def _engine(self, frames, interval):
+        return ListEngine(frames[1:], options={'n_frames_max': 100,
+                                               'nan_check_interval': interval,
+                                               'on_nan': 'fail',
+                                               'async_frames': 2})
+
+    def test_same_trajectory(self):
+        engine = self._engine(self.good, 1)
+        traj = engine.generate(self.good[0], running=[self.running])
+        assert_equal(list(traj), list(self.good[0:8]))
+        # frames generated ahead (even failing ones) are discarded
+        traj = engine.generate(self.good[0],
+                               running=[lambda t, trusted: len(t) < 9])
+        assert_equal(list(traj), list(self.good))
+
+    def test_error_in_worker(self):
+        engine = self._engine(self.good, 1)
+        try:
+            engine.generate(self.good[0],
+                            running=[lambda t, trusted: len(t) < 20])
+        except IndexError:
+            pass
+        else:
+            raise AssertionError("Error in worker thread was not raised")
@@ -1401,6 +1401,77 @@ class testEnsembleCache(EnsembleCacheTest):
         assert_equal(self._was_cache_reset(self.rev), True)
 
 
+class testEnsembleResultMemo(EnsembleTest):
+    def setup(self):
+        self.memo = EnsembleResultMemo(max_size=2)
+        self.ensemble = AllInXEnsemble(vol1)
+        self.other_ensemble = AllOutXEnsemble(vol1)
+        self.traj_in = ttraj['upper_in_in']
+        self.traj_out = ttraj['lower_out_out']
+
+    def test_memo_hits(self):
+        assert_equal(self.memo(self.ensemble, self.traj_in), True)
+        assert_equal((self.memo.hits, self.memo.misses), (0, 1))
+        assert_equal(self.memo(self.ensemble, self.traj_in), True)
+        assert_equal((self.memo.hits, self.memo.misses), (1, 1))
+        assert_equal(self.memo(self.other_ensemble, self.traj_in), False)
+        assert_equal((self.memo.hits, self.memo.misses), (1, 2))
+
+    def test_changed_trajectory(self):
+        traj = paths.Trajectory(self.traj_in)
+        assert_equal(self.memo(self.ensemble, traj), True)
+        traj.append(self.traj_out[0])
+        assert_equal(self.memo(self.ensemble, traj), False)
+        assert_equal((self.memo.hits, self.memo.misses), (0, 2))
+
+    def test_changed_in_place(self):
+        traj = paths.Trajectory(self.traj_in)
+        assert_equal(self.memo(self.ensemble, traj), True)
+        traj[0] = self.traj_out[0]
+        assert_equal(self.memo(self.ensemble, traj), False)
+        assert_equal((self.memo.hits, self.memo.misses), (0, 2))
+
+    def test_frames_without_uuid(self):
+        traj = paths.Trajectory([0.1, 0.2, 0.3])
+        ensemble = LengthEnsemble(3)
+        assert_equal(self.memo(ensemble, traj), True)
+        assert_equal(self.memo(ensemble, traj), True)
+        assert_equal((self.memo.hits, self.memo.misses), (1, 1))
+        # plain lists are not memoized
+        assert_equal(self.memo(ensemble, [0.1, 0.2, 0.3]), True)
+        assert_equal(len(self.memo), 1)
+
+    def test_lru_eviction(self):
+        self.memo(self.ensemble, self.traj_in)
+        self.memo(self.ensemble, self.traj_out)
+        # use traj_in again so that traj_out is the least recently used
+        self.memo(self.ensemble, self.traj_in)
+        self.memo(self.other_ensemble, self.traj_in)
+        assert_equal(len(self.memo), 2)
+        self.memo(self.ensemble, self.traj_in)
+        assert_equal(self.memo.misses, 3)
+        self.memo(self.ensemble, self.traj_out)
+        assert_equal(self.memo.misses, 4)
+
+    def test_invalidate(self):
+        self.memo(self.ensemble, self.traj_in)
+        self.memo(self.ensemble, self.traj_out)
+        self.memo.invalidate(self.traj_in)
+        assert_equal(len(self.memo), 1)
+        self.memo.invalidate()
+        assert_equal(len(self.memo), 0)
+
+    def test_disabled(self):
+        self.memo.enabled = False
+        self.memo(self.ensemble, self.traj_in)
+        self.memo(self.ensemble, self.traj_in)
+        assert_equal(len(self.memo), 0)
+
+    def test_memoized_call(self):
+        assert_equal(self.ensemble.memoized_call(self.traj_in), True)
+        assert_equal(self.ensemble.memoized_call(self.traj_out), False)
+
+
 class testSequentialEnsembleCache(EnsembleCacheTest):
     def setUp(self):
         self.inX = AllInXEnsemble(vol1)
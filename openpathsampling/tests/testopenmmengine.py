@@ -154,6 +154,18 @@ class testOpenMMEngine(object):
         assert_not_equal_array_array(old_pos, new_pos)
         assert_not_equal_array_array(old_vel, new_vel)
 
+    def test_generate_next_frame_buffers(self):
+        # snapshots own their (uncopied) arrays; frames must not share them
+        snap1 = self.engine.generate_next_frame()
+        snap2 = self.engine.generate_next_frame()
+        assert(not np.may_share_memory(snap1.coordinates._value,
+                                       snap2.coordinates._value))
+        assert(not np.may_share_memory(snap1.velocities._value,
+                                       snap2.velocities._value))
+        old_pos = np.array(snap1.coordinates / u.nanometers)
+        self.engine.generate_next_frame()
+        assert_equal_array_array(snap1.coordinates / u.nanometers, old_pos)
+
     def test_generate(self):
         try:
             _ = self.engine.generate(self.engine.current_snapshot, [true_func])
@@ -253,3 +265,33 @@ class testOpenMMEngine(object):
 
         # make sure there is no change!
         assert_equal(init_samp[0].trajectory, init_traj)
+
+    def test_apply_constraints_batch(self):
+        current = self.engine.current_snapshot
+        snaps = self.engine.apply_constraints_batch([template, template])
+        assert_equal(len(snaps), 2)
+        # the state of the simulation is not touched
+        assert(self.engine.current_snapshot is current)
+        for snap in snaps:
+            assert_equal(snap.engine, self.engine)
+            assert(snap.coordinates.shape == template.coordinates.shape)
+
+        single = self.engine.apply_constraints(template)
+        assert(self.engine.current_snapshot is current)
+        assert_equal_array_array(single.coordinates / u.nanometers,
+                                 snaps[0].coordinates / u.nanometers)
+
+    def test_float32(self):
+        self.engine.options['float32'] = True
+        try:
+            self.engine.current_snapshot = template
+            snap = self.engine.generate_next_frame()
+            assert_equal(snap.coordinates._value.dtype, np.float32)
+            assert_equal(snap.velocities._value.dtype, np.float32)
+            # float32 snapshots are upcast when loaded into the context
+            self.engine._changed()
+            self.engine.current_snapshot = snap
+            snap2 = self.engine.generate_next_frame()
+            assert_equal(snap2.coordinates._value.dtype, np.float32)
+        finally:
+            self.engine.options['float32'] = False
@@ -17,6 +17,7 @@ from openpathsampling.sample import Sample, SampleSet
 from openpathsampling.shooting import UniformSelector
 from openpathsampling.volume import CVDefinedVolume
 import openpathsampling.engines.toy as toys
+import time
 from test_helpers import CallIdentity, raises_with_message_like
 from test_helpers import (assert_equal_array_array, items_equal,
                           make_1d_traj,
@@ -94,11 +95,30 @@ class testPathMover(object):
             paths.PathMover.legal_sample_set(self.sset, ensembles=[self.l1]),
             [self.s2, self.s3]
         )
+        assert_equal(
+            paths.PathMover.legal_sample_set(
+                self.sset, ensembles=[self.l3, self.l1, self.l3],
+                replicas=[2]),
+            [self.s4, self.s2]
+        )
+        assert_items_equal(
+            paths.PathMover.legal_sample_set(self.sset, replicas=[1, 3]),
+            [self.s1, self.s3]
+        )
+        assert_items_equal(
+            paths.PathMover.legal_sample_set(self.sset, ensembles='all'),
+            [self.s1, self.s2, self.s3, self.s4]
+        )
 
     def test_select_sample(self):
         for i in range(20):
             selected = PathMover.select_sample(self.sset)
             assert_choice_of(selected, [self.s1, self.s2, self.s3, self.s4])
+            selected = PathMover.select_sample(self.sset, self.l1)
+            assert_choice_of(selected, [self.s2, self.s3])
+            selected = PathMover.select_sample(self.sset, [self.l1],
+                                               replicas=[3])
+            assert_equal(selected, self.s3)
 
     def test_is_ensemble_change_mover(self):
         pm = IdentityPathMover()
@@ -114,6 +134,20 @@ class testPathMover(object):
         assert_equal(pm.is_canonical, True)
 
 
+class FixedPointSelector(UniformSelector):
+    """Always picks `index` and bounds acceptable trials to `max_length`"""
+    def __init__(self, index, max_length):
+        super(FixedPointSelector, self).__init__()
+        self.index = index
+        self.max_length = max_length
+
+    def pick(self, trajectory):
+        return self.index
+
+    def max_trial_length(self, trajectory, acceptance_random):
+        return self.max_length
+
+
 class testShootingMover(object):
     def setup(self):
         self.dyn = CalvinistDynamics([-0.1, 0.1, 0.3, 0.5, 0.7, 
@@ -199,6 +233,43 @@ class testForwardShootMover(testShootingMover):
 
         assert_equal(mover.is_ensemble_change_mover, False)
 
+    def test_run_max_length(self):
+        mover = ForwardShootMover(
+            ensemble=self.tps,
+            selector=UniformSelector(),
+            engine=self.dyn
+        )
+        self.dyn.initialized = True
+        traj = self.init_samp[0].trajectory
+        # shooting from 0.4 gives [-0.1, 0.1, 0.2, 0.3, 0.4, 0.6, 0.8]
+        trial, details = mover._run(traj, 4, max_length=7)
+        assert_equal(len(trial), 7)
+        try:
+            mover._run(traj, 4, max_length=6)
+        except paths.engines.EngineMaxLengthError as e:
+            assert_equal(len(e.last_trajectory), 2)
+        else:
+            raise AssertionError("Trial was not aborted")
+
+    def test_reject_early(self):
+        mover = ForwardShootMover(
+            ensemble=self.tps,
+            selector=FixedPointSelector(4, 6),
+            engine=self.dyn
+        )
+        mover.reject_early = True
+        self.dyn.initialized = True
+        change = mover.move(self.init_samp)
+        assert_equal(change.accepted, False)
+        assert_equal(change.details.rejection_reason, 'max_length')
+        assert_equal(change.details.max_trial_length, 6)
+
+        mover.selector.max_length = 7
+        change = mover.move(self.init_samp)
+        assert_equal(change.accepted, True)
+        assert_equal(len(change.trials[0].trajectory), 7)
+        assert_true(0.0 <= change.details.metropolis_random < 1.0)
+
 class testBackwardShootMover(testShootingMover):
     def test_move(self):
         mover = BackwardShootMover(
@@ -298,6 +369,122 @@ class testForwardFirstTwoWayShootingMover(testShootingMover):
                   change.initial_trajectory)
 
 
+    def test_run_max_length(self):
+        mover = self._MoverType(
+            ensemble=self.tps,
+            selector=UniformSelector(),
+            modifier=paths.NoModification(),
+            engine=self.dyn
+        )
+        traj, details = mover._run(self.init_samp[0].trajectory, 4,
+                                   max_length=5)
+        assert_allclose(traj.xyz[:,0,0], [-0.1, 0.2, 0.4, 0.6, 0.8])
+        try:
+            mover._run(self.init_samp[0].trajectory, 4, max_length=4)
+        except paths.engines.EngineMaxLengthError:
+            pass
+        else:
+            raise AssertionError("Trial was not aborted")
+
+
+    def test_run_engine_pool(self):
+        mover = self._MoverType(
+            ensemble=self.tps,
+            selector=UniformSelector(),
+            modifier=paths.NoModification(),
+            engine=self.dyn
+        )
+        predestination = [s.xyz[0][0] for s in self.dyn.predestination]
+        mover.engine_pool = paths.engines.EnginePool([
+            CalvinistDynamics(predestination),
+            CalvinistDynamics(predestination)
+        ])
+        # same results as the sequential run in test_run
+        traj, details = mover._run(self.init_samp[0].trajectory, 4)
+        assert_allclose(traj.xyz[:,0,0], [-0.1, 0.2, 0.4, 0.6, 0.8])
+        traj, details = mover._run(self.init_samp[0].trajectory, 3)
+        assert_allclose(traj.xyz[:,0,0], [-0.1, 0.1, 0.3, 0.5, 0.7])
+
+    def test_engine_pool_conditions_serialized(self):
+        mover = self._MoverType(
+            ensemble=self.tps,
+            selector=UniformSelector(),
+            modifier=paths.NoModification(),
+            engine=self.dyn
+        )
+        predestination = [s.xyz[0][0] for s in self.dyn.predestination]
+        mover.engine_pool = paths.engines.EnginePool([
+            CalvinistDynamics(predestination),
+            CalvinistDynamics(predestination)
+        ])
+        running = []
+        overlaps = []
+
+        def serialized(original):
+            def condition(ensemble, trajectory, trusted=False):
+                running.append(trajectory)
+                if len(running) > 1:
+                    overlaps.append(trajectory)
+                time.sleep(0.001)
+                result = original(ensemble, trajectory, trusted)
+                running.remove(trajectory)
+                return result
+            return condition
+
+        patched = [(cls, name, cls.__dict__.get(name))
+                   for cls, name in [
+                       (paths.PrefixTrajectoryEnsemble, 'can_append'),
+                       (paths.SuffixTrajectoryEnsemble, 'can_prepend')]]
+        for cls, name, _ in patched:
+            setattr(cls, name, serialized(getattr(cls, name).im_func))
+        try:
+            traj, details = mover._run(self.init_samp[0].trajectory, 4)
+        finally:
+            for cls, name, original in patched:
+                if original is None:
+                    delattr(cls, name)
+                else:
+                    setattr(cls, name, original)
+        assert_allclose(traj.xyz[:,0,0], [-0.1, 0.2, 0.4, 0.6, 0.8])
+        assert_equal(overlaps, [])
+
+    def test_complete_segment(self):
+        mover = self._MoverType(
+            ensemble=self.tps,
+            selector=UniformSelector(),
+            modifier=paths.NoModification(),
+            engine=self.dyn
+        )
+        speculative = self.dyn.predestination[0:5]
+        # stops earlier: truncate
+        segment = mover._complete_segment(
+            speculative, speculative[0], lambda t, trusted: len(t) < 3
+        )
+        assert_allclose(segment.xyz[:,0,0], [-0.1, 0.1, 0.3])
+        # runs longer: continue
+        segment = mover._complete_segment(
+            speculative[0:2], speculative[0], lambda t, trusted: len(t) < 4
+        )
+        assert_allclose(segment.xyz[:,0,0], [-0.1, 0.1, 0.3, 0.5])
+        # no speculative segment: generate
+        segment = mover._complete_segment(
+            None, speculative[0], lambda t, trusted: len(t) < 2
+        )
+        assert_allclose(segment.xyz[:,0,0], [-0.1, 0.1])
+
+    @raises(paths.engines.EngineMaxLengthError)
+    def test_complete_segment_max_length(self):
+        mover = self._MoverType(
+            ensemble=self.tps,
+            selector=UniformSelector(),
+            modifier=paths.NoModification(),
+            engine=self.dyn
+        )
+        speculative = self.dyn.predestination[0:5]
+        mover._complete_segment(speculative, speculative[0],
+                                lambda t, trusted: True, max_length=3)
+
+
 class testBackwardFirstTwoWayShootingMover(testForwardFirstTwoWayShootingMover):
     _MoverType = BackwardFirstTwoWayShootingMover
     # runs the same tests as ForwardFirst
@@ -317,6 +504,20 @@ class testTwoWayShootingMover(testShootingMover):
         assert_equal(mover.selector, selector)
         assert_equal(mover.modifier, modifier)
 
+    def test_engine_pool(self):
+        mover = TwoWayShootingMover(
+            ensemble=self.tps,
+            selector=UniformSelector(),
+            modifier=paths.NoModification(),
+            engine=self.dyn
+        )
+        assert_equal(mover.engine_pool, None)
+        pool = paths.engines.EnginePool([self.dyn])
+        mover.engine_pool = pool
+        for submover in mover.movers:
+            assert_equal(submover.engine_pool, pool)
+        assert_not_in('engine_pool', mover.movers[0].to_dict())
+
     def test_to_dict_from_dict(self):
         mover = TwoWayShootingMover(
             ensemble=self.tps,
@@ -480,6 +681,26 @@ class testReplicaExchangeMover(object):
         assert_equal(A1[0].trajectory, self.traj1)
 
 
+class testAliasTable(object):
+    def test_draw(self):
+        table = AliasTable([1.0, 3.0, 0.0, 4.0])
+        assert_equal(table.total, 8.0)
+        counts = [0] * 4
+        n_draws = 1000
+        for idx in range(n_draws):
+            counts[table.draw((idx + 0.5) / n_draws)] += 1
+        assert_equal(counts, [125, 375, 0, 500])
+
+    def test_uniform(self):
+        table = AliasTable([2.0] * 5)
+        assert_equal([table.draw(0.1 + 0.2 * idx) for idx in range(5)],
+                     range(5))
+
+    @raises(ValueError)
+    def test_no_positive_weight(self):
+        AliasTable([0.0, 0.0])
+
+
 class testRandomChoiceMover(object):
     def setup(self):
         traj = Trajectory([-0.5, 0.7, 1.1])
@@ -516,6 +737,15 @@ class testRandomChoiceMover(object):
                     canonical_submovers += 1
             assert_equal(canonical_submovers, 1)
 
+    def test_canonical_depth(self):
+        change = self.mover.move(self.init_samp)
+        pmc = change
+        for _ in range(change.canonical_depth):
+            pmc = pmc.subchange
+        assert_true(pmc is change.canonical)
+        assert_true(change.canonical_depth > 0)
+        assert_equal(change.canonical.canonical_depth, 0)
+
     def test_random_choice(self):
         # test that both get selected, but that we always return only one
         # sample
@@ -723,6 +953,12 @@ class testSequentialMover(object):
         gs = gs.apply_samples(change)
         assert_equal(gs[0].ensemble, self.tps)
 
+    def test_collapsed_samples(self):
+        move = SequentialMover(movers=self.everything_accepted_movers)
+        change = move.move(SampleSet(self.init_sample))
+        # all samples are for replica 0, so only the last one matters
+        assert_equal(change.collapsed_samples, [change.results[-1]])
+
     def test_first_rejected(self):
         move = SequentialMover(movers=self.first_rejected_movers)
         gs = SampleSet(self.init_sample)
@@ -5,6 +5,7 @@ from nose.tools import (assert_equal, assert_not_equal, assert_items_equal,
 from nose.plugins.skip import SkipTest
 
 from openpathsampling.pathsimulator import *
+from openpathsampling.checkpoint import Checkpoint
 import openpathsampling as paths
 import openpathsampling.engines.toy as toys
 import numpy as np
@@ -501,3 +502,119 @@ class testDirectSimulation(object):
         assert_equal(len(traj), 201)
         read_store.close()
         os.remove(tmpfile)
+
+
+class testPathSamplingCheckpoint(object):
+    def setup(self):
+        cv = paths.FunctionCV("Id", lambda snap: snap.xyz[0][0])
+        left = paths.CVDefinedVolume(cv, float("-inf"), -1.0)
+        right = paths.CVDefinedVolume(cv, 1.0, float("inf"))
+        network = paths.TPSNetwork(left, right)
+        self.ensemble = network.all_ensembles[0]
+        mover = paths.PathReversalMover(self.ensemble)
+        self.scheme = paths.LockedMoveScheme(mover, network)
+        init_traj = make_1d_traj([-1.1, 0.0, 1.1])
+        self.init_conds = self.scheme.initial_conditions_from_trajectories(
+            [init_traj])
+        self.filename = data_filename("checkpoint_test.nc")
+        self.checkpoint = self.filename + '.checkpoint'
+
+    def teardown(self):
+        for filename in [self.filename, self.checkpoint]:
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+    def test_restart(self):
+        storage = paths.Storage(self.filename, "w")
+        sim = PathSampling(storage=storage, move_scheme=self.scheme,
+                           sample_set=self.init_conds)
+        sim.output_stream = open(os.devnull, "w")
+        sim.set_random_seed(7)
+        sim.checkpoint_frequency = 2
+        sim.run(5)
+        storage.close()
+
+        # engines still draw from numpy.random, so its state is kept
+        checkpoint = Checkpoint.read(self.checkpoint)
+        assert_true(checkpoint.numpy_random_state is not None)
+
+        storage = paths.Storage(self.filename, "a")
+        restarted = PathSampling.from_checkpoint(storage)
+        np.testing.assert_array_equal(np.random.get_state()[1],
+                                      checkpoint.numpy_random_state[1])
+        assert_equal(restarted.step, 4)
+        assert_equal(restarted.random_seed, 7)
+        assert_equal(restarted.checkpoint_frequency, 2)
+        # the loaded ensembles are not the ones of this test
+        assert_equal(restarted.sample_set[0].trajectory.__uuid__,
+                     storage.steps[4].active[0].trajectory.__uuid__)
+
+        restarted.output_stream = open(os.devnull, "w")
+        restarted.run(2)
+        assert_equal(restarted.step, 6)
+        storage.close()
+
+    @raises(RuntimeError)
+    def test_mismatched_storage(self):
+        storage = paths.Storage(self.filename, "w")
+        sim = PathSampling(storage=storage, move_scheme=self.scheme,
+                           sample_set=self.init_conds)
+        sim.output_stream = open(os.devnull, "w")
+        sim.run(2)
+        sim.write_checkpoint()
+        storage.close()
+
+        # a new file with fewer steps does not fit the checkpoint
+        storage = paths.Storage(self.filename, "w")
+        try:
+            PathSampling.from_checkpoint(storage, self.checkpoint)
+        finally:
+            storage.close()
+
+
+class testPathSamplingBatchSave(object):
+    def setup(self):
+        cv = paths.FunctionCV("Id", lambda snap: snap.xyz[0][0])
+        left = paths.CVDefinedVolume(cv, float("-inf"), -1.0)
+        right = paths.CVDefinedVolume(cv, 1.0, float("inf"))
+        network = paths.TPSNetwork(left, right)
+        mover = paths.PathReversalMover(network.all_ensembles[0])
+        self.scheme = paths.LockedMoveScheme(mover, network)
+        init_traj = make_1d_traj([-1.1, 0.0, 1.1])
+        self.init_conds = self.scheme.initial_conditions_from_trajectories(
+            [init_traj])
+        self.filename = data_filename("batch_save_test.nc")
+
+    def teardown(self):
+        if os.path.isfile(self.filename):
+            os.remove(self.filename)
+
+    def test_failed_save_keeps_earlier_steps(self):
+        storage = paths.Storage(self.filename, "w")
+        sim = PathSampling(storage=storage, move_scheme=self.scheme,
+                           sample_set=self.init_conds)
+        sim.output_stream = open(os.devnull, "w")
+        sim.save_frequency = 3
+
+        steps_save = storage.steps._save
+
+        def failing_save(step, idx):
+            if step.mccycle == 2:
+                raise RuntimeError('crash while saving step 2')
+            steps_save(step, idx)
+
+        storage.steps._save = failing_save
+        try:
+            sim.run(3)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError('saving step 2 did not fail')
+
+        storage.close()
+
+        # step 1 was collected in the same batch and is still written
+        storage = paths.Storage(self.filename, "r")
+        assert_equal(len(storage.steps), 2)
+        assert_equal(storage.steps[1].mccycle, 1)
+        storage.close()
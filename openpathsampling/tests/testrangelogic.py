@@ -83,3 +83,54 @@ class testPeriodicRangeLogic(object):
         assert_equal(periodic_range_sub(2, 1, 1, 4), [(4, 1)])
         assert_equal(periodic_range_sub(0.1, 0.4, 0.3, 0.2), [(0.2, 0.3)])
         assert_equal(periodic_range_sub(0.1, 0.4, 0.1, 0.3), [(0.3, 0.4)])
+
+
+class testRangeSetLogic(object):
+    def test_canonical_ranges(self):
+        assert_equal(canonical_ranges([(3, 4), (1, 2), (1.5, 3.5), (6, 7)]),
+                     [(1, 4), (6, 7)])
+        assert_equal(canonical_ranges([(1, 2), (2, 3)]), [(1, 3)])
+        assert_equal(canonical_ranges([]), [])
+
+    @raises(ValueError)
+    def test_canonical_ranges_reversed(self):
+        canonical_ranges([(2, 1)])
+
+    def test_in_ranges(self):
+        bounds = flat_ranges([(1, 2), (3, 4)])
+        assert_equal(list(in_ranges([0, 1, 1.5, 2, 2.5, 3, 4, 5], bounds)),
+                     [False, True, True, True, False, True, True, False])
+
+    def test_range_set_or(self):
+        assert_equal(range_set_or([(1, 2)], [(3, 4)], [(1.5, 3.5)]),
+                     [(1, 4)])
+        assert_equal(range_set_or([(1, 2)], [(3, 4)]), [(1, 2), (3, 4)])
+
+    def test_range_set_and(self):
+        assert_equal(range_set_and([(0, 1), (2, 3)], [(0.5, 2.5)]),
+                     [(0.5, 1), (2, 2.5)])
+        assert_equal(range_set_and([(0, 3)], [(1, 4)], [(2, 5)]), [(2, 3)])
+        # agrees with range_and on touching ranges
+        assert_equal(range_set_and([(1, 2)], [(2, 3)]), [(2, 2)])
+        assert_equal(range_set_and([(1, 2)], [(3, 4)]), [])
+        assert_equal(range_set_and([], [(3, 4)]), [])
+
+    def test_range_set_sub(self):
+        assert_equal(range_set_sub([(0, 3)], [(1, 2)]), [(0, 1), (2, 3)])
+        assert_equal(range_set_sub([(1, 3)], [(2, 4)]), [(1, 2)])
+        assert_equal(range_set_sub([(1, 2)], [(0, 3)]), [])
+        inf = float('inf')
+        assert_equal(range_set_sub([(-inf, inf)], [(1, 2)]),
+                     [(-inf, 1), (2, inf)])
+
+    def test_range_set_xor(self):
+        assert_equal(range_set_xor([(0, 2)], [(1, 3)]), [(0, 1), (2, 3)])
+
+    def test_periodic_wrap_unwrap(self):
+        unwrapped = unwrap_periodic_ranges([(170, -170), (0, 10)],
+                                           -180, 180)
+        assert_equal(unwrapped, [(-180, -170), (0, 10), (170, 180)])
+        assert_equal(wrap_periodic_ranges(unwrapped, -180, 180),
+                     [(0, 10), (170, -170)])
+        assert_equal(wrap_periodic_ranges([(-180, 180)], -180, 180),
+                     [(-180, 180)])
@@ -141,7 +141,35 @@ class testSampleSet(object):
         raise SkipTest
 
     def test_apply_samples(self):
-        raise SkipTest
+        newset = self.testset.apply_samples([self.s2B_])
+        newset.consistency_check()
+        assert_equal(newset[2], self.s2B_)
+        assert_equal(self.s2B in newset, False)
+        # the original set is not changed
+        self.testset.consistency_check()
+        assert_equal(self.testset[2], self.s2B)
+        assert_equal(self.testset.all_from_ensemble(self.ensB), [self.s2B])
+
+        base, added, removed = newset.diff_from_base()
+        assert_equal(base, self.testset)
+        assert_equal(added, [self.s2B_])
+        assert_equal(removed, [self.s2B])
+
+        # changing the base invalidates the difference
+        self.testset.append(self.s2B_)
+        assert_equal(newset.diff_from_base(), None)
+
+    def test_copy(self):
+        copied = self.testset.copy()
+        assert_equal(copied, self.testset)
+        copied.append(self.s2B_)
+        assert_equal(len(copied), 4)
+        assert_equal(len(self.testset), 3)
+        assert_equal(self.testset.all_from_replica(2), [self.s2B])
+        del self.testset[self.s0A]
+        assert_equal(self.s0A in copied, True)
+        copied.consistency_check()
+        self.testset.consistency_check()
 
     def test_extend(self):
         testset = SampleSet([self.s0A])
@@ -201,6 +229,30 @@ class testSampleSet(object):
     def test_sanity(self):
         self.testset.sanity_check()
 
+    def test_sanity_incremental(self):
+        traj0A = self.s0A.trajectory
+        bad_samp = Sample(replica=3, trajectory=traj0A, ensemble=self.ensB)
+        self.testset.sanity_check()
+        self.testset.append(bad_samp)
+        # only the new sample is checked ...
+        try:
+            self.testset.sanity_check()
+        except AssertionError:
+            pass
+        else:
+            raise AssertionError("Insane sample was not checked")
+        # ... and a sample that was checked is trusted until a full check
+        self.testset._unchecked.discard(bad_samp)
+        newset = self.testset.apply_samples([self.s2B_])
+        assert_equal(newset._unchecked, set([self.s2B_]))
+        newset.sanity_check()
+        try:
+            newset.sanity_check(full=True)
+        except AssertionError:
+            pass
+        else:
+            raise AssertionError("Full check did not check all samples")
+
     @raises(AssertionError)
     def test_sanity_insane(self):
         traj0A = self.s0A.trajectory
@@ -1,5 +1,5 @@
 from nose.tools import (assert_equal, assert_not_equal, assert_items_equal,
-                        assert_almost_equal, raises)
+                        assert_almost_equal, assert_true, raises)
 from nose.plugins.skip import Skip, SkipTest
 from openpathsampling.tests.test_helpers import (assert_equal_array_array,
                           assert_not_equal_array_array,
@@ -10,6 +10,8 @@ from openpathsampling.shooting import *
 from openpathsampling.pathmover import ForwardShootMover, BackwardShootMover, SampleMover
 from openpathsampling.ensemble import LengthEnsemble
 from openpathsampling.sample import Sample, SampleSet
+from openpathsampling.collectivevariable import FunctionCV
+import numpy as np
 
 class SelectorTest(object):
     def setup(self):
@@ -26,6 +28,76 @@ class SelectorTest(object):
         ))
 
 
+class testGaussianBiasSelector(SelectorTest):
+    def setup(self):
+        super(testGaussianBiasSelector, self).setup()
+        self.cv = FunctionCV("x", lambda s: s.xyz[0][0])
+        self.sel = GaussianBiasSelector(self.cv, alpha=20.0, l_0=0.25)
+        self.f = [self.sel.f(s, self.mytraj) for s in self.mytraj]
+
+    def test_biases(self):
+        np.testing.assert_allclose(self.sel._biases(self.mytraj), self.f)
+        assert_almost_equal(self.sel.sum_bias(self.mytraj), sum(self.f))
+
+    def test_cumulative_cache(self):
+        cumulative = self.sel._cumulative_biases(self.mytraj)
+        np.testing.assert_allclose(cumulative, np.cumsum(self.f))
+        assert_true(self.sel._cumulative_biases(self.mytraj) is cumulative)
+        # a changed trajectory is not served from the cache
+        self.mytraj.append(self.mytraj[0])
+        assert_equal(len(self.sel._cumulative_biases(self.mytraj)), 6)
+        # also if it is changed in place without changing the length
+        cumulative = self.sel._cumulative_biases(self.mytraj)
+        self.mytraj[0] = self.mytraj[2]
+        changed = self.sel._cumulative_biases(self.mytraj)
+        assert_true(changed is not cumulative)
+        assert_almost_equal(changed[0], self.f[2])
+
+    def test_pick(self):
+        # compare to the picking by walking the list of biases
+        cumulative = np.cumsum(self.f)
+        np.random.seed(3)
+        expected = []
+        for _ in range(50):
+            rand = np.random.random() * cumulative[-1]
+            expected.append(int(np.argmax(cumulative > rand)))
+        np.random.seed(3)
+        picks = [self.sel.pick(self.mytraj) for _ in range(50)]
+        assert_equal(picks, expected)
+
+    def test_probability_ratio(self):
+        short_traj = self.mytraj[1:4]
+        snap = self.mytraj[2]
+        assert_almost_equal(
+            self.sel.probability_ratio(snap, self.mytraj, short_traj),
+            sum(self.f) / sum(self.f[1:4])
+        )
+
+
+class testUniformSelector(SelectorTest):
+    def test_max_trial_length(self):
+        sel = UniformSelector()
+        # sum_bias is 3.0 for the 5 frame trajectory
+        assert_equal(sel.max_trial_length(self.mytraj, 0.5), 8)
+        assert_equal(sel.max_trial_length(self.mytraj, 1.0), 5)
+        assert_equal(sel.max_trial_length(self.mytraj, 0.0), None)
+
+    def test_max_trial_length_accepted(self):
+        sel = UniformSelector()
+        long_traj = make_1d_traj(coordinates=[0.1] * 8)
+        too_long = make_1d_traj(coordinates=[0.1] * 9)
+        snap = self.mytraj[2]
+        assert_equal(sel.max_trial_length(self.mytraj, 0.5), len(long_traj))
+        assert_true(sel.probability_ratio(snap, self.mytraj, long_traj)
+                    >= 0.5)
+        assert_true(sel.probability_ratio(snap, self.mytraj, too_long)
+                    < 0.5)
+
+    def test_no_bound(self):
+        sel = FirstFrameSelector()
+        assert_equal(sel.max_trial_length(self.mytraj, 0.5), None)
+
+
 class testFirstFrameSelector(SelectorTest):
     def test_pick(self):
         sel = FirstFrameSelector()
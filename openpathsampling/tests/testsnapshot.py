@@ -20,7 +20,7 @@ def compate_attribute(snapshot_class, attr_name, attr_value, attr_reversal_fnc):
     d = a.reversed
 
     assert_close_unit(getattr(a, attr_name), attr_value)
-    assert(getattr(a, attr_name) is not getattr(b, attr_name))
+    assert(getattr(a, attr_name) is getattr(b, attr_name))
     assert_close_unit(getattr(a, attr_name), getattr(b, attr_name))
     assert_close_unit(getattr(a, attr_name), attr_reversal_fnc(getattr(c, attr_name)))
     assert_close_unit(getattr(a, attr_name), attr_reversal_fnc(getattr(d, attr_name)))
@@ -53,8 +53,100 @@ class testSnapshotCopy(object):
                                                          [0.0, 0.0, 0.0]]))
         new_snap = snap.copy()
         assert_true(new_snap is not snap)
-        assert_true(new_snap.coordinates is not snap.coordinates)
+        assert_true(new_snap.coordinates is snap.coordinates)
         assert_allclose(new_snap.coordinates, snap.coordinates)
         assert_true(new_snap.box_vectors is snap.box_vectors)
         assert_true(new_snap.box_vectors is None)
         assert_true(new_snap.engine is snap.engine)
+
+
+class testSharedArrays(object):
+    def setup(self):
+        import openpathsampling.engines.toy as toys
+        self.coordinates = np.array([[0.5, 1.0]])
+        self.velocities = np.array([[1.0, -2.0]])
+        self.snap = toys.Snapshot(coordinates=self.coordinates,
+                                  velocities=self.velocities)
+
+    @raises(ValueError)
+    def test_read_only(self):
+        self.snap.coordinates[0][0] = 2.0
+
+    def test_input_stays_writeable(self):
+        self.coordinates[0][0] = 2.0
+        assert_equal(self.snap.coordinates[0][0], 2.0)
+
+    def test_copy_with_replacement(self):
+        new_velocities = np.array([[3.0, 4.0]])
+        new_snap = self.snap.copy_with_replacement(velocities=new_velocities)
+        assert_true(new_snap.coordinates is self.snap.coordinates)
+        assert_allclose(new_snap.velocities, new_velocities)
+        assert_true(not new_snap.velocities.flags.writeable)
+        assert_allclose(self.snap.velocities, self.velocities)
+
+    def test_lazy_reversal(self):
+        rev = self.snap.reversed
+        assert_true('velocities' not in rev.__dict__)
+        assert_true(rev.coordinates is self.snap.coordinates)
+        assert_allclose(rev.velocities, -self.velocities)
+        assert_true(rev.velocities is rev.velocities)
+        assert_true(not rev.velocities.flags.writeable)
+        assert_true(rev.reversed is self.snap)
+
+    def test_kinetics_reversal(self):
+        from openpathsampling.engines.features.shared import \
+            KineticContainer
+        kinetics = KineticContainer(velocities=self.velocities)
+        reversed_velocities = kinetics.reversed_velocities
+        assert_allclose(reversed_velocities, -self.velocities)
+        assert_true(kinetics.reversed_velocities is reversed_velocities)
+        kinetics.velocities = np.array([[0.0, 1.0]])
+        assert_allclose(kinetics.reversed_velocities, [[0.0, -1.0]])
+
+
+class testSlotsSnapshot(object):
+    def setup(self):
+        self.Snapshot = SnapshotFactory(
+            'SlotsSnapshot',
+            [features.coordinates, features.velocities, features.engine],
+            'A snapshot using slots',
+            use_slots=True
+        )
+        self.snap = self.Snapshot(coordinates=np.array([[0.5, 1.0]]),
+                                  velocities=np.array([[1.0, -2.0]]))
+
+    def test_no_dict(self):
+        assert_true(not hasattr(self.snap, '__dict__'))
+        assert_equal(set(self.Snapshot.__slots__),
+                     {'coordinates', 'velocities', 'engine', '_reversed',
+                      '__uuid__', '__weakref__'})
+
+    @raises(AttributeError)
+    def test_no_new_attributes(self):
+        self.snap.foo = 1.0
+
+    def test_copy_and_reverse(self):
+        new_snap = self.snap.copy()
+        assert_true(new_snap.coordinates is self.snap.coordinates)
+        assert_not_equal(new_snap.__uuid__, self.snap.__uuid__)
+        rev = self.snap.reversed
+        assert_allclose(rev.velocities, [[-1.0, 2.0]])
+        assert_true(rev.reversed is self.snap)
+        assert_equal(rev.__uuid__, self.snap.reverse_uuid())
+
+    def test_weakref(self):
+        import weakref
+        ref = weakref.ref(self.snap)
+        assert_true(ref() is self.snap)
+
+    def test_lazy_features(self):
+        Snapshot = SnapshotFactory(
+            'LazySlotsSnapshot',
+            [features.statics, features.kinetics, features.engine],
+            use_slots=True
+        )
+        assert_true('_lazy' in Snapshot.__slots__)
+        assert_true('statics' not in Snapshot.__slots__)
+        snap = Snapshot(statics=None, kinetics=None)
+        assert_equal(snap.statics, None)
+        assert_true(not hasattr(snap, '__dict__'))
@@ -361,6 +361,101 @@ class testStorage(object):
         assert(len(store.dimensions['snapshots']) == 1)
         store.close()
 
+    def test_trajectory_delta(self):
+        store = Storage(filename=self.filename, mode='w', use_uuid=False)
+        snaps = [self.toy_template.copy() for _ in range(6)]
+        old = paths.Trajectory(snaps[:4])
+        trial = old[0:2] + paths.Trajectory(snaps[4:])
+        store.save(old)
+        store.save(trial)
+
+        # only the new frames are written for the trial
+        assert_equal(len(store.trajectories.variables['snapshots'][1]), 2)
+        indices = store.trajectories.snapshot_indices(1)
+        assert_equal(len(indices), 4)
+        assert_equal(indices[0:2],
+                     store.trajectories.snapshot_indices(0)[0:2])
+        store.close()
+
+        store = Storage(filename=self.filename, mode='a')
+        loaded = store.trajectories[1]
+        assert_equal([snap.__uuid__ for snap in loaded],
+                     [snap.__uuid__ for snap in trial])
+        store.close()
+
+    def test_flattened_movechanges(self):
+        sample = paths.Sample(replica=0,
+                              ensemble=paths.LengthEnsemble(1),
+                              trajectory=paths.Trajectory(
+                                  [self.toy_template.copy()]))
+        change = paths.AcceptedSampleMoveChange([sample])
+
+        # not stored by default
+        store = Storage(filename=self.filename, mode='w')
+        assert('movechanges_results' not in store.variables)
+        store.close()
+
+        paths.storage.MoveChangeStore.store_flattened = True
+        try:
+            store = Storage(filename=self.filename, mode='w')
+        finally:
+            paths.storage.MoveChangeStore.store_flattened = False
+        store.save(change)
+        store.close()
+
+        store = Storage(filename=self.filename, mode='a')
+        loaded = store.movechanges[0]
+        assert_equal([s.__uuid__ for s in loaded._results],
+                     [sample.__uuid__])
+        store.close()
+
+    def test_batch(self):
+        store = Storage(filename=self.filename, mode='w')
+        ensemble = paths.LengthEnsemble(1)
+        samples = [paths.Sample(replica=idx, ensemble=ensemble,
+                                trajectory=paths.Trajectory(
+                                    [self.toy_template.copy()]))
+                   for idx in range(3)]
+
+        with store.batch([store.samples]):
+            for sample in samples:
+                store.save(sample)
+            # nothing written yet, but the samples can be loaded
+            assert_equal(len(store.samples), 0)
+            assert_equal(store.samples[1], samples[1])
+            assert_equal(store.samples.vars['replica'][2], 2)
+
+        assert_equal(len(store.samples), 3)
+        store.close()
+
+        store = Storage(filename=self.filename, mode='a')
+        assert_equal([sample.replica for sample in store.samples],
+                     [0, 1, 2])
+        store.close()
+
+    def test_batch_rollback(self):
+        store = Storage(filename=self.filename, mode='w')
+        sample = paths.Sample(replica=0,
+                              ensemble=paths.LengthEnsemble(1),
+                              trajectory=paths.Trajectory(
+                                  [self.toy_template.copy()]))
+
+        try:
+            with store.batch([store.samples]):
+                store.save(sample)
+                raise RuntimeError('crash while saving')
+        except RuntimeError:
+            pass
+
+        assert_equal(len(store.samples), 0)
+        assert(sample not in store.samples.index)
+        assert(0 not in store.samples.cache)
+
+        # the sample can be saved again
+        store.save(sample)
+        assert_equal(len(store.samples), 1)
+        store.close()
+
     def test_version(self):
         store = Storage(
             filename=self.filename, mode='w')
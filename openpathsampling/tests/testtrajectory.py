@@ -135,3 +135,37 @@ class testSubtrajectoryIndices(object):
         assert_equal(indicesA, [[0, 1], [3], [11, 12]])
         assert_equal(indicesB, [[5, 6], [8]])
         assert_equal(indicesABA, [[3, 4, 5, 6, 7, 8, 9, 10, 11]])
+
+
+class testSharedParts(object):
+    def setup(self):
+        self.old = make_1d_traj(coordinates=[float(i) for i in range(10)])
+        self.new = make_1d_traj(coordinates=[-1.0, -2.0, -3.0])
+
+    def test_forward_shot(self):
+        trial = self.old[0:4] + self.new
+        parts = trial.shared_parts()
+        # longest part first
+        assert(parts[0][0] is self.old)
+        assert_equal(parts[0][1:], (0, 4, 0))
+        assert(parts[1][0] is self.new)
+        assert_equal(parts[1][1:], (0, 3, 4))
+
+    def test_backward_shot(self):
+        trial = self.new + self.old[5:]
+        parts = trial.shared_parts()
+        assert(parts[0][0] is self.old)
+        assert_equal(parts[0][1:], (5, 10, 3))
+
+    def test_changed_in_place(self):
+        trial = self.old[0:4] + self.new
+        trial[0] = self.new[0]
+        parts = trial.shared_parts()
+        assert_equal(len(parts), 1)
+        assert(parts[0][0] is self.new)
+
+    def test_max_delta_depth(self):
+        traj = self.old
+        for _ in range(2 * paths.Trajectory.max_delta_depth):
+            traj = traj[0:5] + self.new
+            assert(traj._delta_depth <= paths.Trajectory.max_delta_depth)
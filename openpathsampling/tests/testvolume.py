@@ -113,8 +113,9 @@ class testCVRangeVolume(object):
 
     def test_or_combinations(self):
         assert_equal((volA | volB), volume.CVDefinedVolume(op_id, -0.5, 0.75))
-        assert_equal((volB | volC), 
-                     volume.UnionVolume(volB, volC))
+        # disjoint ranges give a flat range set
+        assert_equal((volB | volC),
+                     volume.CVRangeSetVolume.from_volumes([volB, volC]))
         assert_equal((volB | volC)(0.0), False)
         assert_equal((volB | volC)(0.5), True)
         assert_equal((volB | volC)(-0.5), True)
@@ -125,10 +126,8 @@ class testCVRangeVolume(object):
 
     def test_xor_combinations(self):
         assert_equal((volA ^ volB),
-                     volume.UnionVolume(
-                         volume.CVDefinedVolume(op_id, -0.5, 0.25),
-                         volume.CVDefinedVolume(op_id, 0.5, 0.75)
-                     ))
+                     volume.CVRangeSetVolume(op_id, [(-0.5, 0.25),
+                                                     (0.5, 0.75)]))
         assert_equal((volA ^ volA2),
                      volume.SymmetricDifferenceVolume(volA, volA2))
 
@@ -138,11 +137,8 @@ class testCVRangeVolume(object):
         assert_equal((volA - volD), volume.EmptyVolume())
         assert_equal((volB - volA), volume.CVDefinedVolume(op_id, 0.5, 0.75))
         assert_equal((volD - volA),
-                     volume.UnionVolume(
-                         volume.CVDefinedVolume(op_id, -0.75, -0.5),
-                         volume.CVDefinedVolume(op_id, 0.5, 0.75)
-                     )
-                    )
+                     volume.CVRangeSetVolume(op_id, [(-0.75, -0.5),
+                                                     (0.5, 0.75)]))
         assert_equal((volA2 - volA),
                      volume.RelativeComplementVolume(volA2, volA))
 
@@ -350,6 +346,95 @@ class testCVRangeVolumePeriodic(object):
                      volume.PeriodicCVDefinedVolume(op_id, -100, 75))
 
 
+class testCVRangeSetVolume(object):
+    def setUp(self):
+        self.set_BC = volume.CVRangeSetVolume.from_volumes([volB, volC])
+        self.pvolA = volume.PeriodicCVDefinedVolume(op_id, 150, -150,
+                                                    -180, 180)
+        self.pvolB = volume.PeriodicCVDefinedVolume(op_id, -30, 30,
+                                                    -180, 180)
+
+    def test_canonical_ranges(self):
+        vol = volume.CVRangeSetVolume(op_id, [(0.5, 0.6), (-0.3, 0.1),
+                                              (0.0, 0.2)])
+        assert_equal(vol.ranges, [(-0.3, 0.2), (0.5, 0.6)])
+        assert_equal(self.set_BC.ranges, [(-0.75, -0.25), (0.25, 0.75)])
+
+    def test_call(self):
+        assert_equal(self.set_BC(0.0), False)
+        assert_equal(self.set_BC(0.5), True)
+        assert_equal(self.set_BC(-0.5), True)
+        assert_equal(self.set_BC(-0.25), True)
+        assert_equal(self.set_BC(0.8), False)
+
+    def test_check_values(self):
+        values = [-1.0, -0.5, 0.0, 0.25, 0.5, 0.75, 1.0]
+        assert_equal(list(self.set_BC.check_values(values)),
+                     [False, True, False, True, True, True, False])
+
+    def test_combinations_stay_flat(self):
+        combo = self.set_BC | volA
+        assert_equal(type(combo), volume.CVRangeSetVolume)
+        assert_equal(combo.ranges, [(-0.75, 0.75)])
+        combo = volA | self.set_BC
+        assert_equal(type(combo), volume.CVRangeSetVolume)
+        assert_equal((self.set_BC & volA).ranges,
+                     [(-0.5, -0.25), (0.25, 0.5)])
+        assert_equal((self.set_BC - volA).ranges,
+                     [(-0.75, -0.5), (0.5, 0.75)])
+        assert_equal((volD - self.set_BC).ranges, [(-0.25, 0.25)])
+        assert_equal((self.set_BC ^ volD).ranges, [(-0.25, 0.25)])
+        assert_equal(self.set_BC & volB, volume.CVRangeSetVolume.from_volumes(
+            [volB]))
+        assert_equal(self.set_BC - volD, volume.EmptyVolume())
+        assert_is(self.set_BC | self.set_BC, self.set_BC)
+        # different CV goes to the usual combinations
+        assert_equal(type(self.set_BC | volA2), volume.UnionVolume)
+
+    def test_invert(self):
+        inverted = ~self.set_BC
+        assert_equal(inverted(0.0), True)
+        assert_equal(inverted(0.5), False)
+        assert_equal(inverted(-10.0), True)
+        assert_equal(~inverted, self.set_BC)
+
+    def test_periodic(self):
+        vol = volume.CVRangeSetVolume.from_volumes([self.pvolA, self.pvolB])
+        assert_equal(vol.ranges, [(-180.0, -150.0), (-30.0, 30.0),
+                                  (150.0, 180.0)])
+        for periodic_image in [-1, 0, 1]:
+            assert_equal(vol(170 + 360 * periodic_image), True)
+            assert_equal(vol(-170 + 360 * periodic_image), True)
+            assert_equal(vol(0 + 360 * periodic_image), True)
+            assert_equal(vol(90 + 360 * periodic_image), False)
+        assert_equal(list(vol.check_values([170, 530, 90])),
+                     [True, True, False])
+        inverted = ~vol
+        assert_equal(inverted.ranges, [(-150.0, -30.0), (30.0, 150.0)])
+        assert_equal(type(~inverted), volume.CVRangeSetVolume)
+        assert_equal(vol | inverted, volume.FullVolume())
+        # round trip through the constructor (as in storage)
+        copy = volume.CVRangeSetVolume(op_id, vol.ranges, -180, 180)
+        assert_equal(copy.ranges, vol.ranges)
+
+    def test_periodic_combinations(self):
+        vol = volume.CVRangeSetVolume.from_volumes([self.pvolA])
+        pvolC = volume.PeriodicCVDefinedVolume(op_id, 170, -30, -180, 180)
+        assert_equal((vol & pvolC).ranges, [(-180.0, -150.0),
+                                            (170.0, 180.0)])
+        # non-wrapping periodic volumes can't be flattened
+        pvol_nowrap = volume.PeriodicCVDefinedVolume(op_id, 0, 30)
+        assert_equal(type(vol | pvol_nowrap), volume.UnionVolume)
+
+    @raises(ValueError)
+    def test_from_volumes_different_cv(self):
+        volume.CVRangeSetVolume.from_volumes([volA, volA2])
+
+    def test_str(self):
+        assert_equal(str(self.set_BC),
+                     "{x|Id(x) in [-0.75, -0.25] union [0.25, 0.75]}")
+
+
 class testVolumeFactory(object):
     def test_check_minmax(self):
         minmax1 = volume.VolumeFactory._check_minmax(0, [2, 2])
@@ -6,6 +6,7 @@ Created on 03.09.2014
 
 import range_logic
 import abc
+import numpy as np
 from openpathsampling.netcdfplus import StorableNamedObject
 
 # TODO: Make Full and Empty be Singletons to avoid storing them several times!
@@ -300,7 +301,8 @@ class CVDefinedVolume(Volume):
         lrange : None or 1 or list of 2-tuples
             Key to the volume to be returned: None returns the EmptyVolume, 1
             returns self, and a list of 2-tuples is __or__'d as (min,max) to
-            make a VolumeCombinations
+            make a flat `CVRangeSetVolume` (or a `UnionVolume` if the
+            ranges can't be described as a range set)
 
         Returns
         -------
@@ -321,16 +323,30 @@ class CVDefinedVolume(Volume):
         elif len(lrange) == 1:
             return self._copy_with_new_range(lrange[0][0], lrange[0][1])
         elif len(lrange) == 2:
-            return UnionVolume(
-                self._copy_with_new_range(lrange[0][0], lrange[0][1]),
-                self._copy_with_new_range(lrange[1][0], lrange[1][1])
-            )
+            volumes = [self._copy_with_new_range(lmin, lmax)
+                       for (lmin, lmax) in lrange]
+            try:
+                return CVRangeSetVolume.from_volumes(volumes)
+            except ValueError:
+                return UnionVolume(*volumes)
         else:
             raise ValueError(
                 "lrange value not understood: {0}".format(lrange)
             )  # pragma: no cover
 
+    def _as_range_set_volume(self, other):
+        """This volume as a `CVRangeSetVolume`, if `other` is a compatible
+        `CVRangeSetVolume`; otherwise None.
+        """
+        if (isinstance(other, CVRangeSetVolume)
+                and other._as_range_set(self) is not None):
+            return CVRangeSetVolume.from_volumes([self])
+        return None
+
     def __and__(self, other):
+        range_set_self = self._as_range_set_volume(other)
+        if range_set_self is not None:
+            return range_set_self & other
         if (type(other) is type(self) and 
                 self.collectivevariable == other.collectivevariable):
             lminmax = self.range_and(self.lambda_min, self.lambda_max,
@@ -340,6 +356,9 @@ class CVDefinedVolume(Volume):
             return super(CVDefinedVolume, self).__and__(other)
 
     def __or__(self, other):
+        range_set_self = self._as_range_set_volume(other)
+        if range_set_self is not None:
+            return range_set_self | other
         if (type(other) is type(self) and 
                 self.collectivevariable == other.collectivevariable):
             lminmax = self.range_or(self.lambda_min, self.lambda_max,
@@ -349,6 +368,9 @@ class CVDefinedVolume(Volume):
             return super(CVDefinedVolume, self).__or__(other)
 
     def __xor__(self, other):
+        range_set_self = self._as_range_set_volume(other)
+        if range_set_self is not None:
+            return range_set_self ^ other
         if (type(other) is type(self) and 
                 self.collectivevariable == other.collectivevariable):
             # taking the shortcut here
@@ -357,6 +379,9 @@ class CVDefinedVolume(Volume):
             return super(CVDefinedVolume, self).__xor__(other)
 
     def __sub__(self, other):
+        range_set_self = self._as_range_set_volume(other)
+        if range_set_self is not None:
+            return range_set_self - other
         if (type(other) is type(self) and 
                 self.collectivevariable == other.collectivevariable):
             lminmax = self.range_sub(self.lambda_min, self.lambda_max,
@@ -497,6 +522,229 @@ class PeriodicCVDefinedVolume(CVDefinedVolume):
                         self.collectivevariable.name)
 
 
+class CVRangeSetVolume(Volume):
+    """
+    Volume defined by a set of ranges of a collective variable.
+
+    This is a flat representation of the union of any number of
+    `CVDefinedVolume`s (or `PeriodicCVDefinedVolume`s with a defined
+    periodic domain) on the same collective variable. Logical combinations
+    with other volumes on the same collective variable give a new
+    `CVRangeSetVolume` instead of a tree of `VolumeCombination`s, and
+    checking a snapshot is a single binary search over the sorted range
+    boundaries.
+
+    Parameters
+    ----------
+    collectivevariable : CollectiveVariable
+        the collectivevariable object
+    ranges : list of 2-tuples
+        (min, max) for each range; for periodic volumes, min > max means
+        the range wraps around the periodic boundary
+    period_min : float (optional)
+        minimum of the periodic domain
+    period_max : float (optional)
+        maximum of the periodic domain
+
+    Attributes
+    ----------
+    ranges : list of 2-tuples
+        the ranges in canonical (sorted, non-overlapping) form; periodic
+        ranges are stored unwrapped, i.e., split at the periodic boundary
+    """
+    def __init__(self, collectivevariable, ranges, period_min=None,
+                 period_max=None):
+        super(CVRangeSetVolume, self).__init__()
+        self.collectivevariable = collectivevariable
+        self.period_min = period_min
+        self.period_max = period_max
+        if self.is_periodic:
+            self._period_shift = period_min
+            self._period_len = period_max - period_min
+            wrapped = [self._wrap_range(lmin, lmax)
+                       for (lmin, lmax) in ranges]
+            ranges = range_logic.unwrap_periodic_ranges(wrapped, period_min,
+                                                        period_max)
+        else:
+            ranges = range_logic.canonical_ranges(ranges)
+        self.ranges = ranges
+        self._bounds = range_logic.flat_ranges(self.ranges)
+
+    @property
+    def is_periodic(self):
+        return self.period_min is not None and self.period_max is not None
+
+    def do_wrap(self, value):
+        """Wraps `value` (float or array) into the periodic domain."""
+        return ((value - self._period_shift) % self._period_len
+                + self._period_shift)
+
+    def _wrap_range(self, lmin, lmax):
+        if lmax - lmin >= self._period_len:
+            return (self.period_min, self.period_max)
+        # values already in the (closed) domain are kept as they are, so
+        # that ranges ending at period_max survive a round trip
+        if not self.period_min <= lmin <= self.period_max:
+            lmin = self.do_wrap(lmin)
+        if not self.period_min <= lmax <= self.period_max:
+            lmax = self.do_wrap(lmax)
+        return (lmin, lmax)
+
+    @staticmethod
+    def _range_key(volume):
+        """Collective variable and periodic domain of a range volume.
+
+        Two volumes can be combined into a `CVRangeSetVolume` if their keys
+        are equal. Returns None if the volume can't be described as a range
+        set.
+        """
+        if isinstance(volume, CVRangeSetVolume):
+            return (volume.collectivevariable, volume.period_min,
+                    volume.period_max)
+        elif type(volume) is CVDefinedVolume:
+            return (volume.collectivevariable, None, None)
+        elif type(volume) is PeriodicCVDefinedVolume and volume.wrap:
+            return (volume.collectivevariable, volume.period_min,
+                    volume.period_max)
+        else:
+            return None
+
+    @classmethod
+    def from_volumes(cls, volumes):
+        """Flat union of range-defined volumes on the same CV.
+
+        Parameters
+        ----------
+        volumes : list of :class:`.Volume`
+            `CVDefinedVolume`s, `PeriodicCVDefinedVolume`s (with periodic
+            domain), or `CVRangeSetVolume`s, all sharing the same collective
+            variable and periodic domain
+
+        Returns
+        -------
+        :class:`.CVRangeSetVolume`
+            volume representing the union of the input volumes
+
+        Raises
+        ------
+        ValueError
+            if the volumes can't be combined into a single range set
+        """
+        keys = [cls._range_key(vol) for vol in volumes]
+        if len(keys) == 0 or None in keys or keys.count(keys[0]) != len(keys):
+            raise ValueError("Volumes can't be combined into a "
+                             + "CVRangeSetVolume: " + str(volumes))
+        (cv, period_min, period_max) = keys[0]
+        ranges = []
+        for vol in volumes:
+            if isinstance(vol, CVRangeSetVolume):
+                ranges.extend(vol.ranges)
+            else:
+                ranges.append((vol.lambda_min, vol.lambda_max))
+        return cls(cv, ranges, period_min, period_max)
+
+    def _as_range_set(self, other):
+        """Range set of `other` if it is compatible with this volume"""
+        key = self._range_key(other)
+        if key != (self.collectivevariable, self.period_min,
+                   self.period_max):
+            return None
+        return CVRangeSetVolume.from_volumes([other]).ranges
+
+    def _full_ranges(self):
+        if self.is_periodic:
+            return [(self.period_min, self.period_max)]
+        else:
+            return [(float('-inf'), float('inf'))]
+
+    def _ranges_to_Volume(self, ranges):
+        if len(ranges) == 0:
+            return EmptyVolume()
+        elif ranges == self._full_ranges():
+            return FullVolume()
+        elif ranges == self.ranges:
+            return self
+        else:
+            return CVRangeSetVolume(self.collectivevariable, ranges,
+                                    self.period_min, self.period_max)
+
+    def __and__(self, other):
+        other_ranges = self._as_range_set(other)
+        if other_ranges is None:
+            return super(CVRangeSetVolume, self).__and__(other)
+        return self._ranges_to_Volume(
+            range_logic.range_set_and(self.ranges, other_ranges)
+        )
+
+    def __or__(self, other):
+        other_ranges = self._as_range_set(other)
+        if other_ranges is None:
+            return super(CVRangeSetVolume, self).__or__(other)
+        return self._ranges_to_Volume(
+            range_logic.range_set_or(self.ranges, other_ranges)
+        )
+
+    def __xor__(self, other):
+        other_ranges = self._as_range_set(other)
+        if other_ranges is None:
+            return super(CVRangeSetVolume, self).__xor__(other)
+        return self._ranges_to_Volume(
+            range_logic.range_set_xor(self.ranges, other_ranges)
+        )
+
+    def __sub__(self, other):
+        other_ranges = self._as_range_set(other)
+        if other_ranges is None:
+            return super(CVRangeSetVolume, self).__sub__(other)
+        return self._ranges_to_Volume(
+            range_logic.range_set_sub(self.ranges, other_ranges)
+        )
+
+    def __invert__(self):
+        return self._ranges_to_Volume(
+            range_logic.range_set_sub(self._full_ranges(), self.ranges)
+        )
+
+    def check_values(self, values):
+        """Vectorized check whether CV values are inside the volume.
+
+        Parameters
+        ----------
+        values : array-like of float
+            values of the collective variable
+
+        Returns
+        -------
+        np.ndarray of bool
+            whether each value is in the volume
+        """
+        values = np.asarray(values, dtype=float)
+        if self.is_periodic:
+            values = self.do_wrap(values)
+        return range_logic.in_ranges(values, self._bounds)
+
+    def __call__(self, snapshot):
+        l = self.collectivevariable(snapshot).__float__()
+        if self.is_periodic:
+            l = self.do_wrap(l)
+        return bool(range_logic.in_ranges(l, self._bounds))
+
+    def __str__(self):
+        ranges = self.ranges
+        if self.is_periodic:
+            fcn = '({0}(x) - {2}) % {1} + {2}'.format(
+                self.collectivevariable.name, self._period_len,
+                self._period_shift)
+        else:
+            fcn = '{0}(x)'.format(self.collectivevariable.name)
+        if len(ranges) == 0:
+            domain = '[]'
+        else:
+            domain = ' union '.join(['[{0}, {1}]'.format(lmin, lmax)
+                                     for (lmin, lmax) in ranges])
+        return '{x|' + fcn + ' in ' + domain + '}'
+
+
 class VoronoiVolume(Volume):
     '''
     Volume given by a Voronoi cell specified by a set of centers